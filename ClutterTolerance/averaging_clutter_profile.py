@@ -5,12 +5,11 @@
 @author: s362khan
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 class AveragingClutterProfile:
 
-    def __init__(self):
+    def __init__(self, rng=None):
         """
         Model clutter tolerance as a function of the position weighted average of all objects
         in the receptive field of the neuron. The normalized position average response is used to
@@ -33,21 +32,40 @@ class AveragingClutterProfile:
            particularly in V1. Range of responses varied between the average and winner take all
            responses and depended on the contrast of the individual stimuli. It is likely that
            a similar mechanism is present in IT. We do not model winner take all behavior.
+
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         """
 
         self.type = 'position weighted average'
-        self.d = max(0, self._deviation_from_average())
+        self.d = max(0, self._deviation_from_average(rng=rng))
 
     def print_parameters(self):
         print("Profile: %s" % self.type)
 
     @staticmethod
-    def _deviation_from_average():
+    def sample_parameters(n, rng=None):
+        """
+        Generate deviations from the averaging rule of a population of n clutter profiles.
+
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :rtype : deviations (n)
+        """
+        return np.maximum(0, AveragingClutterProfile._deviation_from_average(n, rng=rng))
+
+    @staticmethod
+    def _deviation_from_average(n=None, rng=None):
         """
         Generate deviation from averaging rule. This is modeled as a gaussian distribution with
         mean = 0 and sigma determined from data fitting. See ClutterModelFit.py for details.
+
+        :param n: Number of deviations to generate. Default = None, a single deviation.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         """
-        return np.float(np.random.normal(loc=0, scale=0.17))
+        if rng is None:
+            rng = np.random
+
+        return rng.normal(loc=0, scale=0.17, size=n)
 
     def firing_rate_modifier(self, isolated_fire_rates, weights):
 
@@ -79,6 +97,8 @@ class AveragingClutterProfile:
         :param axis: axis to plot. Default is None, which means create a new figure.
         """
 
+        import matplotlib.pyplot as plt
+
         if axis is None:
             fig, axis = plt.subplots()
 
@@ -122,6 +142,8 @@ class AveragingClutterProfile:
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
     profile1 = AveragingClutterProfile()
@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 import sys
 
@@ -48,6 +47,95 @@ def integrate(dt, a, b, c, x, u):
     return x, y
 
 
+def discretize(dt, tau):
+    """
+    Exact (zero-order hold) discretization of the Tamura LTI systems
+        dx/dt = 1/tau * (A x + B u), A = [[-1, 0], [1, -1]], B = [1, 0].
+
+    A = -I + N, where N is nilpotent, so the matrix exponential has the closed form
+        exp(A dt / tau) = exp(-h) * [[1, 0], [h, 1]],  h = dt / tau
+    and the input matrix of the discrete system is B_d = [1 - exp(-h), 1 - exp(-h) * (1 + h)].
+
+    :param dt: Time step (s). Any step size is stable.
+    :param tau: Time constant(s) of the system. Scalar or array.
+    :return: (a_d, b_d), discrete state and input matrices. If tau is an array, entries of a_d
+             and b_d are arrays of the same shape.
+    """
+    h = dt / np.asarray(tau, dtype=float)
+    e = np.exp(-h)
+
+    a_d = np.array([[e, np.zeros_like(e)], [h * e, e]])
+    b_d = np.array([1 - e, 1 - e * (1 + h)])
+
+    return a_d, b_d
+
+
+def step_discrete(a_d, b_d, c, x, u):
+    """
+    Single step of a discretized state-space system (see discretize).
+
+    :param a_d: Discrete state matrix
+    :param b_d: Discrete input matrix
+    :param c: Output matrix
+    :param x: State vector
+    :param u: Input
+    :return: (x, y), i.e. the state and the output
+    """
+    x = np.dot(a_d, x) + b_d * u
+    y = np.dot(c, x)
+
+    return x, y
+
+
+def get_step_response_area(dt, tau, integration='euler', t_window=0.140):
+    """
+    Area under the rectified output of a Tamura LTI system (gain=1) to a unit step input over
+    the [0, t_window) window, sampled after every time step and integrated with np.trapz.
+
+    Same as simulating the system with integrate() (or step_discrete()), but in closed form.
+    With h = dt / tau, the output after k steps is
+        euler: k * h * (1 - h)^(k - 1)
+        exact: k * h * exp(-k * h)
+
+    :param dt: Time step (s)
+    :param tau: Time constant(s) of the system. Scalar or array.
+    :param integration: Stepping method of the system {'euler'(Default), 'exact'}
+    :param t_window: Integration window (s). Default = 0.140.
+    :return: area(s) under the rectified unit step response, same shape as tau.
+    """
+    n_steps = np.arange(0, t_window, step=dt).shape[0]
+    k = np.arange(1, n_steps + 1)
+
+    h = dt / np.asarray(tau, dtype=float)[..., np.newaxis]
+
+    if integration == 'exact':
+        y = k * h * np.exp(-k * h)
+    else:
+        y = k * h * (1 - h) ** (k - 1)
+
+    return np.trapz(np.maximum(0, y), dx=dt, axis=-1)
+
+
+def _get_positive_normal(loc, scale, n=None, min_value=0.0001, rng=None):
+    """
+    Sample(s) of a normal distribution, samples less than or equal to min_value are redrawn.
+
+    :param n: Number of samples. Default = None, a single sample.
+    :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+    """
+    if rng is None:
+        rng = np.random
+
+    t = np.zeros(1 if n is None else n)
+
+    invalid = t <= min_value
+    while np.any(invalid):
+        t[invalid] = rng.normal(loc=loc, scale=scale, size=np.count_nonzero(invalid))
+        invalid = t <= min_value
+
+    return t[0] if n is None else t
+
+
 # noinspection PyArgumentList
 class TamuraDynamics:
     """
@@ -77,22 +165,32 @@ class TamuraDynamics:
     Ringo, J. L. (1996). Stimulus specific adaptation in inferior temporal and medial temporal
         cortex of the monkey, 76, 191–197.
     """
-    def __init__(self, dt, obj_dict, max_fire_rate, max_latency=0.25):
+    def __init__(
+            self, dt, obj_dict, max_fire_rate, max_latency=0.25, integration='euler', rng=None):
         """
         :param dt           : Simulation time step in seconds.
         :param obj_dict     : Dictionary of {object: selectivity} for the neuron.
                               Selectivity ranges between (0, 1) and is the normalized firing rate
                               of the neuron to the specified object.
         :param max_latency  : maximum response latency of the neuron. Default = 0.25s
+        :param integration  : Stepping method of the LTI systems. Allowed types
+                              {'euler'(Default), 'exact'}. 'exact' discretizes the systems once
+                              (zero-order hold) and allows larger (20-50ms) time steps.
+        :param rng          : numpy RandomState to draw from. Default=None, the global numpy
+                              random state.
         """
         self.dt = dt
 
+        if integration not in ('euler', 'exact'):
+            raise Exception("Invalid integration method %s" % integration)
+        self.integration = integration
+
         self.n = 1  # do not change this. Code will not work if not =1
         assert self.n == 1
 
         self.type = 'tamura'
 
-        self.transience = self._get_transience()
+        self.transience = self._get_transience(rng=rng)
 
         # Lehky2011 average rate were measured over the (71 - 210)ms window. This corresponds to
         # the early response stage of Tamura2001. Use the transience value to get the late object
@@ -113,7 +211,7 @@ class TamuraDynamics:
         self.late_x = np.zeros((2, self.n))
 
         # Early_tau
-        self.early_tau = self._get_early_tau()
+        self.early_tau = self._get_early_tau(rng=rng)
 
         # Early Gain
         ranked_objs_list = self.get_ranked_object_list(obj_dict)
@@ -123,7 +221,7 @@ class TamuraDynamics:
         ranked_objs_list = self.get_ranked_object_list(self.late_obj_dict)
 
         self.late_gain, self.late_tau = self._get_late_gain_n_tau(
-            ranked_objs_list[0][1], max_fire_rate)
+            ranked_objs_list[0][1], max_fire_rate, rng=rng)
 
         # setup the C parameters
         self.early_C = np.array([self.early_gain, -self.early_gain])
@@ -131,33 +229,46 @@ class TamuraDynamics:
         self.late_C = np.array(
             [self.late_gain, - self.late_gain])
 
-        # Latencies of the model
-        # parameters of exponential functions to map static rate to latency for each neuron
-        self.min_latencies = .09 + .01 * np.random.rand(self.n)
-        self.max_latencies = np.minimum(max_latency,
-                                        self.min_latencies + np.random.gamma(5, .02, self.n))
+        # Discrete systems, these only depend on the time constants and are computed once.
+        if self.integration == 'exact':
+            self.early_A_d, self.early_B_d = discretize(self.dt, self.early_tau)
+            self.late_A_d, self.late_B_d = discretize(self.dt, self.late_tau)
 
-        self.tau_latencies = np.random.gamma(2, 20, self.n)
+        # Latencies of the model
+        self.min_latencies, self.max_latencies, self.tau_latencies = \
+            self._get_latency_parameters(self.n, max_latency, rng=rng)
 
         # matrices for storing recent input history, to allow variable-latency responses
-        self.late_additional_latency = self.get_late_additional_latency()
+        self.late_additional_latency = self.get_late_additional_latency(rng=rng)
 
         latency_steps = int(max_latency / dt) + 1 + self.late_additional_latency
         self.early_memory = np.zeros((self.n, latency_steps))
         self.late_memory = np.zeros((self.n, latency_steps))
         self.memory_index = 0
 
-        print("Early Tau %0.2f, Early Gain %0.2f, Late Tau %0.2f, Late Gain %0.2f, "
-              "Add Latency %0.2f" % (self.early_tau,
-                                     self.early_gain,
-                                     self.late_tau,
-                                     self.late_gain,
-                                     self.late_additional_latency
-                                     )
-              )
+    @staticmethod
+    def _get_latency_parameters(n, max_latency, rng=None):
+        """
+        Parameters of exponential functions to map static rate to latency for each neuron
+
+        :param n: Number of neurons.
+        :param max_latency: maximum response latency of the neurons.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :return: min_latencies, max_latencies, tau_latencies. Arrays of size n.
+        """
+        if rng is None:
+            rng = np.random
+
+        min_latencies = .09 + .01 * rng.rand(n)
+        max_latencies = np.minimum(max_latency, min_latencies + rng.gamma(5, .02, n))
+
+        tau_latencies = rng.gamma(2, 20, n)
+
+        return min_latencies, max_latencies, tau_latencies
 
     @staticmethod
-    def _get_transience():
+    def _get_transience(n=None, rng=None):
         """
         Tamura 2001 defined transience as  (init_resp - late_resp) / (init_resp + late_resp)
 
@@ -168,17 +279,17 @@ class TamuraDynamics:
         population in figure 5b. It had a mean of 0.4 and a sd of 0.26. We use a normal
         distribution to get the transience value.
 
+        :param n: Number of neurons. Default = None, a single neuron.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return: transience of the neuron
         """
-        t = np.random.normal(loc=0.4, scale=0.26)
+        if rng is None:
+            rng = np.random
 
-        # clip between -1 and 1
-        if t < -1:
-            t = -1.0
-        elif t > 1:
-            t = 1.0
+        t = rng.normal(loc=0.4, scale=0.26, size=n)
 
-        return t
+        # clip between -1 and 1
+        return np.clip(t, -1.0, 1.0)
 
     def _get_late_obj_selectivities(self, early_obj_dict):
 
@@ -188,7 +299,7 @@ class TamuraDynamics:
         return late_obj_dict
 
     @staticmethod
-    def _get_early_tau():
+    def _get_early_tau(n=None, rng=None):
         """
         The rise/fall of the early LTI system. Its distribution is found by manually fitting 
         the responses of the neurons most preferred object in Figure 3 and 4 of Tamura 2001. 
@@ -196,13 +307,11 @@ class TamuraDynamics:
         See dynamics_profile_fits.txt and tamura_profile_fits.py
         mean = 0.027, std = 0.0067
 
+        :param n: Number of neurons. Default = None, a single neuron.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return:
         """
-        t = 0
-        while t <= 0.0001:
-            t = np.random.normal(loc=0.027, scale=0.0067)
-
-        return t
+        return _get_positive_normal(loc=0.027, scale=0.0067, n=n, rng=rng)
 
     def _get_early_gain(self, r_obj, max_fr):
         """
@@ -213,73 +322,23 @@ class TamuraDynamics:
         # 0-140 ms window [Assuming no latency]. To get the raw fire rate we do r_obj*max_fr
         #
         # To ensure the two measures match up get the area under the curve of the LTI system
-        # and make sure it is the same as the average fire rate.
-
+        # and make sure it is the same as the average fire rate. The system is linear, so its
+        # response to a constant input is avg_rate times its unit step response.
         avg_rate = r_obj * max_fr
 
         time_arr = np.arange(0, 0.140, step=self.dt)
         input_arr = np.ones_like(time_arr) * avg_rate
 
-        early_a = 1 / self.early_tau * self.early_A
-        early_b = 1 / self.early_tau * self.early_B
-
-        # We have to determine this, for now just use a default value
-        default_gain = 1.0
-        early_c = np.array([default_gain, -default_gain])
-
-        lti_out_arr = np.zeros_like(input_arr)
-        for u_idx, u in enumerate(input_arr):
-
-            self.early_x[:, 0], y = integrate(
-                self.dt,
-                early_a,
-                early_b,
-                early_c,
-                self.early_x[:, 0],
-                u
-            )
-
-            lti_out_arr[u_idx] = np.maximum(0, y)
-
-        # clear_out the system
-        self.early_x[:, 0] = 0
-        # plt.plot(time_arr, lti_out_arr, linestyle='--')
-
-        # Integrate the output of the LTI system to get early_gain
-        area_lti = np.trapz(lti_out_arr, dx=self.dt)
+        area_lti = avg_rate * get_step_response_area(self.dt, self.early_tau, self.integration)
         area_desired = np.trapz(input_arr, dx=self.dt)
 
         early_gain = area_desired / area_lti
         # print("Early_gain", early_gain)
 
-        # # Debug make sure everything is making sense
-        # lti_out_arr = np.zeros_like(input_arr)
-        #
-        # early_c = np.array([early_gain, -early_gain])
-        #
-        # for u_idx, u in enumerate(input_arr):
-        #     self.early_x[:, 0], y = integrate(
-        #         self.dt,
-        #         early_a,
-        #         early_b,
-        #         early_c,
-        #         self.early_x[:, 0],
-        #         u
-        #     )
-        #
-        #     lti_out_arr[u_idx] = np.maximum(0, y)
-        #
-        # # clear_out the system
-        # self.early_x[:, 0] = 0
-        # plt.plot(time_arr, lti_out_arr)
-        #
-        # print("Area Under LTI system %0.4f" % np.trapz(lti_out_arr, dx=self.dt))
-        # print("Desired area %0.4f" % area_desired)
-
         return early_gain
 
     @staticmethod
-    def _get_late_tau():
+    def _get_late_tau(n=None, rng=None):
         """
         The rise/fall of the late LTI system. Its distribution is found by manually fitting 
         the responses of the neurons most preferred object in Figure 3 and 4 of Tamura 2001. 
@@ -287,19 +346,19 @@ class TamuraDynamics:
         See dynamics_profile_fits.txt and tamura_profile_fits.py
         mean = 0.0881, std = 0.0041
 
+        :param n: Number of neurons. Default = None, a single neuron.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return:
         """
-        t = 0
-        while t <= 0.0001:
-            t = np.random.normal(loc=0.0881, scale=0.0041)
+        return _get_positive_normal(loc=0.0881, scale=0.0041, n=n, rng=rng)
 
-        return t
-
-    def _get_late_gain_n_tau(self, r_obj, max_fr):
+    def _get_late_gain_n_tau(self, r_obj, max_fr, rng=None):
         """
 
         :param r_obj: late object preference
         :param max_fr:
+        :param rng: numpy RandomState to draw late taus from. Default=None, the global numpy
+                    random state.
         :return:
         """
         avg_rate = r_obj * max_fr
@@ -308,88 +367,38 @@ class TamuraDynamics:
         input_arr = np.ones_like(time_arr) * avg_rate
         area_desired = np.trapz(input_arr, dx=self.dt)
 
-        area_lti = 0
-
         late_gain = 0
         late_tau = 0.08  # doesnt matter
 
         if area_desired >= 0.001:
-            iteration = 0
-            while area_lti <= 0.001:
-                print("Iteration %i" % iteration)
-                iteration = iteration + 1
-                if iteration > 100:
-                    print self.get_ranked_object_list(self.late_obj_dict)
-                    raise Exception("Unable to generate late gains Desired LTI system area =%0.4f"
-                                    % area_desired)
-                # Use the same technique as we use to find the early gain, the area  in the
-                # [0 - 140]ms window should equal to the average firing rate of the neuron
-                #  = r_obj * max_fr. Here r_obj should be the late r_obj
-
-                # First get the ratio of late gains
-                late_tau = self._get_late_tau()
-
-                late_gain = 1.0
-                late_a = 1 / late_tau * self.late_A
-                late_b = 1 / late_tau * self.late_B
-
-                # We have to determine this, for now just use a default value
-                late_c = np.array([late_gain, - late_gain])
-
-                lti_out_arr = np.zeros_like(input_arr)
-                for u_idx, u in enumerate(input_arr):
-                    self.late_x[:, 0], y = integrate(
-                        self.dt,
-                        late_a,
-                        late_b,
-                        late_c,
-                        self.late_x[:, 0],
-                        u
-                    )
-
-                    lti_out_arr[u_idx] = np.maximum(0, y)
-
-                # clear_out the system
-                self.late_x[:, 0] = 0
-                # plt.plot(time_arr, lti_out_arr, linestyle='--')
-
-                # Integrate the output of the LTI system to get late gain. Values that would
-                # result in the same average fire rate as desired.
-                area_lti = np.trapz(lti_out_arr, dx=self.dt)
-                print("Area under LTI system %0.4f, Desired_area=%0.4f" % (area_lti, area_desired))
-
-            late_gain = area_desired / area_lti
-            # print("late_gain %0.4f" % late_gain)
+            # Use the same technique as we use to find the early gain, the area  in the
+            # [0 - 140]ms window should equal to the average firing rate of the neuron
+            #  = r_obj * max_fr. Here r_obj should be the late r_obj
+
+            # First get the ratio of late gains
+            late_tau = self._get_late_tau(rng=rng)
+
+            # Integrate the output of the LTI system to get late gain. Values that would
+            # result in the same average fire rate as desired. The area is linear in avg_rate,
+            # so any positive area gives the desired one.
+            area_lti = avg_rate * get_step_response_area(self.dt, late_tau, self.integration)
 
-            # Debug make sure everything is making sense
-            # lti_out_arr = np.zeros_like(input_arr)
-            # late_c = np.array([late_gain, - late_gain])
-            #
-            # for u_idx, u in enumerate(input_arr):
-            #     self.late_x[:, 0], y = integrate(
-            #         self.dt,
-            #         late_a,
-            #         late_b,
-            #         late_c,
-            #         self.late_x[:, 0],
-            #         u
-            #     )
-            #
-            #     lti_out_arr[u_idx] = np.maximum(0, y)
-            #
-            # # clear_out the system
-            # self.late_x[:, 0] = 0
-            # plt.plot(time_arr, lti_out_arr)
-            #
-            # print("Area Under LTI system %0.4f" % np.trapz(lti_out_arr, dx=self.dt))
-            # print("Desired area %0.4f" % area_desired)
+            if area_lti > 0:
+                late_gain = area_desired / area_lti
+            # print("late_gain %0.4f" % late_gain)
 
         return late_gain, late_tau
 
     @staticmethod
-    def get_late_additional_latency():
-        delay = np.random.normal(loc=27, scale=4.24)
-        return int(delay)
+    def get_late_additional_latency(n=None, rng=None):
+        if rng is None:
+            rng = np.random
+
+        delay = rng.normal(loc=27, scale=4.24, size=n)
+
+        if n is None:
+            return int(delay)
+        return delay.astype(int)
 
     def _get_lagged_rates(self, latencies):
         # get appropriately lagged rates for input to LTI dynamics
@@ -420,6 +429,26 @@ class TamuraDynamics:
         # run a single step of the LTI dynamics for each neuron
         y = np.zeros(self.n)
 
+        if self.integration == 'exact':
+            for ii in range(self.n):
+                self.early_x[:, ii], early_y = step_discrete(
+                    self.early_A_d,
+                    self.early_B_d,
+                    self.early_C,
+                    self.early_x[:, ii],
+                    early_u[ii])
+
+                self.late_x[:, ii], late_y = step_discrete(
+                    self.late_A_d,
+                    self.late_B_d,
+                    self.late_C,
+                    self.late_x[:, ii],
+                    late_u[ii])
+
+                y[ii] = np.maximum(0, early_y) + np.maximum(0, late_y)
+
+            return y
+
         for ii in range(self.n):
             early_a = 1 / self.early_tau * self.early_A
             early_b = 1 / self.early_tau * self.early_B
@@ -485,7 +514,278 @@ class TamuraDynamics:
         return self._step_dynamics(early_u, late_u)
 
 
+class TamuraPopulationDynamics:
+    """
+    Tamura dynamics of a population of neurons. Same model as TamuraDynamics, but parameters
+    and states of all neurons are stored as arrays and all neurons are advanced in a single
+    vectorized step.
+
+    Lagged inputs of all neurons are gathered from one shared (n x latency_steps) ring buffer.
+    Each neuron sees the buffer as if it had the length of its own TamuraDynamics memory
+    (int(max_latency / dt) + 1 + late_additional_latency) so that the returned rates are the
+    same as those of the individual profiles.
+    """
+    def __init__(
+            self,
+            dt,
+            early_tau,
+            early_gain,
+            late_tau,
+            late_gain,
+            min_latencies,
+            max_latencies,
+            tau_latencies,
+            late_additional_latency,
+            max_latency=0.25,
+            integration='euler'):
+        """
+        All parameters, except dt, max_latency and integration, are arrays with one entry per
+        neuron. See TamuraDynamics for a description of each parameter.
+
+        :param dt           : Simulation time step in seconds.
+        :param max_latency  : maximum response latency of the neurons. Default = 0.25s
+        :param integration  : Stepping method of the LTI systems. Allowed types
+                              {'euler'(Default), 'exact'}.
+        """
+        self.dt = dt
+        self.type = 'tamura'
+        self.max_latency = max_latency
+
+        if integration not in ('euler', 'exact'):
+            raise Exception("Invalid integration method %s" % integration)
+        self.integration = integration
+
+        self.early_tau = np.asarray(early_tau, dtype=float)
+        self.early_gain = np.asarray(early_gain, dtype=float)
+        self.late_tau = np.asarray(late_tau, dtype=float)
+        self.late_gain = np.asarray(late_gain, dtype=float)
+
+        self.min_latencies = np.asarray(min_latencies, dtype=float)
+        self.max_latencies = np.asarray(max_latencies, dtype=float)
+        self.tau_latencies = np.asarray(tau_latencies, dtype=float)
+        self.late_additional_latency = np.asarray(late_additional_latency, dtype=int)
+
+        self.n = self.early_tau.shape[0]
+
+        # Discrete systems of all neurons (see discretize). Each step is then an affine update.
+        if self.integration == 'exact':
+            self.early_A_d, self.early_B_d = discretize(self.dt, self.early_tau)
+            self.late_A_d, self.late_B_d = discretize(self.dt, self.late_tau)
+
+        # state of LTI (linear time-invariant) dynamical systems of all neurons
+        self.early_x = np.zeros((2, self.n))
+        self.late_x = np.zeros((2, self.n))
+
+        # Memory length of each neuron and of the shared ring buffer
+        self.memory_steps = int(max_latency / dt) + 1 + self.late_additional_latency
+        latency_steps = np.max(self.memory_steps)
+
+        self.early_memory = np.zeros((self.n, latency_steps))
+        self.late_memory = np.zeros((self.n, latency_steps))
+        self.memory_index = 0
+
+        self._neuron_idx = np.arange(self.n)
+
+    @classmethod
+    def from_profiles(cls, profiles):
+        """
+        Create population dynamics from a list of TamuraDynamics profiles. The population starts
+        at rest, states and input histories of the profiles are not copied.
+
+        :param profiles: list of TamuraDynamics instances with the same time step and
+                         integration method.
+        """
+        dt = profiles[0].dt
+        if any(profile.dt != dt for profile in profiles):
+            raise Exception("Dynamic profiles have different time steps")
+
+        integration = profiles[0].integration
+        if any(profile.integration != integration for profile in profiles):
+            raise Exception("Dynamic profiles have different integration methods")
+
+        return cls(
+            dt,
+            early_tau=[profile.early_tau for profile in profiles],
+            early_gain=[profile.early_gain for profile in profiles],
+            late_tau=[profile.late_tau for profile in profiles],
+            late_gain=[profile.late_gain for profile in profiles],
+            min_latencies=[profile.min_latencies[0] for profile in profiles],
+            max_latencies=[profile.max_latencies[0] for profile in profiles],
+            tau_latencies=[profile.tau_latencies[0] for profile in profiles],
+            late_additional_latency=[profile.late_additional_latency for profile in profiles],
+            # max_latency is not stored by TamuraDynamics, recover it from its memory length
+            max_latency=(profiles[0].early_memory.shape[1] - 1 -
+                         profiles[0].late_additional_latency) * dt,
+            integration=integration)
+
+    @classmethod
+    def sample(
+            cls, dt, obj_pref, max_fire_rate, max_latency=0.25, integration='euler', rng=None):
+        """
+        Create population dynamics with parameters drawn from the same distributions as
+        TamuraDynamics, one vectorized draw per distribution.
+
+        :param dt           : Simulation time step in seconds.
+        :param obj_pref     : (n x n_objects) array of (early) object preferences of the neurons.
+        :param max_fire_rate: array of maximum firing rates of the neurons (n).
+        :param max_latency  : maximum response latency of the neurons. Default = 0.25s
+        :param integration  : Stepping method of the LTI systems. {'euler'(Default), 'exact'}
+        :param rng          : numpy RandomState to draw from. Default=None, the global numpy
+                              random state.
+
+        :return: (population dynamics, late object preferences (n x n_objects))
+        """
+        obj_pref = np.asarray(obj_pref, dtype=float)
+        max_fire_rate = np.asarray(max_fire_rate, dtype=float)
+        n = obj_pref.shape[0]
+
+        transience = TamuraDynamics._get_transience(n, rng=rng)
+        late_obj_pref = \
+            obj_pref * (1 - transience[:, np.newaxis]) / (1 + transience[:, np.newaxis])
+
+        # Desired areas in the [0 - 140]ms window. See TamuraDynamics._get_early_gain.
+        time_arr = np.arange(0, 0.140, step=dt)
+
+        early_avg_rate = np.max(obj_pref, axis=1) * max_fire_rate
+        early_area_desired = \
+            np.trapz(np.ones_like(time_arr) * early_avg_rate[:, np.newaxis], dx=dt, axis=1)
+
+        early_tau = TamuraDynamics._get_early_tau(n, rng=rng)
+        early_gain = early_area_desired / \
+            (early_avg_rate * get_step_response_area(dt, early_tau, integration))
+
+        # Late gains and taus. See TamuraDynamics._get_late_gain_n_tau.
+        late_avg_rate = np.max(late_obj_pref, axis=1) * max_fire_rate
+        late_area_desired = \
+            np.trapz(np.ones_like(time_arr) * late_avg_rate[:, np.newaxis], dx=dt, axis=1)
+
+        late_tau = np.ones(n) * 0.08  # doesnt matter for neurons without a late response
+        late_gain = np.zeros(n)
+        late_area_lti = np.zeros(n)
+
+        active = late_area_desired >= 0.001
+
+        late_tau[active] = TamuraDynamics._get_late_tau(np.count_nonzero(active), rng=rng)
+        late_area_lti[active] = late_avg_rate[active] * \
+            get_step_response_area(dt, late_tau[active], integration)
+
+        active = active & (late_area_lti > 0)
+        late_gain[active] = late_area_desired[active] / late_area_lti[active]
+
+        min_latencies, max_latencies, tau_latencies = \
+            TamuraDynamics._get_latency_parameters(n, max_latency, rng=rng)
+
+        dynamics = cls(
+            dt,
+            early_tau=early_tau,
+            early_gain=early_gain,
+            late_tau=late_tau,
+            late_gain=late_gain,
+            min_latencies=min_latencies,
+            max_latencies=max_latencies,
+            tau_latencies=tau_latencies,
+            late_additional_latency=TamuraDynamics.get_late_additional_latency(n, rng=rng),
+            max_latency=max_latency,
+            integration=integration)
+
+        return dynamics, late_obj_pref
+
+    def _get_latencies(self, static_rates):
+        # latency varies with response strength
+        return self.min_latencies + \
+            (self.max_latencies - self.min_latencies) * np.exp(
+                -static_rates / self.tau_latencies)
+
+    def _get_index(self, lag_steps):
+        # A lag of a full neuron memory wraps around to the current input, as in TamuraDynamics
+        lag_steps = np.mod(np.minimum(lag_steps, self.memory_steps), self.memory_steps)
+        return np.mod(self.memory_index - lag_steps, self.early_memory.shape[1])
+
+    def _get_lagged_rates(self, latencies):
+        # get appropriately lagged rates for input to LTI dynamics
+        latency_steps = np.rint(latencies / self.dt).astype('int')
+
+        early_indices = self._get_index(latency_steps)
+        late_indices = self._get_index(latency_steps + self.late_additional_latency)
+
+        early_u = self.early_memory[self._neuron_idx, early_indices]
+        late_u = self.late_memory[self._neuron_idx, late_indices]
+
+        return early_u, late_u
+
+    @staticmethod
+    def _integrate(dt, tau, gain, x, u):
+        """
+        Euler integration of the state-space equations of all neurons. Expanded form of
+        integrate() with A = 1/tau * [[-1, 0], [1, -1]], B = 1/tau * [1, 0] and
+        C = [gain, -gain].
+
+        :return: (x, y), i.e. the states (2 x n) and the outputs (n)
+        """
+        inv_tau = 1 / tau
+
+        dxdt = np.array([-inv_tau * x[0] + inv_tau * u,
+                         inv_tau * x[0] - inv_tau * x[1]])
+        x = x + dxdt * dt
+        y = gain * x[0] - gain * x[1]
+
+        return x, y
+
+    @staticmethod
+    def _step_discrete(a_d, b_d, gain, x, u):
+        """
+        Single step of the discretized systems of all neurons. Expanded form of step_discrete()
+        with the lower triangular a_d of discretize().
+
+        :return: (x, y), i.e. the states (2 x n) and the outputs (n)
+        """
+        x = np.array([a_d[0, 0] * x[0] + b_d[0] * u,
+                      a_d[1, 0] * x[0] + a_d[1, 1] * x[1] + b_d[1] * u])
+        y = gain * x[0] - gain * x[1]
+
+        return x, y
+
+    def _step_dynamics(self, early_u, late_u):
+        # run a single step of the LTI dynamics for all neurons
+        if self.integration == 'exact':
+            self.early_x, early_y = self._step_discrete(
+                self.early_A_d, self.early_B_d, self.early_gain, self.early_x, early_u)
+
+            self.late_x, late_y = self._step_discrete(
+                self.late_A_d, self.late_B_d, self.late_gain, self.late_x, late_u)
+
+        else:
+            self.early_x, early_y = self._integrate(
+                self.dt, self.early_tau, self.early_gain, self.early_x, early_u)
+
+            self.late_x, late_y = self._integrate(
+                self.dt, self.late_tau, self.late_gain, self.late_x, late_u)
+
+        return np.maximum(0, early_y) + np.maximum(0, late_y)
+
+    def get_dynamic_rates(self, early_rates, late_rates):
+        """
+        :param early_rates: Static rates of all neurons with early selectivity (n)
+        :param late_rates: Static rates of all neurons with late selectivity (n)
+        :return: Spike rates of all neurons with latency and early and late dynamics (n)
+        """
+        self.early_memory[:, self.memory_index] = early_rates
+        self.late_memory[:, self.memory_index] = late_rates
+
+        latencies = self._get_latencies(early_rates)
+
+        early_u, late_u = self._get_lagged_rates(latencies)
+
+        self.memory_index += 1
+        if self.memory_index == self.early_memory.shape[1]:
+            self.memory_index = 0
+
+        return self._step_dynamics(early_u, late_u)
+
+
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
     time_step = .005
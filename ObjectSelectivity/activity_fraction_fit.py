@@ -6,11 +6,10 @@ Created on Fri May 15 16:44:45 2015
 """
 
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
 
 
-def get_activity_fraction_sparseness(n=1):
+def get_activity_fraction_sparseness(n=1, rng=None):
     """
     Generate a population level distribution of object selectivity.
 
@@ -31,12 +30,18 @@ def get_activity_fraction_sparseness(n=1):
     this as a simple uniform distribution.
 
     :param n: size of population. Default=1.
+    :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
     :rtype : sparseness (activity fraction) metrics of size n.
     """
-    return np.random.uniform(size=n)
+    if rng is None:
+        rng = np.random
+
+    return rng.uniform(size=n)
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
 
@@ -65,26 +65,19 @@ sample_size = 10000
 selectivity_arr = selectivity_distribution.get_activity_fraction_sparseness(sample_size)
 # plt.hist(selectivity_arr, bins = np.arange(1, step=0.1))
 
-position_profiles = []
-size_profiles = []
-
-for index in np.arange(sample_size):
-
-    current_position_profile = gpt.GaussianPositionProfile(selectivity_arr[index])
-
-    position_profiles.append(current_position_profile)
-
-    size_profiles.append(lst.LogNormalSizeProfile(current_position_profile.position_tolerance))
-
+rf_centers, position_tolerances = gpt.GaussianPositionProfile.sample_parameters(selectivity_arr)
+pref_sizes, size_bws = lst.LogNormalSizeProfile.sample_parameters(position_tolerances)
 
 # Stimuli at position (0, 0)
-position_samples = [profile.firing_rate_modifier(0, 0) for profile in position_profiles]
+position_samples = gpt.GaussianPositionProfile.get_firing_rate_modifiers(
+    rf_centers, position_tolerances, 0, 0)
 plt.figure('Position Samples')
 plt.title("Distribution of position scale parameters")
 plt.hist(position_samples, bins=np.arange(1, step=0.1))
 
 # Stimuli of size 7
-size_samples = [profile.firing_rate_modifier(7 * np.pi / 180.0) for profile in size_profiles]
+size_samples = lst.LogNormalSizeProfile.get_firing_rate_modifiers(
+    pref_sizes, size_bws, 7 * np.pi / 180.0)
 plt.figure('Size Samples')
 plt.title("Distribution of size scale parameters")
 plt.hist(size_samples, bins=np.arange(1, step=0.1))
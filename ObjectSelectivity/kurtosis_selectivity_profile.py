@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
-import matplotlib.pyplot as plt
 from scipy.stats import gamma
 
 from power_law_selectivity_profile import calculate_activity_fraction
@@ -9,7 +8,7 @@ from power_law_selectivity_profile import calculate_activity_fraction
 __author__ = 'bptripp'
 
 
-def calculate_kurtosis(rates_per_object):
+def calculate_kurtosis(rates_per_object, axis=0):
     """
     Given an array of firing rates of the neuron to objects, return the sparseness metric
     Kurtosis (actually excess kurtosis) of the neuron as defined in:
@@ -22,16 +21,19 @@ def calculate_kurtosis(rates_per_object):
     Kurtosis  =  (sum (Ri - Rmean)**4 / (n*sigma**4)) - 3
 
     :param rates_per_object: array of firing rates of the neuron to multiple objects.
+    :param axis: axis along objects. Default = 0. For 2D arrays, the kurtosis of each
+                 row (axis=1) or column (axis=0) is returned.
     :return: kurtosis sparseness.
 
     This is defined outside the class as it is used by other selectivity profiles.
     """
-    n = np.float(rates_per_object.shape[0])
+    n = np.float(rates_per_object.shape[axis])
 
-    rates_mean = np.mean(rates_per_object)
-    rates_sigma = np.std(rates_per_object)
+    rates_mean = np.mean(rates_per_object, axis=axis, keepdims=True)
+    rates_sigma = np.std(rates_per_object, axis=axis)
 
-    kurtosis = np.sum((rates_per_object - rates_mean)**4) / (n * rates_sigma**4) - 3
+    kurtosis = \
+        np.sum((rates_per_object - rates_mean)**4, axis=axis) / (n * rates_sigma**4) - 3
 
     # kurtosis2= np.sum((rates_per_object - rates_mean)**4) / n \
     #            / (np.sum((rates_per_object - rates_mean)**2) / n)** 2 - 3
@@ -39,8 +41,25 @@ def calculate_kurtosis(rates_per_object):
     return kurtosis
 
 
+def get_gamma_activity_fraction(a):
+    """
+    Activity fraction of a neuron whose firing rates over all objects follow a gamma
+    distribution with shape parameter a. The scale parameter cancels out.
+
+    For an infinite set of objects, activity_fraction = 1 - E[R]^2 / E[R^2]
+    (see calculate_activity_fraction). For a gamma distribution with shape a and scale b,
+    E[R] = a*b and E[R^2] = a*(a + 1)*b^2, so that
+
+        activity_fraction = 1 - a / (a + 1) = 1 / (a + 1)
+
+    :param a: shape parameter(s) of the gamma distribution. Scalar or array.
+    :return: activity fraction(s), same shape as a.
+    """
+    return 1.0 / (np.asarray(a, dtype=float) + 1)
+
+
 class KurtosisSparseness:
-    def __init__(self, list_of_objects):
+    def __init__(self, list_of_objects, rng=None):
         """
         A statistical model of selectivity & max spike rate distribution based on:
 
@@ -64,14 +83,20 @@ class KurtosisSparseness:
 
         Additionally a function is provided to get the max firing rate of the neuron. Once
         parameters of the gamma distribution over the objects is calculated, we take the point at
-        which the CDF = 0.99 as the maximum.
+        which the CDF = 0.99 as the maximum. It is calculated once, when the profile is created.
+
+        :param list_of_objects: list of objects the neuron responds to.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         """
         self.type = 'kurtosis'
 
-        self.a = self.__get_distribution_shape_parameter()
-        self.b = self.__get_distribution_scale_parameter()
+        self.a = self.__get_distribution_shape_parameter(rng=rng)
+        self.b = self.__get_distribution_scale_parameter(rng=rng)
+
+        self.__max_firing_rate = gamma.ppf(0.99, self.a, scale=self.b, loc=0)
 
-        obj_preferences = gamma.rvs(self.a, loc=0, scale=self.b, size=len(list_of_objects))
+        obj_preferences = gamma.rvs(
+            self.a, loc=0, scale=self.b, size=len(list_of_objects), random_state=rng)
         obj_preferences = obj_preferences / self.get_max_firing_rate()
 
         self.objects = {item: obj_preferences[item_idx]
@@ -85,39 +110,66 @@ class KurtosisSparseness:
             calculate_activity_fraction(np.array(self.objects.values()))
 
         # To calculate absolute activity fraction, the stimuli set consists of all objects the
-        # neuron responds. Model this by getting firing rates distributed over the entire cdf
-        #  with a small step
-        rates_distribution_for_cdf = np.linspace(start=0, stop=1, num=1000, endpoint=False)
-        rates_all_obj = self.__get_object_preference(rates_distribution_for_cdf)
-
-        self.activity_fraction_absolute = \
-            calculate_activity_fraction(rates_all_obj)
+        # neuron responds to, i.e. the entire gamma distribution of rates.
+        self.activity_fraction_absolute = get_gamma_activity_fraction(self.a)
 
         # Calculate the excess kurtosis of the neuron
         self.kurtosis_absolute = 6.0 / self.a
         self.kurtosis_measured = calculate_kurtosis(np.array(self.objects.values()))
 
     @staticmethod
-    def __get_distribution_shape_parameter():
+    def sample_parameters(n, n_objects, rng=None):
+        """
+        Generate object preferences of a population of n neurons, one vectorized draw per
+        distribution.
+
+        :param n: Number of neurons.
+        :param n_objects: Number of objects.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :rtype : (object preferences (n x n_objects), absolute activity fractions (n),
+                  max firing rates (n))
+        """
+        a = KurtosisSparseness.__get_distribution_shape_parameter(n, rng=rng)
+        b = KurtosisSparseness.__get_distribution_scale_parameter(n, rng=rng)
+
+        max_fire_rate = gamma.ppf(0.99, a, scale=b, loc=0)
+
+        obj_pref = gamma.rvs(
+            a[:, np.newaxis],
+            loc=0,
+            scale=b[:, np.newaxis],
+            size=(n, n_objects),
+            random_state=rng)
+        obj_pref = obj_pref / max_fire_rate[:, np.newaxis]
+
+        return obj_pref, get_gamma_activity_fraction(a), max_fire_rate
+
+    @staticmethod
+    def __get_distribution_shape_parameter(n=None, rng=None):
         """
         Get sample shape parameter for the gamma distribution of firing rates over objects.
         See derivation in kurtosis_fit.py.
 
+        :param n: Number of parameters to generate. Default = None, a single parameter.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :rtype : shape parameter.
         """
-        shape_param = np.float(gamma.rvs(4.0, scale=0.5, loc=0, size=1))
+        shape_param = gamma.rvs(4.0, scale=0.5, loc=0, size=n, random_state=rng)
 
         return np.maximum(1.01, shape_param)  # Avoid making PDF go to infinity at zero spike rate.
 
     @staticmethod
-    def __get_distribution_scale_parameter():
+    def __get_distribution_scale_parameter(n=None, rng=None):
         """
         Get sample shape parameter for the gamma distribution of firing rate over objects.
         See derivation in kurtosis_fit.py.
 
+        :param n: Number of parameters to generate. Default = None, a single parameter.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :rtype : scale parameter.
         """
-        return np.float(gamma.rvs(37.4292, scale=0.062, loc=0, size=1))
+        return gamma.rvs(37.4292, scale=0.062, loc=0, size=n, random_state=rng)
 
     def __get_object_preference(self, cdf_loc):
         """
@@ -136,7 +188,7 @@ class KurtosisSparseness:
 
         :return: maximum firing rate of the neuron.
         """
-        return gamma.ppf(0.99, self.a, scale=self.b, loc=0)
+        return self.__max_firing_rate
 
     def get_ranked_object_list(self):
         """ Return neurons rank list of objects and rate modification factors """
@@ -163,6 +215,8 @@ class KurtosisSparseness:
         """ Plot Neurons Object Preferences
         :param axis: axis to plot in. [default=None]
         """
+        import matplotlib.pyplot as plt
+
         lst = self.get_ranked_object_list()
         objects, rate = zip(*lst)
         x = np.arange(len(rate))
@@ -207,6 +261,8 @@ class KurtosisSparseness:
 
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
     obj_list = ['car',
@@ -6,12 +6,10 @@ Created on Fri September 11 9:26:45 2015
 """
 
 import activity_fraction_fit as selectivity_fit
-import random
 import numpy as np
-import matplotlib.pyplot as plt
 
 
-def calculate_activity_fraction(rates_per_object):
+def calculate_activity_fraction(rates_per_object, axis=0):
     """
     Given an array of firing rates of the neuron to objects, return the sparseness metric
     activity fraction of the neuron as defined in
@@ -30,22 +28,24 @@ def calculate_activity_fraction(rates_per_object):
     J Neurophysiology 73: 713–726, 1995.
 
     :param rates_per_object: array of firing rates of the neuron to multiple objects.
+    :param axis: axis along objects. Default = 0. For 2D arrays, the activity fraction of each
+                 row (axis=1) or column (axis=0) is returned.
     :return: activity fraction sparseness. Ranges from 0 (low selectivity) to 1(high selectivity).
 
     This is defined outside the class as it is used by other selectivity profiles.
     """
-    n = rates_per_object.shape[0]
+    n = rates_per_object.shape[axis]
 
     rates_square = rates_per_object ** 2
 
     activity_fraction = n / (n - 1) * \
-                        (1 - ((rates_per_object.sum() / n) ** 2 / (rates_square.sum() / n)))
+        (1 - ((rates_per_object.sum(axis=axis) / n) ** 2 / (rates_square.sum(axis=axis) / n)))
 
     return activity_fraction
 
 
 class PowerLawSparseness:
-    def __init__(self, list_of_objects):
+    def __init__(self, list_of_objects, rng=None):
         """
         Models object selectivity as a power law over sparseness defined as the
         activity fraction.
@@ -57,16 +57,21 @@ class PowerLawSparseness:
 
         REF: Zoccolan et. al. - 2007 - Trade-Off between Object Selectivity and Tolerance in Monkey
         Inferotemporal Cortex.
+
+        :param list_of_objects: list of objects the neuron responds to. Shuffled in place.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         """
+        if rng is None:
+            rng = np.random
 
         self.type = 'power_law'
 
         # Absolute activity fraction if all rates for all objects the neuron responds
         # are included.
         self.activity_fraction_absolute = \
-            np.float(selectivity_fit.get_activity_fraction_sparseness(1))
+            np.float(selectivity_fit.get_activity_fraction_sparseness(1, rng=rng))
 
-        random.shuffle(list_of_objects)  # Randomize (in place) objects the neuron responds to.
+        rng.shuffle(list_of_objects)  # Randomize (in place) objects the neuron responds to.
 
         self.objects = self.__power_law_selectivity(list_of_objects)
 
@@ -75,6 +80,31 @@ class PowerLawSparseness:
         self.activity_fraction_measured = \
             calculate_activity_fraction(np.array(self.objects.values()))
 
+    @staticmethod
+    def sample_parameters(n, n_objects, rng=None):
+        """
+        Generate object preferences of a population of n neurons, one vectorized draw per
+        distribution. Each neuron ranks objects in an independent random order.
+
+        :param n: Number of neurons.
+        :param n_objects: Number of objects.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :rtype : (object preferences (n x n_objects), absolute activity fractions (n))
+        """
+        if rng is None:
+            rng = np.random
+
+        activity_fraction_absolute = np.asarray(
+            selectivity_fit.get_activity_fraction_sparseness(n, rng=rng), dtype=float)
+
+        # Rank of each object, a random permutation of 1..n_objects for each neuron.
+        ranks = np.argsort(np.argsort(rng.uniform(size=(n, n_objects)), axis=1), axis=1) + 1
+
+        obj_pref = np.power(ranks.astype(float), -activity_fraction_absolute[:, np.newaxis])
+
+        return obj_pref, activity_fraction_absolute
+
     def __power_law_selectivity(self, ranked_obj_list):
         """
         Object preference normalized rate (rate modifier) modeled as a power law distribution.
@@ -113,6 +143,8 @@ class PowerLawSparseness:
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
     obj_list = ['car',
@@ -24,21 +24,8 @@ def get_average_selectivity_and_sparseness(r_mat):
     :param r_mat: n_neurons x n_objects
     :return: avg neuron selectivity, avg population sparseness
     """
-    # Single Neuron selectivities
-    n_neurons = r_mat.shape[0]
-    n_objs = r_mat.shape[1]
-
-    selectivities = np.zeros(n_neurons)
-    sparsenesses = np.zeros(n_objs)
-
-    for n_idx in np.arange(n_neurons):
-        rates = r_mat[n_idx, :]
-        selectivities[n_idx] = calculate_kurtosis(rates)
-
-    # Population sparseness
-    for o_idx in np.arange(n_objs):
-        rates = r_mat[:, o_idx]
-        sparsenesses[o_idx] = calculate_kurtosis(rates)
+    selectivities = calculate_kurtosis(r_mat, axis=1)  # Single Neuron selectivities
+    sparsenesses = calculate_kurtosis(r_mat, axis=0)  # Population sparseness
 
     return np.nanmean(selectivities), np.mean(sparsenesses)
 
@@ -47,20 +34,8 @@ def plot_selectivity_and_sparseness(r_mat, font_size=50):
 
     f, ax_arr = plt.subplots(2, 1, sharex=True)
 
-    # Single Neuron selectivities
-    n_neurons = r_mat.shape[0]
-    n_objs = r_mat.shape[1]
-
-    selectivities = np.zeros(n_neurons)
-    sparsenesses = np.zeros(n_objs)
-
-    for n_idx in np.arange(n_neurons):
-        rates = r_mat[n_idx, :]
-        selectivities[n_idx] = calculate_kurtosis(rates)
-
-    for o_idx in np.arange(n_objs):
-        rates = r_mat[:, o_idx]
-        sparsenesses[o_idx] = calculate_kurtosis(rates)
+    selectivities = calculate_kurtosis(r_mat, axis=1)  # Single Neuron selectivities
+    sparsenesses = calculate_kurtosis(r_mat, axis=0)  # Population sparseness
 
     # Plot selectivities ------------------------------------------------
     ax_arr[0].hist(selectivities, bins=np.arange(0, 100, step=1))
@@ -132,32 +107,33 @@ def get_scale_factors_from_model(n_samples):
     :return:
 
     """
-    factors = np.zeros(shape=n_samples)
-
-    for ii in np.arange(n_samples):
+    # The gaussian position profile expects activity fraction as input. This is used to
+    # determine it position tolerance.
+    #
+    # [Zoccolan et al. 2007] found a wide range of activity fraction selectivity
+    # (mean +-SD = 0.4+-0.22). and activity fraction selectivity ranged between 0.05 and 0.95.
+    # Figure 5b plots a histogram of the observed selectivity. The histogram is essentially
+    # flat(similar frequencies within the range 0.1 and 0.7). Values above/below this range
+    # rare. We use a uniform distribution over this high frequency range to model
+    #  activity fraction selectivity
+    selectivity = np.random.uniform(0.1, 0.7, size=n_samples)
 
-        # The gaussian position profile expects activity fraction as input. This is used to
-        # determine it position tolerance.
-        #
-        # [Zoccolan et al. 2007] found a wide range of activity fraction selectivity
-        # (mean +-SD = 0.4+-0.22). and activity fraction selectivity ranged between 0.05 and 0.95.
-        # Figure 5b plots a histogram of the observed selectivity. The histogram is essentially 
-        # flat(similar frequencies within the range 0.1 and 0.7). Values above/below this range 
-        # rare. We use a uniform distribution over this high frequency range to model
-        #  activity fraction selectivity
+    rf_centers, position_tolerances = gpp.GaussianPositionProfile.sample_parameters(selectivity)
+    pref_sizes, size_bws = lnsp.LogNormalSizeProfile.sample_parameters(position_tolerances)
 
-        position = gpp.GaussianPositionProfile(np.random.uniform(0.1, 0.7))
-        size = lnsp.LogNormalSizeProfile(position.position_tolerance)
+    position_factors = gpp.GaussianPositionProfile.get_firing_rate_modifiers(
+        rf_centers, position_tolerances, 0, 0)
+    size_factors = lnsp.LogNormalSizeProfile.get_firing_rate_modifiers(
+        pref_sizes, size_bws, 7 * np.pi / 180.0)
 
-        # Both
-        factors[ii] = position.firing_rate_modifier(0, 0) * \
-            size.firing_rate_modifier(7 * np.pi / 180.0)
+    # Both
+    factors = position_factors * size_factors
 
-        # Position Only
-        # factors[ii] = position.firing_rate_modifier(0, 0)
+    # Position Only
+    # factors = position_factors
 
-        # Size only
-        # factors[ii] = size.firing_rate_modifier(7 * np.pi / 180.0)
+    # Size only
+    # factors = size_factors
 
     # plt.hist(factors)
     # print("Factors average %0.4f, var %0.4f" % (np.mean(factors), np.var(factors)))
@@ -166,12 +142,59 @@ def get_scale_factors_from_model(n_samples):
     return factors
 
 
-def get_lehky_sample_rates(n_neurons, n_objs):
+def generate_gamma_rates(a_arr, b_arr, n_objs, chunk_size=10000):
+    """
+    Generator of sample rates of neurons whose rates over objects are gamma distributed. Yields
+    (chunk neurons x n_objs) blocks of rates, drawn with one vectorized gamma draw per block.
+
+    :param a_arr: shape parameters of the rate distributions, one for each neuron.
+    :param b_arr: scale parameters of the rate distributions, one for each neuron.
+    :param n_objs: Number of objects.
+    :param chunk_size: Maximum number of neurons per block. Default = 10000.
+    """
+    n_neurons = len(a_arr)
+
+    for start in np.arange(0, n_neurons, chunk_size):
+        stop = min(start + chunk_size, n_neurons)
+
+        yield gamma.rvs(
+            a=a_arr[start:stop, np.newaxis],
+            loc=0,
+            scale=b_arr[start:stop, np.newaxis],
+            size=(stop - start, n_objs))
+
+
+def fill_rates_mat(rate_chunks, n_neurons, n_objs, out=None):
+    """
+    Write blocks of rates (see generate_gamma_rates) into a rates matrix.
+
+    :param rate_chunks: iterable of (chunk neurons x n_objs) blocks of rates.
+    :param n_neurons: Total number of neurons of all blocks.
+    :param n_objs: Number of objects.
+    :param out: (n_neurons x n_objs) array to write to. Default = None, a new array. Can be a
+                memory mapped array, e.g. np.lib.format.open_memmap(file_name, mode='w+',
+                dtype=float, shape=(n_neurons, n_objs)), to avoid holding all rates in memory.
+    :return: rates matrix (out).
+    """
+    if out is None:
+        out = np.zeros(shape=(n_neurons, n_objs))
+
+    start = 0
+    for chunk in rate_chunks:
+        out[start:start + chunk.shape[0], :] = chunk
+        start += chunk.shape[0]
+
+    return out
+
+
+def get_lehky_sample_rates(n_neurons, n_objs, out=None, chunk_size=10000):
     """
     Same as  LehkySparseness.get_sample_profile_and_rates_mat but using original Lehky variables
 
     :param n_neurons:
     :param n_objs:
+    :param out: array to write the rates to. See fill_rates_mat. Default = None.
+    :param chunk_size: Number of neurons whose rates are drawn at once. Default = 10000.
     :return:
     """
 
@@ -184,14 +207,9 @@ def get_lehky_sample_rates(n_neurons, n_objs):
     a_arr = np.random.gamma(ala, scale=bla, size=n_neurons)
     b_arr = np.random.gamma(alb, scale=blb, size=n_neurons)
 
-    r_mat = np.zeros(shape=(n_neurons, n_objs))
-
     # Create sample rates to all objects for each neuron
-    for n_idx in np.arange(n_neurons):
-        r_mat[n_idx, :] = \
-            gamma.rvs(a=a_arr[n_idx], loc=0, scale=b_arr[n_idx], size=n_objs)
-
-    return r_mat
+    return fill_rates_mat(
+        generate_gamma_rates(a_arr, b_arr, n_objs, chunk_size), n_neurons, n_objs, out)
 
 
 class LehkySparseness:
@@ -290,20 +308,25 @@ class LehkySparseness:
 
         return gamma.ppf(.99, a, loc=0, scale=b)
 
-    def get_sample_profile_and_rates_mat(self, n_neurons, n_objs):
-
+    def generate_sample_rates(self, n_neurons, n_objs, chunk_size=10000):
+        """
+        Create n_neurons sample profiles and return a generator of their rates to all objects,
+        in (chunk_size x n_objs) blocks. See generate_gamma_rates.
+        """
         # Create sample profiles
         a_arr = np.random.gamma(self._afa, scale=self._bfa, size=n_neurons)
         b_arr = np.random.gamma(self._afb, scale=self._bfb, size=n_neurons)
 
-        r_mat = np.zeros(shape=(n_neurons, n_objs))
+        return generate_gamma_rates(a_arr, b_arr, n_objs, chunk_size)
 
-        # Create sample rates to all objects for each neuron
-        for n_idx in np.arange(n_neurons):
-            r_mat[n_idx, :] = \
-                gamma.rvs(a=a_arr[n_idx], loc=0, scale=b_arr[n_idx], size=n_objs)
-
-        return r_mat
+    def get_sample_profile_and_rates_mat(self, n_neurons, n_objs, out=None, chunk_size=10000):
+        """
+        :param out: array to write the rates to. See fill_rates_mat. Default = None.
+        :param chunk_size: Number of neurons whose rates are drawn at once. Default = 10000.
+        :return: (n_neurons x n_objs) rates matrix.
+        """
+        return fill_rates_mat(
+            self.generate_sample_rates(n_neurons, n_objs, chunk_size), n_neurons, n_objs, out)
 
     @property
     def bfb(self):
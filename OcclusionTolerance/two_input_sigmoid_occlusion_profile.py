@@ -1,9 +1,24 @@
 
+import os
 import numpy as np
-import matplotlib.pyplot as plt
 import scipy.optimize as so
-from mpl_toolkits.mplot3d import proj3d
-from matplotlib import cm
+from scipy.interpolate import RegularGridInterpolator
+
+# Precomputed solutions of (w_combine, bias, ratio) -> (w_d, w_nd). See get_weights_table.
+# The grid covers +-3 sigma of the combined weight and bias distributions. The ratio axis is
+# sampled in sqrt(ratio), w_d - w_nd grows with sqrt(ratio) near 0.
+WEIGHTS_TABLE_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'two_input_sigmoid_weights_table.npz')
+
+WEIGHTS_TABLE_W_COMBINE = np.linspace(0, 16, num=33)
+WEIGHTS_TABLE_BIAS = np.linspace(-6.5, -0.75, num=24)
+WEIGHTS_TABLE_SQRT_RATIO = np.linspace(0, 1, num=21)
+
+# High ratios (above ~0.75) cannot be generated with any combined weight and bias. If no valid
+# weights are found after this many combined weights and biases, the ratio is also redrawn.
+MAX_ITERATIONS_PER_RATIO = 10
+
+_weights_table = None
 
 
 def sigmoid(x, w, b):
@@ -16,9 +31,138 @@ def sigmoid(x, w, b):
     return 1 / (1 + np.exp(-(np.dot(x, w) + b)))
 
 
+def build_weights_table(file_name=WEIGHTS_TABLE_FILE):
+    """
+    Solve for diagnostic and nondiagnostic weights at every point of the
+    (w_combine, bias, sqrt(ratio)) grid with scipy.optimize.fsolve, the same way as individual
+    profiles, and save the solutions to file_name.
+
+    Only w_d is stored, w_nd = w_combine - w_d. Grid points where fsolve did not converge or
+    weights are negative are marked as invalid.
+
+    :param file_name: Where to store the table. Default = WEIGHTS_TABLE_FILE. If None, the
+                      table is not saved.
+
+    :return: dictionary of table arrays {w_combine, bias, sqrt_ratio, w_d, valid}
+    """
+    shape = (WEIGHTS_TABLE_W_COMBINE.shape[0],
+             WEIGHTS_TABLE_BIAS.shape[0],
+             WEIGHTS_TABLE_SQRT_RATIO.shape[0])
+
+    w_d_table = np.zeros(shape)
+    valid = np.zeros(shape, dtype=bool)
+
+    for c_idx, w_c in enumerate(WEIGHTS_TABLE_W_COMBINE):
+        for b_idx, b in enumerate(WEIGHTS_TABLE_BIAS):
+            for r_idx, sqrt_ratio in enumerate(WEIGHTS_TABLE_SQRT_RATIO):
+
+                w, info, ier, msg = so.fsolve(
+                    TwoInputSigmoidOcclusionProfile.optimization_equations,
+                    (w_c / 2, w_c / 2),
+                    args=(w_c, b, sqrt_ratio ** 2),
+                    factor=0.5,
+                    full_output=True)
+
+                w_d = np.max(w)
+                w_nd = np.min(w)
+
+                w_d_table[c_idx, b_idx, r_idx] = w_d
+                valid[c_idx, b_idx, r_idx] = (ier == 1) and w_nd >= 0
+
+    table = {
+        'w_combine': WEIGHTS_TABLE_W_COMBINE,
+        'bias': WEIGHTS_TABLE_BIAS,
+        'sqrt_ratio': WEIGHTS_TABLE_SQRT_RATIO,
+        'w_d': w_d_table,
+        'valid': valid,
+    }
+
+    if file_name is not None:
+        np.savez(file_name, **table)
+
+    return table
+
+
+def get_weights_table(file_name=WEIGHTS_TABLE_FILE):
+    """
+    Get the (cached) weights solution table. Loaded from file_name if it exists, otherwise it
+    is built (see build_weights_table) and saved to file_name.
+
+    :return: dictionary of table arrays {w_combine, bias, sqrt_ratio, w_d, valid}
+    """
+    global _weights_table
+
+    if _weights_table is None:
+        if os.path.exists(file_name):
+            with np.load(file_name) as data:
+                _weights_table = {key: data[key] for key in data.files}
+        else:
+            print("Building two input sigmoid weights table %s" % file_name)
+            _weights_table = build_weights_table(file_name)
+
+        grid = (_weights_table['w_combine'], _weights_table['bias'],
+                _weights_table['sqrt_ratio'])
+
+        # Out of domain points return nan and are treated as invalid
+        _weights_table['w_d_interpolator'] = RegularGridInterpolator(
+            grid, _weights_table['w_d'], bounds_error=False, fill_value=np.nan)
+        _weights_table['valid_interpolator'] = RegularGridInterpolator(
+            grid, _weights_table['valid'].astype(float), bounds_error=False, fill_value=0)
+
+    return _weights_table
+
+
+def lookup_weights(w_c, b, ratio, refine=True):
+    """
+    Get diagnostic and nondiagnostic weights from the precomputed solutions table by linear
+    interpolation. Only points whose surrounding grid points are all valid solutions are
+    looked up.
+
+    :param w_c      : weight(s) on combined axis
+    :param b        : bias(es)
+    :param ratio    : desired diagnostic to total variance ratio(s)
+    :param refine   : If True (Default), interpolated weights are refined with one Newton step
+                      along w_d + w_nd = w_c.
+
+    :return: w_d, w_nd, found. Arrays, found is False for points that need to be solved with
+             fsolve.
+    """
+    table = get_weights_table()
+
+    points = np.column_stack((np.ravel(w_c), np.ravel(b), np.sqrt(np.ravel(ratio))))
+    w_c = points[:, 0]
+    b = points[:, 1]
+    ratio = points[:, 2] ** 2
+
+    found = table['valid_interpolator'](points) > (1 - 1e-9)
+
+    w_d = np.where(found, table['w_d_interpolator'](points), 0)
+
+    if refine:
+        step = 1e-6
+
+        residual = ratio - TwoInputSigmoidOcclusionProfile.calculate_ratio(w_d, w_c - w_d, b)
+        slope = (TwoInputSigmoidOcclusionProfile.calculate_ratio(w_d - step, w_c - w_d + step, b) -
+                 TwoInputSigmoidOcclusionProfile.calculate_ratio(w_d + step, w_c - w_d - step, b)) \
+            / (2 * step)
+
+        # residual is decreasing in w_d, keep the refined weight only if it is closer
+        w_d_refined = np.where(slope != 0, w_d - residual / np.where(slope != 0, slope, 1), w_d)
+        residual_refined = ratio - TwoInputSigmoidOcclusionProfile.calculate_ratio(
+            w_d_refined, w_c - w_d_refined, b)
+
+        w_d = np.where(np.abs(residual_refined) < np.abs(residual), w_d_refined, w_d)
+
+    w_nd = w_c - w_d
+
+    found = found & (w_d >= w_nd) & (w_nd >= 0)
+
+    return w_d, w_nd, found
+
+
 class TwoInputSigmoidOcclusionProfile:
 
-    def __init__(self, d_to_t_ratio=None, w_c=None, b=None):
+    def __init__(self, d_to_t_ratio=None, w_c=None, b=None, rng=None):
         """
         A two input sigmoid is used to model occlusion tolerances of IT Neurons.
 
@@ -79,6 +223,7 @@ class TwoInputSigmoidOcclusionProfile:
         to generate the full 2D occlusion tuning curve.
 
         :param d_to_t_ratio:
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return:
         """
 
@@ -86,7 +231,7 @@ class TwoInputSigmoidOcclusionProfile:
 
         # Desired diagnostic to total variance ratio (R)
         if d_to_t_ratio is None:
-            self.ratio = self._get_diagnostic_group_to_total_variance_ratio()
+            self.ratio = self._get_diagnostic_group_to_total_variance_ratio(rng=rng)
         elif 0 <= d_to_t_ratio <= 1:
             self.ratio = d_to_t_ratio
         else:
@@ -103,32 +248,22 @@ class TwoInputSigmoidOcclusionProfile:
 
             # Get weight along combined visibilities axis
             if w_c is None and b is None:
-                self.w_combine, self.bias = self._get_combined_weight_and_bias()
+                self.w_combine, self.bias = self._get_combined_weight_and_bias(rng=rng)
             else :
                 self.w_combine = w_c
                 self.bias = b
                 # only one iteration for the case when w_combined and bias are defined
                 iteration = max_iterations
 
-            # Use nonlinear optimization to find w_diagnostic and w_nondiagnostic that can generate
-            # the desired diagnostic to total variance ratio.
-            w_d, w_nd = so.fsolve(
-                self.optimization_equations,
-                (self.w_combine / 2, self.w_combine / 2),
-                args=(self.w_combine, self.bias, self.ratio),
-                factor=0.5,  # w_d increases rapidly without this factor adjustment)
-            )
-
-            # w_d should always be greater than w_nd
-            if w_d < w_nd:
-                temp = w_d
-                w_d = w_nd
-                w_nd = temp
+            w_d, w_nd = self._get_weights(self.w_combine, self.bias, self.ratio)
 
-            if w_d < 0 or w_nd < 0:
+            if not (w_d >= 0 and w_nd >= 0):
 
                 iteration = iteration + 1
 
+                if d_to_t_ratio is None and iteration % MAX_ITERATIONS_PER_RATIO == 0:
+                    self.ratio = self._get_diagnostic_group_to_total_variance_ratio(rng=rng)
+
                 # print("Desired R %0.4f, Curr R %0.4f, w_c %0.4f, b %0.4f, w_d %0.4f, w_n %0.4d"
                 #       % (self.ratio,
                 #          self.calculate_ratio(w_d, w_nd, self.bias),
@@ -154,7 +289,117 @@ class TwoInputSigmoidOcclusionProfile:
         self.scale = sigmoid(1, self.w_combine, self.bias)
 
     @staticmethod
-    def _get_diagnostic_group_to_total_variance_ratio():
+    def sample_parameters(n, rng=None):
+        """
+        Generate parameters of a population of n occlusion profiles. Ratios, combined weights
+        and biases are drawn with one vectorized call per distribution. Diagnostic and
+        nondiagnostic weights are solved for each neuron, combined weights and biases of neurons
+        for which no valid weights are found are redrawn, and every MAX_ITERATIONS_PER_RATIO
+        iterations their ratios as well, as in __init__.
+
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :rtype : (ratios, combined weights, biases, diagnostic weights, nondiagnostic weights),
+                 each an array of size n.
+        """
+        max_iterations = 100
+
+        ratio = TwoInputSigmoidOcclusionProfile._get_diagnostic_group_to_total_variance_ratio(
+            n, rng=rng)
+        w_combine, bias = TwoInputSigmoidOcclusionProfile._get_combined_weight_and_bias(
+            n, rng=rng)
+
+        w_d = np.zeros(n)
+        w_nd = np.zeros(n)
+
+        pending = np.arange(n)
+        iteration = 0
+
+        while pending.size:
+
+            if iteration >= max_iterations:
+                raise Exception("Unable to generate desired diagnostic group variance" +
+                                "to total group variance ratio. Desired=%0.4f"
+                                % ratio[pending[0]])
+
+            if iteration > 0:
+                if iteration % MAX_ITERATIONS_PER_RATIO == 0:
+                    ratio[pending] = TwoInputSigmoidOcclusionProfile.\
+                        _get_diagnostic_group_to_total_variance_ratio(pending.size, rng=rng)
+
+                w_combine[pending], bias[pending] = \
+                    TwoInputSigmoidOcclusionProfile._get_combined_weight_and_bias(
+                        pending.size, rng=rng)
+
+            w_d[pending], w_nd[pending], found = \
+                lookup_weights(w_combine[pending], bias[pending], ratio[pending])
+
+            for idx in pending[~found]:
+                w_d[idx], w_nd[idx] = TwoInputSigmoidOcclusionProfile._solve_weights(
+                    w_combine[idx], bias[idx], ratio[idx])
+
+            # Weights of neurons for which fsolve did not converge are nan
+            with np.errstate(invalid='ignore'):
+                pending = pending[~((w_d[pending] >= 0) & (w_nd[pending] >= 0))]
+            iteration += 1
+
+        return ratio, w_combine, bias, w_d, w_nd
+
+    @staticmethod
+    def _get_weights(w_c, b, ratio):
+        """
+        Get w_diagnostic and w_nondiagnostic that generate the desired diagnostic to total
+        variance ratio. Weights are looked up in the precomputed solutions table, fsolve is only
+        used if the table does not contain a valid solution.
+
+        :param w_c      : weight on combined axis
+        :param b        : bias
+        :param ratio    : desired diagnostic to total variance ratio
+
+        :return: w_d, w_nd. w_d is always greater than w_nd.
+        """
+        w_d, w_nd, found = lookup_weights(w_c, b, ratio)
+
+        if found[0]:
+            return w_d[0], w_nd[0]
+
+        return TwoInputSigmoidOcclusionProfile._solve_weights(w_c, b, ratio)
+
+    @staticmethod
+    def _solve_weights(w_c, b, ratio):
+        """
+        Use nonlinear optimization to find w_diagnostic and w_nondiagnostic that can generate
+        the desired diagnostic to total variance ratio. Weights may be negative if the ratio
+        cannot be generated with the given combined weight and bias, and are nan if fsolve does
+        not converge (as for invalid points of the weights table).
+
+        :param w_c      : weight on combined axis
+        :param b        : bias
+        :param ratio    : desired diagnostic to total variance ratio
+
+        :return: w_d, w_nd. w_d is always greater than w_nd.
+        """
+        (w_d, w_nd), info, ier, msg = so.fsolve(
+            TwoInputSigmoidOcclusionProfile.optimization_equations,
+            (w_c / 2, w_c / 2),
+            args=(w_c, b, ratio),
+            factor=0.5,  # w_d increases rapidly without this factor adjustment)
+            full_output=True,
+        )
+
+        if ier != 1:
+            return np.nan, np.nan
+
+        # w_d should always be greater than w_nd
+        if w_d < w_nd:
+            temp = w_d
+            w_d = w_nd
+            w_nd = temp
+
+        return w_d, w_nd
+
+    @staticmethod
+    def _get_diagnostic_group_to_total_variance_ratio(n=None, rng=None):
         """
         Get a sample diagnostic to total ratio (R). Distribution of R was extracted from figure
         4 of [Neilson 2006]. These were then fit to an exponential distribution. For details see
@@ -169,17 +414,23 @@ class TwoInputSigmoidOcclusionProfile:
         References:
         [1] http://www.ece.virginia.edu/mv/edu/prob/stat/random-number-generation.pdf
         [2] SYSD 750 - Lecture Notes
+
+        :param n: Number of ratios to generate. Default = None, a single ratio.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return: diagnostic group to total group_ratio
         """
-        y = np.float(np.random.uniform())
+        if rng is None:
+            rng = np.random
+
+        y = rng.uniform(size=n)
         x = -np.log(1 - y) / 6.84
 
         # If y is close to 1 (0.999), this results in x>1, since this is a probability
         # restrict to max value of 1.
-        return min(x, 1.0)
+        return np.minimum(x, 1.0)
 
     @staticmethod
-    def _get_combined_weight_and_bias():
+    def _get_combined_weight_and_bias(n=None, rng=None):
         """
         Return a w_combined and bias pair. Here w_combined is the weight on the combined
         visibilities axis where equal parts diagnostic and nondiagnostic visibilities are assumed.
@@ -190,10 +441,15 @@ class TwoInputSigmoidOcclusionProfile:
 
         See two_input_sigmoid_fit.py for more details.
 
+        :param n: Number of pairs to generate. Default = None, a single pair.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return: weight_combined, bias
         """
-        w_c = np.float(np.random.normal(loc=7.7621, scale=2.5784, size=1))
-        b = np.float(np.random.normal(loc=-3.6684, scale=0.8909, size=1))
+        if rng is None:
+            rng = np.random
+
+        w_c = rng.normal(loc=7.7621, scale=2.5784, size=n)
+        b = rng.normal(loc=-3.6684, scale=0.8909, size=n)
 
         return w_c, b
 
@@ -203,6 +459,9 @@ class TwoInputSigmoidOcclusionProfile:
         Calculate the ratio of how much of the total variance is explained by the variance between
         diagnostic/non-diagnostic grouping
 
+        Weights and bias may also be arrays (of the same shape), in which case the ratio for
+        each set of parameters is returned.
+
         :param w_d:
         :param w_nd:
         :param b:
@@ -211,16 +470,16 @@ class TwoInputSigmoidOcclusionProfile:
         """
 
         vis_arr = np.arange(1, step=step_size)
-        vis_arr = vis_arr.reshape((vis_arr.shape[0], 1))
+        vis_arr = vis_arr.reshape(vis_arr.shape + (1,) * np.ndim(w_d))
 
-        rates_n = sigmoid(vis_arr, w_nd, b)
-        rates_d = sigmoid(vis_arr, w_d, b)
+        rates_n = 1 / (1 + np.exp(-(vis_arr * w_nd + b)))
+        rates_d = 1 / (1 + np.exp(-(vis_arr * w_d + b)))
 
-        mean_n = np.mean(rates_n)
-        mean_d = np.mean(rates_d)
+        mean_n = np.mean(rates_n, axis=0)
+        mean_d = np.mean(rates_d, axis=0)
 
-        mean_t = np.mean(np.append(rates_n, rates_d))
-        sigma_t = np.var(np.append(rates_n, rates_d))
+        mean_t = np.mean(np.concatenate((rates_n, rates_d)), axis=0)
+        sigma_t = np.var(np.concatenate((rates_n, rates_d)), axis=0)
 
         sigma_b = ((mean_n - mean_t) ** 2 + (mean_d - mean_t) ** 2) / 2
 
@@ -228,7 +487,8 @@ class TwoInputSigmoidOcclusionProfile:
 
         return ratio
 
-    def optimization_equations(self, w, w_c, b, desired_ratio):
+    @staticmethod
+    def optimization_equations(w, w_c, b, desired_ratio):
         """
         Function(s) to solve using nonlinear numerical optimization.
 
@@ -243,7 +503,8 @@ class TwoInputSigmoidOcclusionProfile:
         :return: tuple (Desired ratio - Actual ratio, w_c - (w_d + w_nd)
         """
         w_d, w_nd = w
-        return desired_ratio - self.calculate_ratio(w_d, w_nd, b), w_c - w_d - w_nd
+        return desired_ratio - TwoInputSigmoidOcclusionProfile.calculate_ratio(w_d, w_nd, b), \
+            w_c - w_d - w_nd
 
     def print_parameters(self):
         print("Profile                                      = %s" % self.type)
@@ -299,6 +560,10 @@ class TwoInputSigmoidOcclusionProfile:
                                     Axis must be an axis with a projection of type 3d
         """
 
+        import matplotlib.pyplot as plt
+        from matplotlib import cm
+        from mpl_toolkits.mplot3d import proj3d  # registers the 3d projection
+
         if axis is None:
             f = plt.figure()
             axis = f.add_subplot(111, projection='3d')
@@ -345,6 +610,8 @@ class TwoInputSigmoidOcclusionProfile:
 
     def plot_combined_axis_profile(self, axis=None, font_size=20, print_parameters=True):
 
+        import matplotlib.pyplot as plt
+
         if axis is None:
             f, axis = plt.subplots()
 
@@ -382,6 +649,9 @@ class TwoInputSigmoidOcclusionProfile:
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import proj3d  # registers the 3d projection
+
     plt.ion()
 
     # Make several profiles and check that optimization is working. Doesnt break the model.
@@ -6,12 +6,11 @@ Created on Sun Dec 28 18:50:17 2014
 """
 import scipy.stats as ss
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 class GaussianPositionProfile:
 
-    def __init__(self, selectivity):
+    def __init__(self, selectivity, rng=None):
         """
         1. Models neurons position tolerance receptive field using a 2D Gaussian function.
         Ref. [Zoccolan et. al, 2007].
@@ -22,17 +21,38 @@ class GaussianPositionProfile:
 
         :param selectivity: Activity fraction.
             Number of objects neuron responds to divided by total number of objects.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
 
         :rtype : Object gaussian position profile class
         """
         self.type = '2d_gaussian'
 
-        self.rf_center = self.__get_receptive_field_center()
+        self.rf_center = self.__get_receptive_field_center(rng=rng)
 
-        self.position_tolerance = self.__get_position_tolerance(selectivity)
+        self.position_tolerance = self.__get_position_tolerance(selectivity, rng=rng)
 
     @staticmethod
-    def __get_receptive_field_center():
+    def sample_parameters(selectivity, rng=None):
+        """
+        Generate parameters of a population of position profiles, one vectorized draw per
+        distribution.
+
+        :param selectivity: array of activity fractions, one for each neuron.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :rtype : (rf_centers (n x 2), position_tolerances (n)) in radians.
+        """
+        selectivity = np.asarray(selectivity, dtype=float)
+
+        rf_centers = GaussianPositionProfile.__get_receptive_field_center(
+            selectivity.shape[0], rng=rng)
+        position_tolerances = GaussianPositionProfile.__get_position_tolerance(
+            selectivity, rng=rng)
+
+        return rf_centers, position_tolerances
+
+    @staticmethod
+    def __get_receptive_field_center(n=None, rng=None):
         """ Generate RF centers based on data from Op de Beeck & Vogels - 2000 -
         Spatial Sensitivities of Macaque Inferior Temporal Neurons - Fig 6.
 
@@ -41,7 +61,11 @@ class GaussianPositionProfile:
         Even though the gamma provides a slightly better fit, log likelihood ratios are similar
         and the Gaussian RV uses less parameters.
 
+        :param n: Number of RF centers to generate. Default = None, a single RF center.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
         :rtype : 1x2 array of the RF Center (x, y) in degrees of eccentricity. (Radians)
+                 nx2 array if n is specified.
         """
         sigma_x = 2.02
         mu_x = 1.82
@@ -49,13 +73,13 @@ class GaussianPositionProfile:
         sigma_y = 2.12
         mu_y = 0.61
 
-        x = ss.norm.rvs(size=1, loc=mu_x, scale=sigma_x) * np.pi / 180
-        y = ss.norm.rvs(size=1, loc=mu_y, scale=sigma_y) * np.pi / 180
+        x = ss.norm.rvs(size=n, loc=mu_x, scale=sigma_x, random_state=rng) * np.pi / 180
+        y = ss.norm.rvs(size=n, loc=mu_y, scale=sigma_y, random_state=rng) * np.pi / 180
 
-        return np.hstack((x, y))
+        return np.stack((x, y), axis=-1)
 
     @staticmethod
-    def __get_position_tolerance(s_idx):
+    def __get_position_tolerance(s_idx, rng=None):
         """
         Method determines the position tolerance of the Neuron. Position Tolerance is
         defined as 2*standard deviation of the Gaussian function.
@@ -78,12 +102,15 @@ class GaussianPositionProfile:
 
         :param s_idx: Activity fraction.
             Number of objects neuron responds to divided by total number of objects.
+            If an array, a position tolerance is generated for each entry.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
 
         :rtype : Position tolerance of the neuron in degree of eccentricity (Radians).
         """
         alpha = 4.04
         mean_position_tolerance = -9.820 * s_idx + 13.9730
-        pos_tol = ss.gamma.rvs(a=alpha, scale=mean_position_tolerance / alpha) * np.pi / 180
+        pos_tol = ss.gamma.rvs(
+            a=alpha, scale=mean_position_tolerance / alpha, random_state=rng) * np.pi / 180
 
         return pos_tol
 
@@ -107,6 +134,24 @@ class GaussianPositionProfile:
 
         return mean_rsp
 
+    @staticmethod
+    def get_firing_rate_modifiers(rf_centers, position_tolerances, x, y):
+        """
+        Batch version of firing_rate_modifier, for the parameters returned by
+        sample_parameters.
+
+        :param rf_centers           : (n x 2) array of RF centers in radians.
+        :param position_tolerances  : array of n position tolerances in radians.
+        :param x                    : x coordinate(s) of the object in radians of eccentricity.
+        :param y                    : y coordinate(s) of the object in radians of eccentricity.
+
+        :rtype  : array of n normalized firing rates (rate modifiers)
+        """
+        rf_centers = np.asarray(rf_centers, dtype=float)
+
+        return np.exp(-((x - rf_centers[..., 0])**2 + (y - rf_centers[..., 1])**2) /
+                      (np.asarray(position_tolerances, dtype=float)**2))
+
     def print_parameters(self):
         print("Profile            = %s" % self.type)
         print("Position Tolerance = %0.4f (Radians)" % self.position_tolerance)
@@ -138,6 +183,8 @@ class GaussianPositionProfile:
 
         :rtype              : None.
         """
+        import matplotlib.pyplot as plt
+
         n_points = 180
 
         x = np.linspace(start=x_start, stop=x_stop, num=n_points)
@@ -201,6 +248,8 @@ class GaussianPositionProfile:
             axis.legend(fontsize=font_size - 5, loc='best', scatterpoints=1)
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
     n1 = GaussianPositionProfile(selectivity=0.1)
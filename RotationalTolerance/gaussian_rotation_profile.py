@@ -58,18 +58,42 @@ become view invariant. Similar results were seen in ref 2. This is not modeled.
 @author: s362khan
 """
 import numpy as np
-import matplotlib.pyplot as plt
+
+
+def wrap_angles(angles, mu, period):
+    """
+    Return angles such that they lie within [-period/2, period/2] of mu. Angles within the
+    symmetry period of mu ([mu - period, mu + period]) are shifted by at most one period.
+
+    Inputs are broadcast against each other, e.g. (n x 1) means and periods of n neurons with
+    angles of n_objects objects give (n x n_objects) angles.
+
+    This is defined outside the class as it is also used by the population of IT neurons.
+
+    :param  angles  : Angles to adjust
+    :param  mu      : mu around width to adjust the angles
+    :param  period  : Period of adjustment.
+
+    :return:        : Adjusted array of angles. The input is not modified.
+    """
+    min_allowed = mu - period / 2
+    max_allowed = mu + period / 2
+
+    return np.where(
+        angles < min_allowed,
+        angles + period,
+        np.where(angles > max_allowed, angles - period, angles))
 
 
 class GaussianRotationProfile:
 
-    def __init__(self, preferred_angle=(360 * np.pi / 180), spread=None):
+    def __init__(self, preferred_angle=(360 * np.pi / 180), spread=None, rng=None):
 
         self.type = 'gaussian'
 
         # if input preferred angle is outside range (> np.pi), generate the angle
         if preferred_angle > np.pi:
-            self.preferred_angle = self.__get_preferred_angle()
+            self.preferred_angle = self.__get_preferred_angle(rng=rng)
         else:
             self.preferred_angle = preferred_angle
 
@@ -77,26 +101,49 @@ class GaussianRotationProfile:
         if spread is not None:
             self.spread = spread
         else:
-            self.spread = self.__get_tuning_width()
+            self.spread = self.__get_tuning_width(rng=rng)
+
+    @staticmethod
+    def sample_parameters(n, rng=None):
+        """
+        Generate parameters of a population of n rotation profiles, one vectorized draw per
+        distribution.
+
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :rtype : (preferred angles (n), spreads (n))
+        """
+        return GaussianRotationProfile.__get_preferred_angle(n, rng=rng), \
+            GaussianRotationProfile.__get_tuning_width(n, rng=rng)
 
     @staticmethod
-    def __get_preferred_angle():
+    def __get_preferred_angle(n=None, rng=None):
         """
         Preferred angles are uniformly distributed over the range -pi, pi.
 
+        :param n: Number of angles to generate. Default = None, a single angle.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return : preferred orientation of neuron.
         """
-        return np.float(np.random.uniform(low=-np.pi, high=np.pi))
+        if rng is None:
+            rng = np.random
+
+        return rng.uniform(low=-np.pi, high=np.pi, size=n)
 
     @staticmethod
-    def __get_tuning_width():
+    def __get_tuning_width(n=None, rng=None):
         """
         Average tuning width from ref [1] also from ref [2] = 30 degrees
         Spread of tuning widths arbitrarily chosen.
 
+        :param n: Number of tuning widths to generate. Default = None, a single width.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         :return : rotation tuning width.
         """
-        return np.float(np.random.normal(loc=(30 * np.pi / 180), scale=(15 * np.pi / 180)))
+        if rng is None:
+            rng = np.random
+
+        return rng.normal(loc=(30 * np.pi / 180), scale=(15 * np.pi / 180), size=n)
 
     @staticmethod
     def adjust_angles(angles, mu, period):
@@ -104,7 +151,8 @@ class GaussianRotationProfile:
         Return angles array such that they lie within [-period, period) of the mean. This function
         takes care of wrap effects around period edges.
 
-        Note dimensions of angles, mu and period must be equal.
+        Note dimensions of angles, mu and period must be equal. Array angles are updated in
+        place. See wrap_angles for a version that broadcasts and leaves its input unchanged.
 
         :param  angles  : Angles to adjust
         :param  mu      : mu around width to adjust the angles
@@ -118,36 +166,31 @@ class GaussianRotationProfile:
             mu = np.array([mu])
             period = np.array([period])
 
-        min_allowed = mu - period / 2
-        max_allowed = mu + period / 2
-
-        for idx in np.arange(angles.shape[0]):
-
-            if angles[idx] < min_allowed[idx]:
-                angles[idx] = angles[idx] + period[idx]
-
-            elif angles[idx] > max_allowed[idx]:
-                angles[idx] = angles[idx] - period[idx]
+        angles[...] = wrap_angles(angles, mu, period)
 
         return angles
 
-    def firing_rate_modifier(self, x, rotation_symmetry_period, mirror_symmetric):
+    @staticmethod
+    def get_firing_rate_modifiers(preferred_angles, spreads, x, rotation_symmetry_period,
+                                  mirror_symmetric):
         """
+        Rotation tuning of any number of neurons to any number of objects. Inputs are broadcast
+        against each other, e.g. (n x 1) preferred angles and spreads of n neurons with
+        (n_objects) angles, symmetry periods and mirror symmetries give (n x n_objects) rates.
 
+        :param  preferred_angles        : Preferred angles of the neurons in radians.
+        :param  spreads                 : Spreads of the neurons tuning profiles in radians.
         :param  x                       : Input angles in radians
-        :param  rotation_symmetry_period: Rotation symmetry period, How many times in a 360 degree
-                                          rotation does the object looks like itself. Valid range
-                                          {1, 360}. 1 = No rotation symmetry, 360 = compete
-                                          symmetry.
-        :param  mirror_symmetric         : Whether the object is mirror symmetric. Valid values
-                                          = {1, 0} for each input angle.
+        :param  rotation_symmetry_period: Rotation symmetry periods. See firing_rate_modifier.
+        :param  mirror_symmetric        : Mirror symmetries. See firing_rate_modifier.
 
-        Note: dimensions of x, rotation_symmetry_period and mirror_symmetry mast be equal
+        :rtype  : Normalized firing rates (rate modifiers).
         """
         valid_range = 2 * np.pi / rotation_symmetry_period
+        two_sigma_sqr = 2 * spreads ** 2
 
         # Adjust the mean to lie within the valid range
-        mu_p = np.mod(self.preferred_angle, valid_range)
+        mu_p = np.mod(preferred_angles, valid_range)
 
         # Map input angles to allowed range
         x_p = np.mod(x, valid_range)
@@ -157,15 +200,33 @@ class GaussianRotationProfile:
 
         # Adjust input angles x_p such that they are defined around (-valid_range/2.valid_range/2)
         # of the target mean. This takes care of edge effects.
-        x_adj = self.adjust_angles(x_p, mu_p, valid_range)
-        fire_rate_p = np.exp(-(x_adj - mu_p)**2 / (2 * self.spread ** 2))
+        x_adj = wrap_angles(x_p, mu_p, valid_range)
+        fire_rate_p = np.exp(-(x_adj - mu_p) ** 2 / two_sigma_sqr)
 
-        x_adj = self.adjust_angles(x_p, mu_s, valid_range)
-        fire_rate_s = mirror_symmetric * np.exp(-(x_adj - mu_s) ** 2 / (2 * self.spread ** 2))
+        # As in adjust_angles, which updates its input in place, the mirror symmetric angles are
+        # adjusted starting from the already adjusted angles.
+        x_adj = wrap_angles(x_adj, mu_s, valid_range)
+        fire_rate_s = mirror_symmetric * np.exp(-(x_adj - mu_s) ** 2 / two_sigma_sqr)
 
         # Return the maximum firing rate either from the normal or mirror symmetric gaussian
         return np.maximum(fire_rate_p, fire_rate_s)
 
+    def firing_rate_modifier(self, x, rotation_symmetry_period, mirror_symmetric):
+        """
+
+        :param  x                       : Input angles in radians
+        :param  rotation_symmetry_period: Rotation symmetry period, How many times in a 360 degree
+                                          rotation does the object looks like itself. Valid range
+                                          {1, 360}. 1 = No rotation symmetry, 360 = compete
+                                          symmetry.
+        :param  mirror_symmetric         : Whether the object is mirror symmetric. Valid values
+                                          = {1, 0} for each input angle.
+
+        Note: dimensions of x, rotation_symmetry_period and mirror_symmetry mast be equal
+        """
+        return self.get_firing_rate_modifiers(
+            self.preferred_angle, self.spread, x, rotation_symmetry_period, mirror_symmetric)
+
     def plot_tuning_profile(self,
                             rotation_symmetry_period=1,
                             mirror_symmetric=False,
@@ -173,6 +234,8 @@ class GaussianRotationProfile:
                             font_size=20,
                             print_parameters=True):
 
+        import matplotlib.pyplot as plt
+
         if axis is None:
             f, axis = plt.subplots()
 
@@ -218,6 +281,8 @@ class GaussianRotationProfile:
         print("Spread             = %0.4f (Deg)" % (self.spread * 180 / np.pi))
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
     # profile = GaussianRotationProfile()
@@ -1,16 +1,22 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import scipy.stats as ss
 
+# Minimum stimulus size = 0.08 degrees, from Ito-95. Below this size, the object is
+# too small to allow proper recognition. Converted to radians.
+MIN_STIM_SIZE = 0.08 * np.pi / 180.0
+
 
 class LogNormalSizeProfile:
-    def __init__(self, pol_tol, pref_size = None, size_bw=None):
+    def __init__(self, pol_tol, pref_size = None, size_bw=None, rng=None):
         """
         Generate a lognormal size tuning profile for a neuron. Reference Ito-95.
 
         REQUIRED PARAMETERS:
         :param pol_tol: 2x the standard deviation of the RF spatial extent of the neuron
                         in radians of eccentricity. It comes from the position profile.
+
+        OPTIONAL PARAMETERS:
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         """
         self.type = 'lognormal'
 
@@ -18,19 +24,17 @@ class LogNormalSizeProfile:
         # neuron. It comes from the position profile. Specifically from gaussianPositionProfile.
         self.max_pref_stim_size = 2 * pol_tol
 
-        # Minimum stimulus size = 0.08 degrees, from Ito-95. Below this size, the object is
-        # too small to allow proper recognition. Converted to radians.
-        self.min_stim_size = 0.08 * np.pi / 180.0
+        self.min_stim_size = MIN_STIM_SIZE
 
         # Get parameters for the Lognormal distribution. Preferred size is limited to the max
         # and min supported size inside the function
         if pref_size is None:
-            self.pref_size = self.__get_preferred_size()
+            self.pref_size = self.__get_preferred_size(self.max_pref_stim_size, rng=rng)
         else:
             self.pref_size = pref_size
 
         if size_bw is None:
-            self.size_bw = self.__get_size_bandwidth()
+            self.size_bw = self.__get_size_bandwidth(rng=rng)
         else:
             self.size_bw = size_bw
 
@@ -53,7 +57,26 @@ class LogNormalSizeProfile:
         self.__log2_sigma = (self.size_bw) / (2 * np.sqrt(2 * np.log(2)))
         # For conversion factor see https://en.wikipedia.org/wiki/Full_width_at_half_maximum
 
-    def __get_preferred_size(self):
+    @staticmethod
+    def sample_parameters(pol_tol, rng=None):
+        """
+        Generate parameters of a population of size profiles, one vectorized draw per
+        distribution. Same clipping rules as individual profiles.
+
+        :param pol_tol: array of position tolerances, one for each neuron. See __init__.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
+
+        :rtype : (preferred sizes (n) in radians, size bandwidths (n) in octaves)
+        """
+        max_pref_stim_size = 2 * np.asarray(pol_tol, dtype=float)
+
+        pref_size = LogNormalSizeProfile.__get_preferred_size(max_pref_stim_size, rng=rng)
+        size_bw = LogNormalSizeProfile.__get_size_bandwidth(max_pref_stim_size.shape[0], rng=rng)
+
+        return pref_size, size_bw
+
+    @staticmethod
+    def __get_preferred_size(max_pref_stim_size, rng=None):
         """
         Generate a preferred (optimum) stimulus size for the neuron based on figure 6+7 of Ito 95.
         The preferred size follows distribution of figure 6 with a max value of max_stimulus_size
@@ -73,16 +96,24 @@ class LogNormalSizeProfile:
         27 degree bin.
 
         We assume a peak at 3.4 and a long tail ending at the maximum stimulus size.
+
+        :param max_pref_stim_size: Maximum preferred stimulus size. If an array, a preferred
+                                   size is generated for each entry.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         """
-        preferred_size = np.float(ss.lognorm.rvs(s=0.80, scale=5.40, size=1)) * np.pi / 180.0
+        preferred_size = ss.lognorm.rvs(
+            s=0.80,
+            scale=5.40,
+            size=np.shape(max_pref_stim_size) or None,
+            random_state=rng) * np.pi / 180.0
 
-        preferred_size = np.max((preferred_size, self.min_stim_size))
-        preferred_size = np.min((preferred_size, self.max_pref_stim_size))
+        preferred_size = np.maximum(preferred_size, MIN_STIM_SIZE)
+        preferred_size = np.minimum(preferred_size, max_pref_stim_size)
 
         return preferred_size
 
     @staticmethod
-    def __get_size_bandwidth():
+    def __get_size_bandwidth(n=None, rng=None):
         """
         Generate a size tolerance bandwidth for the neuron based on the distribution given in
         figure 2+7 of Ito 95.
@@ -96,8 +127,11 @@ class LogNormalSizeProfile:
         the results of all larger bandwidths are grouped into the 4 bw bin. We ignore the data
         in the > 4 bandwidth bin and assume it follows the trend as in the lower bandwidths
         continues.
+
+        :param n: Number of bandwidths to generate. Default = None, a single bandwidth.
+        :param rng: numpy RandomState to draw from. Default=None, the global numpy random state.
         """
-        return np.float(ss.lognorm.rvs(s=0.30, scale=1.90, loc=0, size=1))
+        return ss.lognorm.rvs(s=0.30, scale=1.90, loc=0, size=n, random_state=rng)
 
     def firing_rate_modifier(self, stimulus_size):
         """
@@ -119,6 +153,26 @@ class LogNormalSizeProfile:
 
         return fire_rate
 
+    @staticmethod
+    def get_firing_rate_modifiers(pref_sizes, size_bws, stimulus_size):
+        """
+        Batch version of firing_rate_modifier, for the parameters returned by
+        sample_parameters.
+
+        :param pref_sizes   : array of n preferred sizes in radians.
+        :param size_bws     : array of n size bandwidths in octaves.
+        :param stimulus_size: stimulus size(s) in Radians. See firing_rate_modifier.
+        :rtype              : array of n normalized firing rates.
+        """
+        zero_safe_guard = 0.0000001
+        stimulus_size = np.maximum(stimulus_size, zero_safe_guard)
+
+        # Same internal parameters as set_params
+        log2_mu = np.log2(pref_sizes)
+        log2_sigma = np.asarray(size_bws, dtype=float) / (2 * np.sqrt(2 * np.log(2)))
+
+        return np.exp(-(np.log2(stimulus_size) - log2_mu)**2 / (2 * log2_sigma ** 2))
+
     def print_parameters(self):
         print("Profile                      = %s" % self.type)
         print("Preferred Stimulus Size      = %0.4f (Radians)" % self.pref_size)
@@ -126,6 +180,8 @@ class LogNormalSizeProfile:
 
     def plot_size_tolerance(self, axis=None, font_size=34, print_parameters=True):
 
+        import matplotlib.pyplot as plt
+
         x = np.linspace(0, self.max_pref_stim_size * 1.2, num=100)
 
         if axis is None:
@@ -158,6 +214,7 @@ class LogNormalSizeProfile:
 
 if __name__ == "__main__":
     import pickle
+    import matplotlib.pyplot as plt
 
     plt.ion()
 
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Columnar ground truth of a single frame.
+
+main_vrep.get_ground_truth describes each object in the vision sensor frame with a 15 element
+entry. Tuning profiles use one column (x, size, ...) across all objects at a time. A
+GroundTruthFrame stores each column once as a contiguous array, so that neurons and neuron
+populations can use the columns directly instead of unzipping the entries on every call.
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import numpy as np
+
+# Columns of a ground truth entry. Same order as the entries of main_vrep.get_ground_truth.
+FIELDS = (
+    'objects',          # object names
+    'x',                # x coordinate in radians of eccentricity
+    'y',                # y coordinate in radians of eccentricity
+    'size',             # size in radians
+    'rot_x',            # rotation around the x-axis in radians
+    'rot_x_period',     # x rotation symmetry period
+    'rot_x_m',          # x rotations mirror symmetric
+    'rot_y',            # rotation around the y-axis in radians
+    'rot_y_period',     # y rotation symmetry period
+    'rot_y_m',          # y rotations mirror symmetric
+    'rot_z',            # rotation around the z-axis in radians
+    'rot_z_period',     # z rotation symmetry period
+    'rot_z_m',          # z rotations mirror symmetric
+    'vis_nd',           # visibility of nondiagnostic parts
+    'vis_d',            # visibility of diagnostic parts
+)
+
+
+class GroundTruthFrame(object):
+    __slots__ = FIELDS
+
+    def __init__(self, objects, *columns):
+        """
+        Ground truth of all objects in a frame.
+
+        :param objects: sequence of object names.
+        :param columns: the remaining 14 columns of FIELDS, in order. Each a sequence with one
+                        entry per object. Stored as float arrays.
+        """
+        if len(columns) != len(FIELDS) - 1:
+            raise Exception("Ground truth frame needs %d columns, %d given"
+                            % (len(FIELDS), len(columns) + 1))
+
+        self.objects = tuple(objects)
+
+        for field, column in zip(FIELDS[1:], columns):
+            column = np.asarray(column, dtype=float)
+
+            if column.shape != (len(self.objects),):
+                raise Exception("Ground truth column %s must have %d entries"
+                                % (field, len(self.objects)))
+
+            setattr(self, field, column)
+
+    @classmethod
+    def from_list(cls, ground_truth_list):
+        """
+        Convert a list of ground truth entries (see main_vrep.get_ground_truth) to a frame.
+        Frames are returned unchanged.
+
+        :param ground_truth_list: list of 15 element ground truth entries. A single entry
+                                  that is not a list is also accepted.
+
+        :rtype : Ground truth frame instance.
+        """
+        if isinstance(ground_truth_list, cls):
+            return ground_truth_list
+
+        if not isinstance(ground_truth_list, list):
+            ground_truth_list = [ground_truth_list]
+
+        if not ground_truth_list:
+            return cls(*[()] * len(FIELDS))
+
+        return cls(*zip(*ground_truth_list))
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, idx):
+        """ Ground truth entry of the idx-th object, same format as the entries of a list """
+        return [self.objects[idx]] + [getattr(self, field)[idx] for field in FIELDS[1:]]
+
+    def __iter__(self):
+        for idx in np.arange(len(self)):
+            yield self[idx]
+
+    def to_list(self):
+        """ Return the frame as a list of ground truth entries """
+        return [entry for entry in self]
@@ -5,11 +5,10 @@
 @author: s362khan
 """
 import numpy as np
-import matplotlib.pyplot as plt
 
-import population_utils as utils
-# Force reload (compile) IT cortex modules to pick changes not included in cached version.
-reload(utils)
+import profile_registry as registry
+import random_streams
+from ground_truth_frame import GroundTruthFrame
 
 
 class CompleteTolerance:
@@ -52,12 +51,18 @@ class Neuron:
             rotation_profile=None,
             occlusion_profile=None,
             clutter_profile='average',
-            dynamic_profile=None,):
+            dynamic_profile=None,
+            dynamic_integration='euler',
+            diagnostics='none',
+            rng=None):
         """
         Create an Inferior Temporal Cortex  neuron instance.
 
         :param sim_time_step_s      : simulation time step in seconds(dt).(Default=0.005ms)
 
+        Profile types are names registered in profile_registry, which also lists the allowed
+        types of additional registered profiles.
+
         :param selectivity_profile  : Type of object selectivity tuning.
                                       Allowed types: {power_law(Default), 'kurtosis'}
 
@@ -82,27 +87,28 @@ class Neuron:
         :param dynamic_profile      : Type of dynamic profile.
                                       Allowed types = {None(Default), tamura}
 
-        :rtype : It neuron instance.
-        """
-
-        # Selectivity Tuning
-        if selectivity_profile.lower() == 'power_law':
-            from ObjectSelectivity import power_law_selectivity_profile as pls
-            reload(pls)  # Force recompile to pick up any new changes not in cached module.
+        :param dynamic_integration  : Stepping method of the dynamic profile.
+                                      Allowed types = {'euler'(Default), 'exact'}
 
-            self.selectivity = pls.PowerLawSparseness(object_list)
+        :param diagnostics          : Diagnostics level of firing_rate.
+                                      Allowed levels = {'none'(Default), 'full'}. With 'none'
+                                      only the firing rate is calculated, with 'full' per
+                                      object scale factors are returned as well.
 
-        elif selectivity_profile.lower() == 'kurtosis':
-            from ObjectSelectivity import kurtosis_selectivity_profile as ks
-            reload(ks)
+        :param rng                  : Random stream all tuning parameters are drawn from. A
+                                      numpy RandomState or a seed. Default = None, the global
+                                      numpy random state. See random_streams.
 
-            self.selectivity = ks.KurtosisSparseness(object_list)
+        :rtype : It neuron instance.
+        """
+        rng = random_streams.get_random_state(rng)
 
-        else:
-            raise Exception("Invalid selectivity profile: %s" % selectivity_profile)
+        # Selectivity Tuning
+        self.selectivity = registry.create_profile(
+            'selectivity', selectivity_profile, self, object_list=object_list, rng=rng)
 
         # Max Firing Rate Distribution
-        if self.selectivity.type == 'kurtosis':
+        if hasattr(self.selectivity, 'get_max_firing_rate'):
             self.max_fire_rate = self.selectivity.get_max_firing_rate()
         else:
             self.max_fire_rate = max_fire_rate
@@ -110,83 +116,46 @@ class Neuron:
         # Position Tuning
         if position_profile is None:
             self.position = CompleteTolerance()
-
-        elif position_profile.lower() == 'gaussian':
-            import PositionTolerance.gaussian_position_profile as gpt
-            reload(gpt)
-
-            self.position = gpt.GaussianPositionProfile(
-                self.selectivity.activity_fraction_absolute)
         else:
-            raise Exception("Invalid position profile: %s" % position_profile)
+            self.position = registry.create_profile('position', position_profile, self, rng=rng)
 
         # Size Tuning
         if size_profile is None:
             self.size = CompleteTolerance()
-
-        elif size_profile.lower() == 'lognormal':
-
-            import SizeTolerance.log_normal_size_profile as lst
-            reload(lst)
-
-            # Lognormal size tolerance expects a position tolerance parameter.
-            try:
-                pos_tol = self.position.position_tolerance
-            except:
-                raise Exception("Position tolerance needed to create log normal size tuning")
-
-            self.size = lst.LogNormalSizeProfile(pos_tol)
-
         else:
-            raise Exception("Invalid size profile: %s" % size_profile)
+            self.size = registry.create_profile('size', size_profile, self, rng=rng)
 
         # Rotation Tuning
         if rotation_profile is None:
             self.rotation = CompleteTolerance()
-
-        elif rotation_profile.lower() == 'gaussian':
-            import RotationalTolerance.gaussian_rotation_profile as grt
-            reload(grt)
-
-            self.rotation = grt.GaussianRotationProfile()
-
         else:
-            raise Exception("Invalid rotation profile: %s" % size_profile)
+            self.rotation = registry.create_profile('rotation', rotation_profile, self, rng=rng)
 
         # Occlusion Profile
         if occlusion_profile is None:
             self.occlusion = CompleteTolerance()
-
-        elif occlusion_profile.lower() == 'twoinputsigmoid':
-            import OcclusionTolerance.two_input_sigmoid_occlusion_profile as sot
-            reload(sot)
-
-            self.occlusion = sot.TwoInputSigmoidOcclusionProfile()
-
         else:
-            raise Exception("Invalid occlusion profile: %s" % occlusion_profile)
+            self.occlusion = registry.create_profile(
+                'occlusion', occlusion_profile, self, rng=rng)
 
         # Clutter Profile
-        if clutter_profile.lower() == 'average':
-            import ClutterTolerance.averaging_clutter_profile as act
-            reload(act)
-            self.clutter = act.AveragingClutterProfile()
-        else:
-            raise Exception("Invalid Clutter Profile %s" % clutter_profile)
+        self.clutter = registry.create_profile('clutter', clutter_profile, self, rng=rng)
 
         # Dynamic Profile
         if dynamic_profile is None:
             self.dynamics = None
-        elif dynamic_profile.lower() == 'tamura':
-            from Dynamics import tamura_dynamic_profile_2 as td
-            reload(td)
-
-            self.dynamics = td.TamuraDynamics(
-                sim_time_step_s,
-                self.selectivity.objects,
-                self.max_fire_rate)
         else:
-            raise Exception("Invalid dynamic profile %s", dynamic_profile)
+            self.dynamics = registry.create_profile(
+                'dynamics',
+                dynamic_profile,
+                self,
+                sim_time_step_s=sim_time_step_s,
+                integration=dynamic_integration,
+                rng=rng)
+
+        if diagnostics not in ('none', 'full'):
+            raise Exception("Invalid diagnostics level %s" % diagnostics)
+        self.diagnostics = diagnostics
 
     def print_properties(self):
         """ Print all parameters of neuron  """
@@ -218,27 +187,41 @@ class Neuron:
 
         print ("*" * 60)
 
-    def firing_rate(self, ground_truth_list):
+    def firing_rate(self, ground_truth_list, diagnostics=None):
         """
         Get Neuron firing rate for the current time step.
 
         :param ground_truth_list: see method _get_static_firing_rate for format.
+        :param diagnostics      : Diagnostics level of this call {'none', 'full'}.
+                                  Default = None, the diagnostics level of the neuron.
+
+        :rtype : (rate, scales). Scales are None unless the diagnostics level is 'full'.
         """
+        if diagnostics is None:
+            diagnostics = self.diagnostics
+        get_scales = (diagnostics == 'full')
+
         rate = 0
-        scales = 0
+        scales = 0 if get_scales else None
         default_rate = 0
         late_rate = 0
 
+        # Unzip the ground truth once, it is used by both early and late rates.
+        if ground_truth_list:
+            ground_truth_list = GroundTruthFrame.from_list(ground_truth_list)
+
         if self.dynamics is not None and self.dynamics.type == 'tamura':
 
             if ground_truth_list:
-                late_rate, late_scales = self._get_static_firing_rate(
+                late_rate, _ = self._get_static_firing_rate(
                     self.dynamics.late_obj_dict,
-                    ground_truth_list)
+                    ground_truth_list,
+                    get_scales=False)
 
                 default_rate, scales = self._get_static_firing_rate(
                     self.selectivity.objects,
-                    ground_truth_list)
+                    ground_truth_list,
+                    get_scales)
 
             rate = self.dynamics.get_dynamic_rates(default_rate, late_rate)
 
@@ -246,14 +229,16 @@ class Neuron:
             if ground_truth_list:
                 rate, scales = self._get_static_firing_rate(
                     self.selectivity.objects,
-                    ground_truth_list)
+                    ground_truth_list,
+                    get_scales)
 
         return np.float(rate), scales
 
     def _get_static_firing_rate(
             self,
             object_dict,
-            ground_truth_list):
+            ground_truth_list,
+            get_scales=True):
         """
         Get Neurons static overall firing rate to specified input.
 
@@ -268,13 +253,15 @@ class Neuron:
              vis_nondiag,
              vis_diag]
         entries for all objects in the
-        screen. Add more elements to this list and update the zip function.
+        screen. Or a ground_truth_frame.GroundTruthFrame of these entries, which is used
+        directly.
+
+        :param get_scales: Whether to build the per object scale factors. Default=True.
 
         :rtype : Return the net average (multi object response) firing rate of the neuron
                  for the specified input(s)
         """
-        if not isinstance(ground_truth_list, list):
-            ground_truth_list = [ground_truth_list]
+        frame = GroundTruthFrame.from_list(ground_truth_list)
 
         # In the VREP scene, rotations are specified with respect to the world reference
         # frame. Rotations in the extracted ground truth are with respect to the vision sensor
@@ -283,29 +270,18 @@ class Neuron:
         # The IT cortex rotation tuning profile is around the vertical axis which is defined
         # as the y-axis of the vision sensor. Rotating the object (in real world coordinates)
         # around the x-axis results in rotations around the y axis of the vision sensor.
-        objects, \
-        x_arr, y_arr, \
-        size_arr, \
-        _, _, _, \
-        rot_y, rot_y_period, rot_y_m, \
-        _, _, _,\
-        vis_nd, vis_d = zip(*ground_truth_list)
-
-        objects = list(objects)
-        x_arr = np.array(x_arr)
-        y_arr = np.array(y_arr)
-        size_arr = np.array(size_arr)
+        objects = frame.objects
 
         obj_pref_list = np.array([object_dict.get(obj, 0) for obj in objects])
 
         # Get position rate modifiers they will by used to weight isolated responses to get a
         # single clutter response.
-        position_weights = self.position.firing_rate_modifier(x_arr, y_arr)
-        size_fr = self.size.firing_rate_modifier(size_arr)
-        occ_fr = self.occlusion.firing_rate_modifier(np.array(vis_nd), np.array(vis_d))
-        rot_fr = self.rotation.firing_rate_modifier(np.array(rot_y),
-                                                    np.array(rot_y_period),
-                                                    np.array(rot_y_m))
+        position_weights = self.position.firing_rate_modifier(frame.x, frame.y)
+        size_fr = self.size.firing_rate_modifier(frame.size)
+        occ_fr = self.occlusion.firing_rate_modifier(frame.vis_nd, frame.vis_d)
+        rot_fr = self.rotation.firing_rate_modifier(frame.rot_y,
+                                                    frame.rot_y_period,
+                                                    frame.rot_y_m)
 
         isolated_rates = self.max_fire_rate * \
             obj_pref_list * \
@@ -335,6 +311,9 @@ class Neuron:
         # print ("static clutter rate %0.2f" % np.sum(joint_rate, axis=0))
         # raw_input('Continue?')
 
+        if not get_scales:
+            return joint_rate, None
+
         scales = np.zeros((len(objects), 7))
         scales[:, 0] = isolated_rates
         scales[:, 1] = obj_pref_list
@@ -364,6 +343,8 @@ def plot_neuron_dynamic_profile(
     :param  it_neuron   : IT neuron instance.
     """
 
+    import matplotlib.pyplot as plt
+
     # Get optimum stimulus for neuron
     # TODO: Add checks to see if they exist before taking their values
     pref_obj = it_neuron.selectivity.get_ranked_object_list()[0][0]
@@ -451,6 +432,9 @@ def main(it_cortex):
     #     it_neuron.position.plot_position_tolerance_contours(axis=axis, n_contours=1)
 
     # TODO: Temporary. Validation code.
+    import matplotlib.pyplot as plt
+    import population_utils as utils
+
     it_cortex[0].print_properties()
 
     most_pref_obj = it_cortex[0].selectivity.get_ranked_object_list()[0][0]
@@ -553,6 +537,8 @@ def main(it_cortex):
 
 
 if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
     plt.ion()
 
     n = 100
@@ -0,0 +1,867 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Vectorized population of IT neurons.
+
+Parameters of all neurons are stored as arrays (struct-of-arrays) and the firing rates of the
+whole population to all objects in the scene are calculated in a single NumPy pass, instead of
+calling it_neuron_vrep.Neuron.firing_rate once for every neuron.
+
+Tuning functions are the same as those of the individual tuning profiles (see the
+*Tolerance directories), rewritten to broadcast over (neurons x objects).
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import multiprocessing
+import numpy as np
+
+from Dynamics.tamura_dynamic_profile_2 import TamuraPopulationDynamics
+from ground_truth_frame import GroundTruthFrame
+from RotationalTolerance.gaussian_rotation_profile import GaussianRotationProfile
+import random_streams
+
+
+def _sigmoid(x, b):
+    """ Sigmoid of an already weighted input. See OcclusionTolerance two_input_sigmoid. """
+    return 1 / (1 + np.exp(-(x + b)))
+
+
+class ObjectVocabulary:
+    def __init__(self, object_list):
+        """
+        Interns the object names of a scene to integer IDs (their index in object_list).
+        Objects that are not in object_list map to the unknown ID, len(object_list).
+
+        :param object_list: List of objects in the scene.
+        """
+        self.objects = list(object_list)
+        self.unknown_id = len(self.objects)
+
+        self.ids = {obj: idx for idx, obj in enumerate(self.objects)}
+
+        # Objects in the scene rarely change from one frame to the next, reuse the last IDs
+        self._last_objects = None
+        self._last_ids = None
+
+    def __len__(self):
+        return len(self.objects)
+
+    def get_ids(self, objects):
+        """
+        :param objects: sequence of object names.
+
+        :rtype : array of object IDs, the unknown ID for objects not in the vocabulary.
+        """
+        objects = tuple(objects)
+
+        if objects != self._last_objects:
+            self._last_ids = np.fromiter(
+                (self.ids.get(obj, self.unknown_id) for obj in objects),
+                dtype=int,
+                count=len(objects))
+            self._last_objects = objects
+
+        return self._last_ids
+
+
+class NeuronPopulation:
+    def __init__(
+            self,
+            object_list,
+            max_fire_rate,
+            obj_pref,
+            rf_center=None,
+            position_tolerance=None,
+            pref_size=None,
+            size_bw=None,
+            preferred_angle=None,
+            rotation_spread=None,
+            w_combine=None,
+            w_nd=None,
+            w_d=None,
+            occlusion_bias=None,
+            clutter_deviation=None,
+            late_obj_pref=None,
+            dynamics=None):
+        """
+        Create a population of Inferior Temporal Cortex neurons. All parameters are arrays with
+        one entry (row) per neuron. Tuning profiles whose parameters are not provided (None)
+        are completely tolerant (rate modifier = 1), as CompleteTolerance in it_neuron_vrep.
+
+        :param object_list          : List of objects neurons respond to. Defines the columns
+                                      of obj_pref.
+        :param max_fire_rate        : Maximum firing rate of each neuron. (n)
+        :param obj_pref             : Normalized object preferences. (n x n_objects)
+
+        :param rf_center            : Receptive field centers in radians. (n x 2)
+        :param position_tolerance   : Position tolerances in radians. (n)
+
+        :param pref_size            : Preferred stimulus sizes in radians. (n)
+        :param size_bw              : Size bandwidths in octaves. (n)
+
+        :param preferred_angle      : Preferred rotation angles (around the y-axis). (n)
+        :param rotation_spread      : Spread of the rotation tuning profiles. (n)
+
+        :param w_combine            : Occlusion weight along the combined visibilities axis. (n)
+        :param w_nd                 : Occlusion weight of nondiagnostic parts. (n)
+        :param w_d                  : Occlusion weight of diagnostic parts. (n)
+        :param occlusion_bias       : Occlusion sigmoid bias. (n)
+
+        :param clutter_deviation    : Deviation from the averaging clutter rule. (n)
+                                      Default = zeros.
+
+        :param late_obj_pref        : Late (sustained) object preferences. (n x n_objects).
+                                      Required if dynamics are specified.
+        :param dynamics             : Population dynamic profile (TamuraPopulationDynamics).
+                                      Default=None.
+
+        :rtype : Neuron population instance.
+        """
+        self.vocabulary = ObjectVocabulary(object_list)
+        self.objects = self.vocabulary.objects
+
+        self.max_fire_rate = np.asarray(max_fire_rate, dtype=float)
+        self.n = self.max_fire_rate.shape[0]
+
+        # Object preferences are stored with an extra column for unknown objects, see
+        # _get_preference_matrix. obj_pref is a view without this column.
+        self._obj_pref_mat = self._get_preference_matrix(obj_pref)
+        self.obj_pref = self._obj_pref_mat[:, :-1]
+
+        # Rank of each object in each neuron's ranked object list (0 = most preferred), same
+        # order as Neuron.selectivity.get_ranked_object_list(). The stable sort gives tied
+        # objects distinct ranks. The unknown ID has rank -1.
+        rank_order = np.argsort(-self.obj_pref, axis=1, kind='mergesort')
+
+        self._obj_rank_mat = -np.ones((self.n, len(self.vocabulary) + 1), dtype=int)
+        self._obj_rank_mat[np.arange(self.n)[:, np.newaxis], rank_order] = \
+            np.arange(len(self.vocabulary))
+        self.obj_rank = self._obj_rank_mat[:, :-1]
+
+        # Position Tuning
+        self.rf_center = None
+        self.position_tolerance = None
+        if rf_center is not None:
+            self.rf_center = np.asarray(rf_center, dtype=float)
+            self.position_tolerance = np.asarray(position_tolerance, dtype=float)
+
+        # Size Tuning
+        self.pref_size = None
+        self.size_bw = None
+        if pref_size is not None:
+            self.pref_size = np.asarray(pref_size, dtype=float)
+            self.size_bw = np.asarray(size_bw, dtype=float)
+
+            # Same internal parameters as LogNormalSizeProfile.set_params
+            self._log2_mu = np.log2(self.pref_size)
+            self._log2_sigma = self.size_bw / (2 * np.sqrt(2 * np.log(2)))
+
+        # Rotation Tuning
+        self.preferred_angle = None
+        self.rotation_spread = None
+        if preferred_angle is not None:
+            self.preferred_angle = np.asarray(preferred_angle, dtype=float)
+            self.rotation_spread = np.asarray(rotation_spread, dtype=float)
+
+        # Occlusion Tuning
+        self.w_combine = None
+        self.w_nd = None
+        self.w_d = None
+        self.occlusion_bias = None
+        if w_combine is not None:
+            self.w_combine = np.asarray(w_combine, dtype=float)
+            self.w_nd = np.asarray(w_nd, dtype=float)
+            self.w_d = np.asarray(w_d, dtype=float)
+            self.occlusion_bias = np.asarray(occlusion_bias, dtype=float)
+
+            # Fully visible objects return a normalized firing rate of 1
+            self._occlusion_scale = _sigmoid(self.w_combine, self.occlusion_bias)
+
+        # Clutter Tuning
+        if clutter_deviation is None:
+            self.clutter_deviation = np.zeros(self.n)
+        else:
+            self.clutter_deviation = np.asarray(clutter_deviation, dtype=float)
+
+        # Dynamics
+        self.dynamics = dynamics
+        self.late_obj_pref = None
+        if dynamics is not None:
+            if late_obj_pref is None:
+                raise Exception("Late object preferences needed for population dynamics")
+            self._late_obj_pref_mat = self._get_preference_matrix(late_obj_pref)
+            self.late_obj_pref = self._late_obj_pref_mat[:, :-1]
+
+        # Diagnostics, see set_diagnostics
+        self.diagnostics = 'none'
+        self.diagnostic_neurons = None
+        self.diagnostic_period = 1
+        self._frame_count = 0
+
+    @classmethod
+    def from_neurons(cls, neurons):
+        """
+        Create a population from a list of it_neuron_vrep.Neuron instances. All neurons must
+        use the same tuning profile types.
+
+        :param neurons: list of IT neurons.
+
+        :rtype : Neuron population instance.
+        """
+        if not neurons:
+            raise Exception("Cannot create a population without neurons")
+
+        for profile in ['position', 'size', 'rotation', 'occlusion', 'clutter']:
+            types = set([getattr(neuron, profile).type for neuron in neurons])
+            if len(types) > 1:
+                raise Exception("Population neurons have different %s profiles %s"
+                                % (profile, list(types)))
+
+        ref = neurons[0]
+        object_list = list(ref.selectivity.objects.keys())
+
+        kwargs = {
+            'max_fire_rate': [neuron.max_fire_rate for neuron in neurons],
+            'obj_pref': [[neuron.selectivity.objects.get(obj, 0) for obj in object_list]
+                         for neuron in neurons]
+        }
+
+        if ref.position.type != 'none':
+            kwargs['rf_center'] = [neuron.position.rf_center for neuron in neurons]
+            kwargs['position_tolerance'] = \
+                [neuron.position.position_tolerance for neuron in neurons]
+
+        if ref.size.type != 'none':
+            kwargs['pref_size'] = [neuron.size.pref_size for neuron in neurons]
+            kwargs['size_bw'] = [neuron.size.size_bw for neuron in neurons]
+
+        if ref.rotation.type != 'none':
+            kwargs['preferred_angle'] = [neuron.rotation.preferred_angle for neuron in neurons]
+            kwargs['rotation_spread'] = [neuron.rotation.spread for neuron in neurons]
+
+        if ref.occlusion.type != 'none':
+            kwargs['w_combine'] = [neuron.occlusion.w_combine for neuron in neurons]
+            kwargs['w_nd'] = [neuron.occlusion.w_vector[0, 0] for neuron in neurons]
+            kwargs['w_d'] = [neuron.occlusion.w_vector[1, 0] for neuron in neurons]
+            kwargs['occlusion_bias'] = [neuron.occlusion.bias for neuron in neurons]
+
+        kwargs['clutter_deviation'] = [neuron.clutter.d for neuron in neurons]
+
+        if ref.dynamics is not None:
+            kwargs['dynamics'] = TamuraPopulationDynamics.from_profiles(
+                [neuron.dynamics for neuron in neurons])
+            kwargs['late_obj_pref'] = \
+                [[neuron.dynamics.late_obj_dict.get(obj, 0) for obj in object_list]
+                 for neuron in neurons]
+
+        return cls(object_list, **kwargs)
+
+    def _get_preference_matrix(self, obj_pref):
+        """
+        Store (n x n_objects) object preferences in an (n x n_objects + 1) matrix whose last
+        column, the column of the vocabulary's unknown ID, is 0. The preferences of any list
+        of object IDs are then a single take along the object axis.
+        """
+        obj_pref = np.asarray(obj_pref, dtype=float)
+        if obj_pref.shape != (self.n, len(self.vocabulary)):
+            raise Exception("Object preferences must be of shape (%d, %d)"
+                            % (self.n, len(self.vocabulary)))
+
+        pref_mat = np.zeros((self.n, len(self.vocabulary) + 1))
+        pref_mat[:, :-1] = obj_pref
+
+        return pref_mat
+
+    def position_firing_rate_modifier(self, x, y):
+        """
+        :param x: x coordinates of objects in radians of eccentricity. (n_objects)
+        :param y: y coordinates of objects in radians of eccentricity. (n_objects)
+
+        :rtype  : Normalized firing rates. (n x n_objects)
+        """
+        if self.rf_center is None:
+            return np.ones((self.n, x.shape[0]))
+
+        return np.exp(-((x - self.rf_center[:, 0:1]) ** 2 + (y - self.rf_center[:, 1:2]) ** 2) /
+                      (self.position_tolerance[:, np.newaxis] ** 2))
+
+    def size_firing_rate_modifier(self, stimulus_size):
+        """
+        :param stimulus_size: Sizes of objects in radians. (n_objects)
+
+        :rtype  : Normalized firing rates. (n x n_objects)
+        """
+        if self.pref_size is None:
+            return np.ones((self.n, stimulus_size.shape[0]))
+
+        zero_safe_guard = 0.0000001
+        stimulus_size = np.maximum(stimulus_size, zero_safe_guard)
+
+        return np.exp(-(np.log2(stimulus_size) - self._log2_mu[:, np.newaxis]) ** 2 /
+                      (2 * self._log2_sigma[:, np.newaxis] ** 2))
+
+    def rotation_firing_rate_modifier(self, x, rotation_symmetry_period, mirror_symmetric):
+        """
+        :param x                        : Rotation angles of objects in radians. (n_objects)
+        :param rotation_symmetry_period : Rotation symmetry periods of objects. (n_objects)
+        :param mirror_symmetric         : Mirror symmetries of objects. (n_objects)
+
+        :rtype  : Normalized firing rates. (n x n_objects)
+        """
+        if self.preferred_angle is None:
+            return np.ones((self.n, x.shape[0]))
+
+        return GaussianRotationProfile.get_firing_rate_modifiers(
+            self.preferred_angle[:, np.newaxis],
+            self.rotation_spread[:, np.newaxis],
+            x,
+            rotation_symmetry_period,
+            mirror_symmetric)
+
+    def occlusion_firing_rate_modifier(self, vis_nd, vis_d):
+        """
+        If vis_d = -1 (for the first object), fire rates along the combined visibilities axis
+        are returned, as in TwoInputSigmoidOcclusionProfile.
+
+        :param vis_nd   : visibility levels of nondiagnostic parts. (n_objects)
+        :param vis_d    : visibility levels of diagnostic parts. (n_objects)
+
+        :rtype  : Normalized firing rates. (n x n_objects)
+        """
+        if self.w_combine is None:
+            return np.ones((self.n, vis_nd.shape[0]))
+
+        if vis_d[0] == -1:
+            weighted = vis_nd * self.w_combine[:, np.newaxis]
+        else:
+            weighted = vis_nd * self.w_nd[:, np.newaxis] + vis_d * self.w_d[:, np.newaxis]
+
+        return _sigmoid(weighted, self.occlusion_bias[:, np.newaxis]) / \
+            self._occlusion_scale[:, np.newaxis]
+
+    def clutter_firing_rate_modifier(self, isolated_fire_rates, weights):
+        """
+        Position weighted average of isolated responses, see AveragingClutterProfile.
+
+        :param isolated_fire_rates  : (n x n_objects)
+        :param weights              : position weights. (n x n_objects)
+
+        :rtype  : Joint firing rates. (n)
+        """
+        sum_weights = np.sum(weights, axis=1)
+        weighted_sum = np.sum(isolated_fire_rates * weights, axis=1)
+
+        non_zero = sum_weights != 0
+        clutter_rate = np.zeros(self.n)
+        clutter_rate[non_zero] = weighted_sum[non_zero] / sum_weights[non_zero]
+
+        return clutter_rate + self.clutter_deviation
+
+    def set_diagnostics(self, level, neurons=None, period=1):
+        """
+        Set the diagnostics level of firing_rate.
+
+        :param level    : {'none'(Default), 'full', 'sampled'}. With 'none' only firing rates
+                          are calculated. With 'full' per object scale factors of all neurons
+                          are returned every frame. With 'sampled' scale factors of the
+                          specified neurons are returned every period frames.
+        :param neurons  : Indices of neurons whose scales are returned at the 'sampled' level.
+                          Default = None, all neurons.
+        :param period   : Frames between sampled scales at the 'sampled' level. Default = 1.
+        """
+        if level not in ('none', 'full', 'sampled'):
+            raise Exception("Invalid diagnostics level %s" % level)
+
+        self.diagnostics = level
+        self.diagnostic_neurons = None
+        self.diagnostic_period = 1
+
+        if level == 'sampled':
+            if neurons is not None:
+                self.diagnostic_neurons = np.asarray(neurons, dtype=int)
+            self.diagnostic_period = period
+
+        self._frame_count = 0
+
+    def firing_rate(self, ground_truth_list, diagnostics=None):
+        """
+        Get the firing rates of all neurons for the current time step.
+
+        :param ground_truth_list: see it_neuron_vrep.Neuron._get_static_firing_rate for format.
+                                  A ground_truth_frame.GroundTruthFrame is used directly.
+        :param diagnostics      : Diagnostics level of this call {'none', 'full'}.
+                                  Default = None, the level set with set_diagnostics.
+
+        :rtype : (rates, scales). Firing rates of all neurons (n) and the per object scale
+                 factors (n x n_objects x 7) in the same column order as
+                 it_neuron_vrep.Neuron._get_static_firing_rate. Scales are None when not
+                 requested. At the 'sampled' level, scales only have rows for the diagnostic
+                 neurons.
+        """
+        neurons = self._get_diagnostic_neurons(diagnostics)
+        self._frame_count += 1
+
+        rates = np.zeros(self.n)
+        scales = None
+        if neurons is not None:
+            scales = np.zeros((self.n, 0, 7))[neurons]
+
+        if ground_truth_list:
+            obj_ids, modifiers = self._get_tuning_modifiers(ground_truth_list)
+
+            obj_pref = np.take(self._obj_pref_mat, obj_ids, axis=1)
+            rates, isolated_rates = self._get_static_firing_rate(obj_pref, modifiers)
+
+            if neurons is not None:
+                scales = self._get_scales(
+                    neurons, obj_pref, modifiers, isolated_rates, rates)
+
+        if self.dynamics is not None:
+            late_rates = np.zeros(self.n)
+
+            if ground_truth_list:
+                late_rates, _ = self._get_static_firing_rate(
+                    np.take(self._late_obj_pref_mat, obj_ids, axis=1), modifiers)
+
+            rates = self.dynamics.get_dynamic_rates(rates, late_rates)
+
+        return rates, scales
+
+    def _get_diagnostic_neurons(self, diagnostics=None):
+        """
+        Neurons whose scales are returned for the current frame.
+
+        :rtype : index (slice or array) of neurons, None if no scales are needed.
+        """
+        if diagnostics is None:
+            diagnostics = self.diagnostics
+
+        if diagnostics == 'full':
+            return slice(None)
+
+        if diagnostics == 'sampled' and self._frame_count % self.diagnostic_period == 0:
+            if self.diagnostic_neurons is None:
+                return slice(None)
+            return self.diagnostic_neurons
+
+        return None
+
+    @staticmethod
+    def _get_scales(neurons, obj_pref, modifiers, isolated_rates, rates):
+        """
+        Build the per object scale factors of the specified neurons.
+
+        :rtype : scales (n_neurons x n_objects x 7)
+        """
+        position_weights, size_fr, occ_fr, rot_fr = modifiers
+
+        scales = np.zeros(isolated_rates[neurons].shape + (7,))
+        scales[:, :, 0] = isolated_rates[neurons]
+        scales[:, :, 1] = obj_pref[neurons]
+        scales[:, :, 2] = position_weights[neurons]
+        scales[:, :, 3] = size_fr[neurons]
+        scales[:, :, 4] = rot_fr[neurons]
+        scales[:, :, 5] = occ_fr[neurons]
+        scales[:, :, 6] = rates[neurons, np.newaxis]
+
+        return scales
+
+    def get_ranked_scales(self, ground_truth_list, scales, n_ranks=None, neurons=None):
+        """
+        Scatter the per object scale factors returned by firing_rate into each neuron's ranked
+        object order. Row k of a neuron's ranked scales holds the scales of its k-th most
+        preferred object, rows of objects not in the frame are 0.
+
+        :param ground_truth_list : ground truth passed to firing_rate.
+        :param scales            : scales returned by firing_rate (n x n_objects x n_scales).
+                                   None if firing_rate returned no scales.
+        :param n_ranks           : number of ranks (rows) of the ranked scales.
+                                   Default = number of objects in the vocabulary.
+        :param neurons           : Indices of the neurons of the rows of scales.
+                                   Default = None, all neurons.
+
+        :rtype : ranked scales (n_neurons x n_ranks x n_scales). None if scales is None, e.g. on
+                 frames skipped at the 'sampled' diagnostics level.
+        """
+        if scales is None:
+            return None
+
+        if n_ranks is None:
+            n_ranks = len(self.vocabulary)
+
+        rank_mat = self._obj_rank_mat
+        if neurons is not None:
+            rank_mat = rank_mat[neurons]
+
+        ranked_scales = np.zeros((rank_mat.shape[0], n_ranks, scales.shape[2]))
+
+        if ground_truth_list:
+            frame = GroundTruthFrame.from_list(ground_truth_list)
+
+            ranks = np.take(rank_mat, self.vocabulary.get_ids(frame.objects), axis=1)
+            if np.any(ranks < 0):
+                raise Exception("Object index not found!")
+
+            ranked_scales[np.arange(rank_mat.shape[0])[:, np.newaxis], ranks] = scales
+
+        return ranked_scales
+
+    def _get_tuning_modifiers(self, ground_truth_list):
+        """
+        Get the object IDs and the tuning profile rate modifiers of all objects in the frame.
+        These do not depend on object preferences and are shared by early and late rates.
+
+        :param ground_truth_list : see it_neuron_vrep.Neuron._get_static_firing_rate for format.
+
+        :rtype : (object IDs (n_objects),
+                  (position, size, occlusion, rotation) modifiers, each (n x n_objects))
+        """
+        frame = GroundTruthFrame.from_list(ground_truth_list)
+
+        obj_ids = self.vocabulary.get_ids(frame.objects)
+
+        position_weights = self.position_firing_rate_modifier(frame.x, frame.y)
+        size_fr = self.size_firing_rate_modifier(frame.size)
+        occ_fr = self.occlusion_firing_rate_modifier(frame.vis_nd, frame.vis_d)
+        rot_fr = self.rotation_firing_rate_modifier(
+            frame.rot_y,
+            frame.rot_y_period,
+            frame.rot_y_m)
+
+        return obj_ids, (position_weights, size_fr, occ_fr, rot_fr)
+
+    def _get_static_firing_rate(self, obj_pref, modifiers):
+        """
+        Get the static overall firing rates of all neurons to the objects in the frame.
+
+        :param obj_pref  : (n x n_objects) preferences of the objects in the frame.
+        :param modifiers : tuning profile rate modifiers, see _get_tuning_modifiers.
+
+        :rtype : (joint rates (n), isolated rates (n x n_objects))
+        """
+        position_weights, size_fr, occ_fr, rot_fr = modifiers
+
+        isolated_rates = self.max_fire_rate[:, np.newaxis] * \
+            obj_pref * \
+            position_weights * \
+            size_fr * \
+            occ_fr * \
+            rot_fr
+
+        if isolated_rates.shape[1] > 1:
+            joint_rate = self.clutter_firing_rate_modifier(isolated_rates, position_weights)
+        else:
+            joint_rate = isolated_rates[:, 0]
+
+        return joint_rate, isolated_rates
+
+
+def create_population(
+        object_list,
+        n,
+        sim_time_step_s=0.005,
+        selectivity_profile='power_law',
+        max_fire_rate=100,
+        position_profile=None,
+        size_profile=None,
+        rotation_profile=None,
+        occlusion_profile=None,
+        clutter_profile='average',
+        dynamic_profile=None,
+        dynamic_integration='euler',
+        rng=None):
+    """
+    Create a population of n neurons with the same tuning profiles as it_neuron_vrep.Neuron.
+    Parameters are drawn from the same distributions (and with the same clipping rules) as the
+    individual profiles, but with one vectorized draw per distribution for the whole
+    population. No per neuron profile instances are created.
+
+    See it_neuron_vrep.Neuron for a description of the parameters.
+
+    :param n: Number of neurons.
+    :param rng: Random stream all parameters are drawn from. A numpy RandomState or a seed.
+                Default = None, the global numpy random state. See random_streams.
+
+    :rtype : Neuron population instance.
+    """
+    rng = random_streams.get_random_state(rng)
+    n_objects = len(object_list)
+    kwargs = {}
+
+    # Selectivity Tuning
+    if selectivity_profile.lower() == 'power_law':
+        from ObjectSelectivity import power_law_selectivity_profile as pls
+
+        obj_pref, activity_fraction = \
+            pls.PowerLawSparseness.sample_parameters(n, n_objects, rng=rng)
+        max_fire_rates = np.ones(n) * max_fire_rate
+
+    elif selectivity_profile.lower() == 'kurtosis':
+        from ObjectSelectivity import kurtosis_selectivity_profile as ks
+
+        obj_pref, activity_fraction, max_fire_rates = \
+            ks.KurtosisSparseness.sample_parameters(n, n_objects, rng=rng)
+
+    else:
+        raise Exception("Invalid selectivity profile: %s" % selectivity_profile)
+
+    kwargs['max_fire_rate'] = max_fire_rates
+    kwargs['obj_pref'] = obj_pref
+
+    # Position Tuning
+    if position_profile is None:
+        pass
+
+    elif position_profile.lower() == 'gaussian':
+        import PositionTolerance.gaussian_position_profile as gpt
+
+        kwargs['rf_center'], kwargs['position_tolerance'] = \
+            gpt.GaussianPositionProfile.sample_parameters(activity_fraction, rng=rng)
+
+    else:
+        raise Exception("Invalid position profile: %s" % position_profile)
+
+    # Size Tuning
+    if size_profile is None:
+        pass
+
+    elif size_profile.lower() == 'lognormal':
+        import SizeTolerance.log_normal_size_profile as lst
+
+        if 'position_tolerance' not in kwargs:
+            raise Exception("Position tolerance needed to create log normal size tuning")
+
+        kwargs['pref_size'], kwargs['size_bw'] = \
+            lst.LogNormalSizeProfile.sample_parameters(
+                kwargs['position_tolerance'], rng=rng)
+
+    else:
+        raise Exception("Invalid size profile: %s" % size_profile)
+
+    # Rotation Tuning
+    if rotation_profile is None:
+        pass
+
+    elif rotation_profile.lower() == 'gaussian':
+        import RotationalTolerance.gaussian_rotation_profile as grt
+
+        kwargs['preferred_angle'], kwargs['rotation_spread'] = \
+            grt.GaussianRotationProfile.sample_parameters(n, rng=rng)
+
+    else:
+        raise Exception("Invalid rotation profile: %s" % rotation_profile)
+
+    # Occlusion Tuning
+    if occlusion_profile is None:
+        pass
+
+    elif occlusion_profile.lower() == 'twoinputsigmoid':
+        import OcclusionTolerance.two_input_sigmoid_occlusion_profile as sot
+
+        _, kwargs['w_combine'], kwargs['occlusion_bias'], kwargs['w_d'], kwargs['w_nd'] = \
+            sot.TwoInputSigmoidOcclusionProfile.sample_parameters(n, rng=rng)
+
+    else:
+        raise Exception("Invalid occlusion profile: %s" % occlusion_profile)
+
+    # Clutter Tuning
+    if clutter_profile.lower() == 'average':
+        import ClutterTolerance.averaging_clutter_profile as act
+
+        kwargs['clutter_deviation'] = act.AveragingClutterProfile.sample_parameters(n, rng=rng)
+
+    else:
+        raise Exception("Invalid Clutter Profile %s" % clutter_profile)
+
+    # Dynamics
+    if dynamic_profile is None:
+        pass
+
+    elif dynamic_profile.lower() == 'tamura':
+        kwargs['dynamics'], kwargs['late_obj_pref'] = TamuraPopulationDynamics.sample(
+            sim_time_step_s,
+            obj_pref,
+            max_fire_rates,
+            integration=dynamic_integration,
+            rng=rng)
+
+    else:
+        raise Exception("Invalid dynamic profile %s" % dynamic_profile)
+
+    return NeuronPopulation(object_list, **kwargs)
+
+
+# Version of the population file format, see save_population
+POPULATION_FILE_VERSION = 1
+
+# NeuronPopulation parameters stored in population files. Parameters of tuning profiles that
+# are not used by the population (None) are not stored.
+_POPULATION_PARAMETERS = (
+    'max_fire_rate',
+    'obj_pref',
+    'rf_center',
+    'position_tolerance',
+    'pref_size',
+    'size_bw',
+    'preferred_angle',
+    'rotation_spread',
+    'w_combine',
+    'w_nd',
+    'w_d',
+    'occlusion_bias',
+    'clutter_deviation',
+    'late_obj_pref',
+)
+
+# TamuraPopulationDynamics parameters, stored with a 'dynamics_' prefix
+_DYNAMICS_PARAMETERS = (
+    'early_tau',
+    'early_gain',
+    'late_tau',
+    'late_gain',
+    'min_latencies',
+    'max_latencies',
+    'tau_latencies',
+    'late_additional_latency',
+)
+
+
+def save_population(population, file_name):
+    """
+    Save the sampled parameters of a neuron population to a single (uncompressed) .npz file.
+    Each parameter is stored as one array over all neurons, no per neuron objects are pickled.
+    The population created by load_population returns the same firing rates.
+
+    States of the population (dynamics histories, diagnostics settings) are not saved.
+
+    :param population   : Neuron population instance.
+    :param file_name    : Name of the file. NumPy appends .npz if it is missing.
+    """
+    arrays = _get_population_arrays(population)
+    arrays['version'] = np.array(POPULATION_FILE_VERSION)
+    arrays['objects'] = np.array(population.objects)
+
+    np.savez(file_name, **arrays)
+
+
+def load_population(file_name):
+    """
+    Load a neuron population saved with save_population.
+
+    :param file_name: Name of the .npz file.
+
+    :rtype : Neuron population instance.
+    """
+    with np.load(file_name) as data:
+        if 'version' not in data.files or data['version'] != POPULATION_FILE_VERSION:
+            raise Exception("%s is not a population file of version %d"
+                            % (file_name, POPULATION_FILE_VERSION))
+
+        arrays = {key: data[key] for key in data.files}
+
+    return _create_population_from_arrays(arrays['objects'].tolist(), arrays)
+
+
+def _get_population_arrays(population):
+    """
+    Return the parameters of a population as a dictionary of arrays. Parameters of the
+    dynamics are prefixed with 'dynamics_'.
+    """
+    arrays = {}
+
+    for param in _POPULATION_PARAMETERS:
+        value = getattr(population, param)
+        if value is not None:
+            arrays[param] = value
+
+    if population.dynamics is not None:
+        if population.dynamics.type != 'tamura':
+            raise Exception("Cannot store population dynamics of type %s"
+                            % population.dynamics.type)
+
+        for param in _DYNAMICS_PARAMETERS:
+            arrays['dynamics_' + param] = getattr(population.dynamics, param)
+
+        arrays['dynamics_dt'] = np.array(population.dynamics.dt)
+        arrays['dynamics_max_latency'] = np.array(population.dynamics.max_latency)
+        arrays['dynamics_integration'] = np.array(population.dynamics.integration)
+
+    return arrays
+
+
+def _create_population_from_arrays(object_list, arrays):
+    """ Inverse of _get_population_arrays """
+    kwargs = {param: arrays[param] for param in _POPULATION_PARAMETERS if param in arrays}
+
+    if 'dynamics_dt' in arrays:
+        kwargs['dynamics'] = TamuraPopulationDynamics(
+            arrays['dynamics_dt'].item(),
+            max_latency=arrays['dynamics_max_latency'].item(),
+            integration=str(arrays['dynamics_integration']),
+            **{param: arrays['dynamics_' + param] for param in _DYNAMICS_PARAMETERS})
+
+    return NeuronPopulation(object_list, **kwargs)
+
+
+def build_population(object_list, n, workers=1, seed=None, shard_size=10000, **kwargs):
+    """
+    Create a population of n neurons (see create_population) in shards of shard_size neurons,
+    distributed over a pool of worker processes. Workers return the parameter arrays of their
+    shards, which are concatenated into a single population. No neuron or population objects
+    are sent between processes.
+
+    The parameters of shard i are drawn from the random stream (seed, i), see random_streams.
+    For the same seed and shard size, the population is the same for any number of workers.
+
+    :param object_list  : List of objects in the scene.
+    :param n            : Number of neurons.
+    :param workers      : Number of worker processes. Default = 1, build in this process.
+    :param seed         : Seed of the shard random streams, an int. Default = None, a seed is
+                          drawn from the global numpy random state.
+    :param shard_size   : Number of neurons created at once by a worker. Default = 10000.
+    :param kwargs       : Profile parameters of create_population (selectivity_profile,
+                          position_profile, ..., dynamic_integration).
+
+    :rtype : Neuron population instance.
+    """
+    if 'rng' in kwargs:
+        raise Exception("Shard random streams are derived from the seed, rng is not allowed")
+
+    if n < 1:
+        raise Exception("Population size must be at least 1, %d given" % n)
+
+    if seed is None:
+        seed = np.random.randint(np.iinfo(np.uint32).max)
+
+    shards = [(object_list, seed, shard_idx, min(shard_size, n - start), kwargs)
+              for shard_idx, start in enumerate(np.arange(0, n, shard_size))]
+
+    if workers > 1:
+        pool = multiprocessing.Pool(min(workers, len(shards)))
+        try:
+            shard_arrays = pool.map(_build_population_shard, shards)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        shard_arrays = [_build_population_shard(shard) for shard in shards]
+
+    # Per neuron arrays are concatenated, scalar (0-d) arrays are the same for all shards
+    arrays = {}
+    for key, value in shard_arrays[0].items():
+        if value.ndim == 0:
+            arrays[key] = value
+        else:
+            arrays[key] = np.concatenate([shard[key] for shard in shard_arrays])
+
+    return _create_population_from_arrays(object_list, arrays)
+
+
+def _build_population_shard(shard):
+    """ Worker of build_population. Return the parameter arrays of a single shard. """
+    object_list, seed, shard_idx, n, kwargs = shard
+
+    population = create_population(
+        object_list, n, rng=random_streams.spawn_random_states(seed, 1, start=shard_idx)[0],
+        **kwargs)
+
+    return _get_population_arrays(population)
@@ -21,11 +21,9 @@ import traceback
 from vrep.src import vrep
 
 import it_neuron_vrep as it
+import it_population as itp
 import population_utils as utils
-# Force reload (compile) IT cortex modules to pick changes not included in cached version.
-reload(it)
-reload(utils)
-
+from ground_truth_frame import GroundTruthFrame
 
 # VREP CONSTANTS ----------------------------------------------------------------------------------
 
@@ -46,6 +44,24 @@ OBJ_BOUND_BOX_MIN_Z = 17
 OBJ_BOUND_BOX_MAX_X = 18  # These are relative to object reference frame
 OBJ_BOUND_BOX_MAX_Y = 19
 OBJ_BOUND_BOX_MAX_Z = 20
+
+# simxGetObjectGroupData DATA TYPES
+GROUP_DATA_ABSOLUTE_POSES = 9  # Absolute positions and euler angles (6 floats per object)
+
+# OCCLUSION DATA HANDSHAKE
+# The vision sensor child script counts the simulation steps it runs in (1 for the step of the
+# first simxSynchronousTrigger, 2 for the second, ...) and stamps each occlusionData payload with
+# the step it was calculated in:
+#
+#     [OCCLUSION_FRAME_MARKER, step, obj_handle, visibility, visible_pixels, size, ...]
+#
+# Object handles, visibilities, pixel counts and sizes are never negative, so the marker also
+# separates payloads of several steps that were read at once. After triggering step n, the model
+# waits until a payload stamped n (or later) arrives, see wait_for_occlusion_data. Payloads
+# without a stamp are used as they are.
+OCCLUSION_FRAME_MARKER = -2
+OCCLUSION_TIMEOUT_S = 5.0        # Maximum wait for the payload of a step
+STREAM_POLL_INTERVAL_S = 0.001   # Delay between reads of a streaming buffer
 # -------------------------------------------------------------------------------------------------
 
 
@@ -469,6 +485,110 @@ def get_object_rotations(c_id,
     return rotations
 
 
+def euler_to_rotation_matrices(euler_angles):
+    """
+    Rotation matrices of vrep euler angles, R = Rx(alpha) * Ry(beta) * Rz(gamma).
+
+    :param euler_angles: (M x 3) array of (alpha, beta, gamma) angles in radians.
+
+    :rtype : (M x 3 x 3) array of rotation matrices.
+    """
+    c = np.cos(euler_angles)
+    s = np.sin(euler_angles)
+    ca, cb, cg = c[:, 0], c[:, 1], c[:, 2]
+    sa, sb, sg = s[:, 0], s[:, 1], s[:, 2]
+
+    rot = np.empty((euler_angles.shape[0], 3, 3))
+
+    rot[:, 0, 0] = cb * cg
+    rot[:, 0, 1] = -cb * sg
+    rot[:, 0, 2] = sb
+    rot[:, 1, 0] = ca * sg + sa * sb * cg
+    rot[:, 1, 1] = ca * cg - sa * sb * sg
+    rot[:, 1, 2] = -sa * cb
+    rot[:, 2, 0] = sa * sg - ca * sb * cg
+    rot[:, 2, 1] = sa * cg + ca * sb * sg
+    rot[:, 2, 2] = ca * cb
+
+    return rot
+
+
+def rotation_matrices_to_euler(rot):
+    """
+    Inverse of euler_to_rotation_matrices.
+
+    :param rot: (M x 3 x 3) array of rotation matrices.
+
+    :rtype : (M x 3) array of (alpha, beta, gamma) angles in radians.
+    """
+    return np.column_stack((
+        np.arctan2(-rot[:, 1, 2], rot[:, 2, 2]),
+        np.arcsin(np.clip(rot[:, 0, 2], -1, 1)),
+        np.arctan2(-rot[:, 0, 1], rot[:, 0, 0])))
+
+
+def get_object_poses(c_id,
+                     object_handles,
+                     reference_frame_handle,
+                     op_mode=vrep.simx_opmode_buffer):
+    """
+    Get positions and euler rotations of all objects specified by object_handles with respect
+    to the reference frame of the object specified by reference_frame_handle, in a single
+    remote API call. Absolute poses of all scene objects are retrieved with
+    simxGetObjectGroupData and transformed to the reference frame here. Results are the same as
+    those of get_object_position and get_object_rotations.
+
+    :param c_id                     : connected scene id.
+    :param object_handles           : list of M vrep object handles.
+    :param reference_frame_handle   : vrep handle of objects whose reference frame to use.
+    :param op_mode                  : operation mode of the command. Default =
+                                      vrep.simx_opmode_buffer. To initialize this function use
+                                      vrep.simx_opmode_streaming at first call.
+
+    :rtype: ((M x 3) array of (x,y,z) co-ordinates, (M x 3) array of (alpha,beta,gamma)
+            rotations). Poses of objects that could not be retrieved are NaN.
+    """
+    positions = np.empty((len(object_handles), 3))
+    rotations = np.empty((len(object_handles), 3))
+    positions.fill(np.nan)
+    rotations.fill(np.nan)
+
+    res, handles, _, poses, _ = vrep.simxGetObjectGroupData(
+        c_id,
+        vrep.sim_appobj_object_type,
+        GROUP_DATA_ABSOLUTE_POSES,
+        op_mode)
+
+    if vrep.simx_opmode_buffer != op_mode:
+        return positions, rotations
+
+    if res != vrep.simx_return_ok:
+        warnings.warn("Failed to retrieve object poses, with err %s" % res)
+        return positions, rotations
+
+    poses = np.reshape(poses, (len(handles), 6))
+    pose_idx = {handle: idx for idx, handle in enumerate(handles)}
+
+    if reference_frame_handle not in pose_idx:
+        warnings.warn("Failed to retrieve pose of reference frame handle %d"
+                      % reference_frame_handle)
+        return positions, rotations
+
+    found = np.array([handle in pose_idx for handle in object_handles], dtype=bool)
+    obj_poses = poses[[pose_idx[handle] for handle in object_handles if handle in pose_idx]]
+    ref_pose = poses[pose_idx[reference_frame_handle]]
+
+    # Express absolute poses in the reference frame: p = R_ref^T (p_abs - p_ref) and
+    # R = R_ref^T R_abs
+    ref_rot_t = euler_to_rotation_matrices(ref_pose[np.newaxis, 3:])[0].T
+
+    positions[found] = np.dot(obj_poses[:, 0:3] - ref_pose[0:3], ref_rot_t.T)
+    rotations[found] = rotation_matrices_to_euler(
+        np.einsum('ij,mjk->mik', ref_rot_t, euler_to_rotation_matrices(obj_poses[:, 3:])))
+
+    return positions, rotations
+
+
 def initialize_vrep_streaming_operations(c_id,
                                          all_vrep_objs,
                                          vis_sensor_handle):
@@ -480,19 +600,13 @@ def initialize_vrep_streaming_operations(c_id,
     :param all_vrep_objs        : List of all objects in scene. Each objects is of type VrepObject
     :param vis_sensor_handle    : vrep handle for vision sensor.
     """
-    for obj in all_vrep_objs:
-        _ = get_object_position(
-            c_id,
-            obj.handle,
-            vis_sensor_handle,
-            vrep.simx_opmode_streaming)
-
-        _ = get_object_rotations(
-            c_id,
-            obj.handle,
-            vis_sensor_handle,
-            vrep.simx_opmode_streaming)
+    _ = get_object_poses(
+        c_id,
+        [obj.handle for obj in all_vrep_objs],
+        vis_sensor_handle,
+        vrep.simx_opmode_streaming)
 
+    for obj in all_vrep_objs:
         _ = vrep.simxReadStringStream(
             c_id,
             "occlusionData",
@@ -513,14 +627,119 @@ def initialize_vrep_streaming_operations(c_id,
         time.sleep(0.1)
 
 
-occlusion_data_prev = 0
-def get_object_visibility_levels(objects_list, c_id):
+def pack_ints(values):
+    """
+    Same as vrep.simxPackInts, packs all values at once.
+
+    :param values: sequence of ints.
+
+    :rtype : string of little endian 32 bit ints.
+    """
+    return np.asarray(values, dtype='<i4').tobytes()
+
+
+def unpack_ints(packed_data):
+    """
+    Same as vrep.simxUnpackInts, but returns a read only array that shares the memory of
+    packed_data. Trailing bytes that do not make up a full int are ignored.
+
+    :param packed_data: string of little endian 32 bit ints.
+
+    :rtype : array of ints.
+    """
+    return np.frombuffer(packed_data, dtype='<i4', count=len(packed_data) // 4)
+
+
+def unpack_floats(packed_data):
+    """
+    Same as vrep.simxUnpackFloats, but returns a read only array that shares the memory of
+    packed_data. Trailing bytes that do not make up a full float are ignored.
+
+    :param packed_data: string of little endian 32 bit floats.
+
+    :rtype : array of floats.
+    """
+    return np.frombuffer(packed_data, dtype='<f4', count=len(packed_data) // 4)
+
+
+def get_latest_occlusion_frame(occlusion_data):
+    """
+    Split unpacked occlusionData floats into the payloads of each simulation step (see
+    OCCLUSION_FRAME_MARKER) and return the last one.
+
+    :param occlusion_data: array of floats read from the occlusionData stream.
+
+    :rtype : (step, (n x 4) array of [obj_handle, visibility, visible_pixels, size] rows). Step
+             is None for payloads without a stamp. If the only payload is truncated before its
+             stamp, (None, empty array) is returned.
+    """
+    step = None
+    frame = occlusion_data
+
+    # The marker is the only negative value of a payload, the last one starts the last payload
+    markers = np.flatnonzero(occlusion_data == OCCLUSION_FRAME_MARKER)
+
+    if markers.size and markers[-1] + 1 >= occlusion_data.size:
+        # Truncated payload, the last marker has no stamp. Use the previous complete payload.
+        frame = occlusion_data = occlusion_data[:markers[-1]]
+        markers = markers[:-1]
+
+        if not markers.size:
+            return None, np.zeros((0, 4))
+
+    if markers.size:
+        step = np.int(occlusion_data[markers[-1] + 1])
+        frame = occlusion_data[markers[-1] + 2:]
+
+    return step, np.reshape(frame[:frame.shape[0] // 4 * 4], (-1, 4)).astype(float)
+
+
+def wait_for_occlusion_data(c_id, step, timeout_s=OCCLUSION_TIMEOUT_S):
+    """
+    Poll the occlusionData stream until the child script has written the payload of the
+    specified simulation step. Payloads of earlier steps are discarded.
+
+    :param c_id     : connected scene id.
+    :param step     : Simulation step (number of simulation triggers) to wait for.
+    :param timeout_s: Maximum time to wait in seconds. Default = OCCLUSION_TIMEOUT_S.
+
+    :rtype : (n x 4) array of [obj_handle, visibility, visible_pixels, size] rows or None if no
+             payload of the step arrived in time.
+    """
+    start_time = time.time()
+
+    while True:
+        res, occlusion_data = vrep.simxReadStringStream(
+            c_id,
+            "occlusionData",
+            vrep.simx_opmode_buffer)
+
+        if res == vrep.simx_return_ok and occlusion_data:
+            frame_step, frame = get_latest_occlusion_frame(unpack_floats(occlusion_data))
+
+            # Unstamped payloads are used as they are, unless truncated to nothing
+            if (frame_step is None and frame.shape[0]) or \
+                    (frame_step is not None and frame_step >= step):
+                return frame
+
+        elif res != vrep.simx_return_ok and res != vrep.simx_return_novalue_flag:
+            warnings.warn("Failed to get occlusion data, Error %d" % res)
+
+        if time.time() - start_time > timeout_s:
+            return None
+
+        time.sleep(STREAM_POLL_INTERVAL_S)
+
+
+occlusion_data_prev = None
+def get_object_visibility_levels(objects_list, c_id, step):
     """
     Inform the vision sensor child script which  object handles to calculate occlusion levels
     for. Retrieve occlusion levels for all object handles in obj_handles list.
 
     :param objects_list: List of Vrep objects to calculate occlusion levels for.
     :param c_id: connected scene id.
+    :param step: Current simulation step, see wait_for_occlusion_data.
 
     :rtype : List of (non-diagnostic, diagnostic) visibility levels for each specified object
     """
@@ -551,7 +770,7 @@ def get_object_visibility_levels(objects_list, c_id):
 
         # print ("Sending:", handles_to_send)
 
-        obj_handles_string = vrep.simxPackInts(handles_to_send)
+        obj_handles_string = pack_ints(handles_to_send)
         raw_bytes = (ctypes.c_ubyte * len(obj_handles_string)).from_buffer_copy(obj_handles_string)
 
         res = vrep.simxWriteStringStream(
@@ -570,29 +789,21 @@ def get_object_visibility_levels(objects_list, c_id):
         # size x = (max_x_pixel - min_x_pixel) / total_x pixels
         # size y is similarly defined.
         # total pixels comes from the size of the retrieved image (currently set to 64)
-        res, occlusion_data = vrep.simxReadStringStream(
-            c_id,
-            "occlusionData",
-            vrep.simx_opmode_buffer)
-
-        if res != vrep.simx_return_ok:
-            warnings.warn("Failed to get occlusion data, Error %d" % res)
-        else:
+        occlusion_data = wait_for_occlusion_data(c_id, step)
 
-            occlusion_data = vrep.simxUnpackFloats(occlusion_data)
+        if occlusion_data is None:
 
-            if not occlusion_data:
+            # No data from the child script for this step. This is due to the script taking to
+            # long. Possible solutions include (1) increase OCCLUSION_TIMEOUT_S or (2) decrease
+            # the vision sensor resolution.
+            warnings.warn("No vrep script data for step %d!" % step)
 
-                # In case of an empty data string from the child script. This is due to the
-                # script taking to long. Possible solutions include (1) increase sleep time
-                # between simulation triggers or (2) decrease the vision sensor resolution.
-                warnings.warn("Empty vrep script data!")
-                raw_input("Empty vrep script data!")
+            # Try to recover from this situation by using the data from the previous step.
+            # It should not be too different
+            occlusion_data = occlusion_data_prev if occlusion_data_prev is not None \
+                else np.zeros((0, 4))
 
-                # Try to recover from this situation by using the data from the previous step.
-                # It should not be too different
-                if occlusion_data_prev:
-                    occlusion_data = occlusion_data_prev
+        if occlusion_data.shape[0]:
 
             # The occlusion data sent down is actually for the previous time step, to the child
             # script we specify which objects we are interested in and it returns values from its
@@ -604,58 +815,68 @@ def get_object_visibility_levels(objects_list, c_id):
 
             # Objects of interest sent down from VREP can either be a parent object or diagnostic
             # part of an object.
-            retrieved_data = np.reshape(occlusion_data, (len(occlusion_data) / 4, 4))
+            retrieved_data = occlusion_data
             #print retrieved_data
 
-            for data_idx in np.arange(retrieved_data.shape[0]):
-                identity = np.int(retrieved_data[data_idx, 0])
+            identities = retrieved_data[:, 0].astype(int)
+
+            # Index of each object, and of the object each diagnostic part belongs to.
+            obj_indices = {obj.handle: idx for idx, obj in enumerate(objects_list)}
+            diag_obj_indices = {child: idx for idx, obj in enumerate(objects_list)
+                                for child in obj.diag_children}
+
+            # Last retrieved row of each identity, used as the parent row of diagnostic parts
+            data_indices = {identity: idx for idx, identity in enumerate(identities)}
+
+            for data_idx, identity in enumerate(identities):
 
-                for obj_list_idx, obj in enumerate(objects_list):
+                # If parent object, store combined visibility as nondiagnostic visibility.
+                if identity in obj_indices:
+                    obj_idx = obj_indices[identity]
 
-                    # If parent object, store combined visibility as nondiagnostic visibility.
-                    if identity == obj.handle:
-                        # Only adjust the visibility level if it hasn't been updated
-                        if not visibility_levels[obj_list_idx][0]:
-                            visibility_levels[obj_list_idx][0] = retrieved_data[data_idx, 1]
+                    # Only adjust the visibility level if it hasn't been updated
+                    if not visibility_levels[obj_idx, 0]:
+                        visibility_levels[obj_idx, 0] = retrieved_data[data_idx, 1]
 
-                        # Only interested in parent object sizes (not in diagnostic parts size)
-                        # the returned size is based on percentage of the axis.
+                    # Only interested in parent object sizes (not in diagnostic parts size)
+                    # the returned size is based on percentage of the axis.
 
-                        # Assume 180 degrees spaces the projection plane. This corresponds to a
-                        # returned size metric of 1 (see above). Therefore to convert to visual
-                        # degree multiply by 180 degree
-                        sizes[obj_list_idx] = retrieved_data[data_idx, 3] * np.pi
+                    # Assume 180 degrees spaces the projection plane. This corresponds to a
+                    # returned size metric of 1 (see above). Therefore to convert to visual
+                    # degree multiply by 180 degree
+                    sizes[obj_idx] = retrieved_data[data_idx, 3] * np.pi
 
-                    # if diagnostic object part, add diagnostic visibility. But also adjust
-                    # nondiagnostic visibility. The returned nondiagnostic visibility is
-                    # total visibility, we here convert to visibility of nondiagnostic parts only.
-                    elif identity in obj.diag_children:
+                # if diagnostic object part, add diagnostic visibility. But also adjust
+                # nondiagnostic visibility. The returned nondiagnostic visibility is
+                # total visibility, we here convert to visibility of nondiagnostic parts only.
+                elif identity in diag_obj_indices:
+                    obj_idx = diag_obj_indices[identity]
 
-                        # Find the parent data index:
-                        for count in np.arange(retrieved_data.shape[0]):
-                            if obj.handle == np.int(retrieved_data[count, 0]):
-                                parent_data_idx = count
+                    # Skip diagnostic parts whose parent object was not retrieved
+                    parent_data_idx = data_indices.get(objects_list[obj_idx].handle)
+                    if parent_data_idx is None:
+                        continue
 
-                        # find the total and visible pixel counts for parent and diagnostic
-                        parent_visible_pixels = retrieved_data[parent_data_idx, 2]
-                        parent_total_pixels = parent_visible_pixels / \
-                            retrieved_data[parent_data_idx, 1]  # visibility
+                    # find the total and visible pixel counts for parent and diagnostic
+                    parent_visible_pixels = retrieved_data[parent_data_idx, 2]
+                    parent_total_pixels = parent_visible_pixels / \
+                        retrieved_data[parent_data_idx, 1]  # visibility
 
-                        diagnostic_visible_pixels = retrieved_data[data_idx , 2]
-                        diagnostic_total_pixels = diagnostic_visible_pixels / \
-                            retrieved_data[data_idx, 1]  # visibility
+                    diagnostic_visible_pixels = retrieved_data[data_idx, 2]
+                    diagnostic_total_pixels = diagnostic_visible_pixels / \
+                        retrieved_data[data_idx, 1]  # visibility
 
-                        nondiagnostic_visible_pixels = parent_visible_pixels - \
-                            diagnostic_visible_pixels
+                    nondiagnostic_visible_pixels = parent_visible_pixels - \
+                        diagnostic_visible_pixels
 
-                        nondiagnostic_total_pixels = parent_total_pixels - \
-                            diagnostic_total_pixels
+                    nondiagnostic_total_pixels = parent_total_pixels - \
+                        diagnostic_total_pixels
 
-                        # Store the correct visibilities
-                        visibility_levels[obj_list_idx][0] = nondiagnostic_visible_pixels / \
-                            nondiagnostic_total_pixels
+                    # Store the correct visibilities
+                    visibility_levels[obj_idx, 0] = nondiagnostic_visible_pixels / \
+                        nondiagnostic_total_pixels
 
-                        visibility_levels[obj_list_idx][1] = retrieved_data[data_idx, 1]
+                    visibility_levels[obj_idx, 1] = retrieved_data[data_idx, 1]
 
             occlusion_data_prev = occlusion_data
 
@@ -679,7 +900,7 @@ def set_object_handles_for_rotation_symmetries(objects_list, c_id):
             handles_to_send.append(obj.handle)
         # print ("Sending:", handles_to_send)
 
-        obj_handles_string = vrep.simxPackInts(handles_to_send)
+        obj_handles_string = pack_ints(handles_to_send)
         raw_bytes = (ctypes.c_ubyte * len(obj_handles_string)).from_buffer_copy(obj_handles_string)
 
         res = vrep.simxSetStringSignal(
@@ -693,26 +914,37 @@ def set_object_handles_for_rotation_symmetries(objects_list, c_id):
             warnings.warn("Failed to send object handles for rotation symmetries. Err. %d" % res)
 
 
-def update_rotation_symmetries(c_id, vrep_objs):
+def update_rotation_symmetries(c_id, vrep_objs, timeout_s=OCCLUSION_TIMEOUT_S):
 
-    res, rotation_data = vrep.simxReadStringStream(
-        c_id,
-        "rotationData",
-        vrep.simx_opmode_buffer)
+    # Without a fixed delay after each simulation step, the data may not have arrived yet.
+    start_time = time.time()
+    while True:
+        res, rotation_data = vrep.simxReadStringStream(
+            c_id,
+            "rotationData",
+            vrep.simx_opmode_buffer)
+
+        if (res == vrep.simx_return_ok and rotation_data) or \
+           (res != vrep.simx_return_ok and res != vrep.simx_return_novalue_flag) or \
+           time.time() - start_time > timeout_s:
+            break
+
+        time.sleep(STREAM_POLL_INTERVAL_S)
 
     if vrep.simx_return_ok != res and \
        vrep.simx_return_novalue_flag != res:
             warnings.warn("Failed to get rotation symmetries, Error %d" % res)
     else:
-        rotation_data = vrep.simxUnpackInts(rotation_data)
+        rotation_data = unpack_ints(rotation_data)
 
-        if not rotation_data:
-            raw_input("Empty rotation data data")
+        if not rotation_data.size:
+            # No data from the child script in time. Keep the current rotation symmetries.
+            warnings.warn("No rotation symmetry data from vrep script!")
         else:
             # print("Received:", rotation_data)
             # print("Length Received %d" % len(rotation_data))
 
-            retrieved_data = np.reshape(rotation_data, (len(rotation_data) / 7, 7))
+            retrieved_data = np.reshape(rotation_data[:rotation_data.size // 7 * 7], (-1, 7))
 
             for rotation_data in retrieved_data:
                 rot_obj_handle = rotation_data[0]
@@ -729,7 +961,62 @@ def update_rotation_symmetries(c_id, vrep_objs):
     return vrep_objs
 
 
-def get_ground_truth(c_id, objects, vis_sen_handle, proj_mat, ar, projection_angle):
+def project_to_vision_frame(positions, max_dimensions, proj_mat, ar, projection_angle):
+    """
+    Project object positions in the vision sensor reference frame to the vision sensor
+    projection frame, for all objects at once.
+
+    :param positions        : (M x 3) array of object positions in the vision sensor frame.
+    :param max_dimensions   : array of M maximum object dimensions.
+    :param proj_mat         : Camera projection matrix.
+    :param ar               : Aspect Ratio. Screen width/height = x_resolution/y_resolution.
+    :param projection_angle : Perspective angle of vision sensor in radians.
+
+    :rtype : (in frame mask, x, y, sizes). Arrays of M entries. x, y and sizes are in radians.
+    """
+    # Convert to homogeneous world coordinates (M x 4)
+    pos_world = np.column_stack((positions, np.ones(positions.shape[0])))
+
+    # Part 1. Project to Video Sensor Projection Plane
+    camera_homogeneous = np.dot(pos_world, proj_mat.T)
+
+    # Part 2. Divide x, y, z by Chw (actual z coordinate) to get vision sensor homogeneous
+    # coordinates
+    with np.errstate(divide='ignore', invalid='ignore'):
+        camera_cartesian = camera_homogeneous[:, 0:3] / camera_homogeneous[:, 3:4]
+
+    # Check if object lies within projection frame
+    # The position is for the center of the object.
+    epsilon = 1 * 10**-2.75
+
+    in_frame = np.all(
+        (camera_cartesian >= -1 - epsilon) & (camera_cartesian <= 1 + epsilon), axis=1)
+
+    # x,y coordinates in degrees
+    # --------------------------
+    # (1) Normalize calculated coordinates so they have the same scale in
+    #     the x & y direction (by multiply x by the aspect_ratio). The above
+    #     transformations leave x within (-1, 1), we actually what x
+    #     to range between -ar, ar.
+    # (2) Convert to degrees. Assume visual span (180 degrees) covers the
+    #     range of x. -ar to ar. There 2*ar = np.pi
+    # size in degrees
+    # ---------------
+    # (3) np.pi * max_dimension / (2 * aspect_ratio * distance * tan(alpha_rad/2)).
+    #     See Notes.
+    x = np.pi / 2 * ar * camera_cartesian[:, 0]
+    y = np.pi / 2 * camera_cartesian[:, 1]
+
+    # For correct projection in the plane we actually need the euclidean distance to
+    # object , not only its z coordinate. The 4th homogeneous coordinate is unchanged by the
+    # perspective divide.
+    distance = np.sqrt(x**2 + y**2 + camera_homogeneous[:, 3]**2)
+    sizes = (np.pi * max_dimensions) / (2 * ar * distance * np.tan(projection_angle / 2))
+
+    return in_frame, x, y, sizes
+
+
+def get_ground_truth(c_id, objects, vis_sen_handle, proj_mat, ar, projection_angle, step):
     """
     Given a list of vrepObjects, Determine if they lie within the projection frame of the vision
     senor and extract ground truth if they do.
@@ -740,10 +1027,13 @@ def get_ground_truth(c_id, objects, vis_sen_handle, proj_mat, ar, projection_ang
     :param proj_mat         : Camera projection matrix.
     :param ar               : Aspect Ratio. Screen width/height = x_resolution/y_resolution.
     :param projection_angle : Perspective angle of vision sensor in radians.
+    :param step             : Current simulation step (number of simulation triggers).
 
-    :return: A list of tuples for each object that lies in the vision sensor projection frame.
+    :return: A GroundTruthFrame of all objects that lie in the vision sensor projection frame.
+             Frame columns (see ground_truth_frame.FIELDS) follow the order of the entries of
+             the ground truth list.
 
-    Each Tuple Entry consists of
+    Each Entry consists of
         obj_name,               : vrep name of object.
         x,                      : object vision frame x coordinate in degree of eccentricity
                                   (radians).
@@ -770,95 +1060,24 @@ def get_ground_truth(c_id, objects, vis_sen_handle, proj_mat, ar, projection_ang
         vis_diag                : Visibility percentage of diagnostic parts of the object.
                                   Range (0, 1)
     """
-    ground_truth_list = []
-    objects_in_frame = []   # list of all Vrep Objects found in the frame
-    max_dimensions = []
+    # Get real world coordinates and rotations of all objects in vision sensor reference frame
+    positions, rotations = get_object_poses(
+        c_id,
+        [vrep_obj.handle for vrep_obj in objects],
+        vis_sen_handle)
 
-    for vrep_obj in objects:
-        # Get real world coordinates of object in vision sensor reference frame
-        pos_world = get_object_position(
-            c_id,
-            vrep_obj.handle,
-            vis_sen_handle)
-
-        # Convert to homogeneous world coordinates
-        pos_world.append(1)
-        pos_world = np.array(pos_world)
-
-        # Part 1. Project to Video Sensor Projection Plane
-        camera_homogeneous = np.dot(proj_mat, pos_world)
-
-        # Part 2. Divide by Chw (actual z coordinate) to get vision sensor homogeneous coordinates
-        e = 1.0 / camera_homogeneous[-1]
-        p_mat2 = np.array([[e, 0, 0, 0],
-                           [0, e, 0, 0],
-                           [0, 0, e, 0],
-                           [0, 0, 0, 1]])
-
-        camera_cartesian = np.dot(p_mat2, camera_homogeneous)
-
-        # Check if object lies within projection frame
-        # The position is for the center of the object.
-        epsilon = 1 * 10**-2.75
-
-        if ((-1 - epsilon <= camera_cartesian[0] <= 1 + epsilon) and
-                (-1 - epsilon <= camera_cartesian[1] <= 1 + epsilon) and
-                (-1 - epsilon <= camera_cartesian[2] <= 1 + epsilon)):
-            # x,y coordinates in degrees
-            # --------------------------
-            # (1) Normalize calculated coordinates so they have the same scale in
-            #     the x & y direction (by multiply x by the aspect_ratio). The above
-            #     transformations leave x within (-1, 1), we actually what x
-            #     to range between -ar, ar.
-            # (2) Convert to degrees. Assume visual span (180 degrees) covers the
-            #     range of x. -ar to ar. There 2*ar = np.pi
-            # size in degrees
-            # ---------------
-            # (3) np.pi * max_dimension / (2 * aspect_ratio * distance * tan(alpha_rad/2)).
-            #     See Notes.
-            x = np.pi / 2 * ar * camera_cartesian[0]
-            y = np.pi / 2 * camera_cartesian[1]
-
-            # For correct projection in the plane we actually need the euclidean distance to
-            # object , not only its z coordinate.
-            distance = np.sqrt(x**2 + y**2 + camera_cartesian[-1]**2)
-            size = (np.pi * vrep_obj.max_dimension) / \
-                   (2 * ar * distance * np.tan(projection_angle / 2))
-            # print('distance ' + str(distance) + ' size ' + str(size))
-
-            max_dimensions.append(vrep_obj.max_dimension)
-
-            # Get object orientation
-            rot_alpha, rot_beta, rot_gamma = get_object_rotations(
-                c_id,
-                vrep_obj.handle,
-                vis_sen_handle)
-
-            # Add Ground Truth
-            ground_truth_list.append([
-                vrep_obj.name,                      # object name
-                x,                                  # X object center image coordinate in Radians.
-                y,                                  # Y object center image coordinate in Radians.
-                size,                               # Size in Radians.
-                rot_alpha,                          # Rotation around the x-axis in Radians.
-                vrep_obj.x_rot_period,              # X rotation symmetry period.
-                vrep_obj.x_rot_mirror_symmetric,    # Are x_axis rotations mirror symmetric?
-                rot_beta,                           # Rotation around the y-axis in Radian.s
-                vrep_obj.y_rot_period,              # Y rotation symmetry period.
-                vrep_obj.y_rot_mirror_symmetric,    # Are y_axis rotations mirror symmetric?
-                rot_gamma,                          # Rotation around the z-axis in Radians.
-                vrep_obj.z_rot_period,              # Z rotation symmetry period.
-                vrep_obj.z_rot_mirror_symmetric,    # Are z axis rotations mirror symmetric?
-            ])
-
-            objects_in_frame.append(vrep_obj)
+    max_dimensions = np.array([vrep_obj.max_dimension for vrep_obj in objects], dtype=float)
+
+    in_frame, _, _, sizes = project_to_vision_frame(
+        positions, max_dimensions, proj_mat, ar, projection_angle)
+
+    objects_in_frame = [vrep_obj for vrep_obj, found in zip(objects, in_frame) if found]
+    positions = positions[in_frame]
+    rotations = rotations[in_frame]
 
     # After identifying all objects that lie within the field of vision of the vision sensor,
     # get occlusion levels from child script.
-    vis_array, sizes_array = get_object_visibility_levels(objects_in_frame, c_id)
-
-    for idx, entry in enumerate(ground_truth_list):
-        entry.extend(vis_array[idx])               # Add nondiagnostic and diagnostic visibilities.
+    vis_array, sizes_array = get_object_visibility_levels(objects_in_frame, c_id, step)
 
     # TODO:Fix me
     # Remove projection plane matrix and find another way of getting the number of visible objects
@@ -869,22 +1088,29 @@ def get_ground_truth(c_id, objects, vis_sen_handle, proj_mat, ar, projection_ang
     # For now, we get the position and size of the objects using the new methods and replaces
     # these values in the returned ground truth. Once the project plane matrix is removed,
     # clean this up
-    for o_idx, vrep_obj in enumerate(objects_in_frame):
-
-        x, y, z = get_object_position(
-            c_id,
-            vrep_obj.handle,
-            vis_sen_handle)
-
-        x = np.tan(x / z)
-        y = np.tan(y / z)
-
-        # Replace x coordinate
-        ground_truth_list[o_idx][1] = x
-        ground_truth_list[o_idx][2] = y
-        # ground_truth_list[o_idx][3] = sizes_array[o_idx] #TODO Salman: the fluctuations are from this
-
-    return ground_truth_list, max_dimensions
+    x = np.tan(positions[:, 0] / positions[:, 2])
+    y = np.tan(positions[:, 1] / positions[:, 2])
+    # sizes = sizes_array #TODO Salman: the fluctuations are from this
+
+    # Columnar ground truth, shared by all neurons in this time step.
+    ground_truth = GroundTruthFrame(
+        [vrep_obj.name for vrep_obj in objects_in_frame],   # object name
+        x,                                  # X object center image coordinate in Radians.
+        y,                                  # Y object center image coordinate in Radians.
+        sizes[in_frame],                    # Size in Radians.
+        rotations[:, 0],                    # Rotation around the x-axis in Radians.
+        [vrep_obj.x_rot_period for vrep_obj in objects_in_frame],
+        [vrep_obj.x_rot_mirror_symmetric for vrep_obj in objects_in_frame],
+        rotations[:, 1],                    # Rotation around the y-axis in Radians.
+        [vrep_obj.y_rot_period for vrep_obj in objects_in_frame],
+        [vrep_obj.y_rot_mirror_symmetric for vrep_obj in objects_in_frame],
+        rotations[:, 2],                    # Rotation around the z-axis in Radians.
+        [vrep_obj.z_rot_period for vrep_obj in objects_in_frame],
+        [vrep_obj.z_rot_mirror_symmetric for vrep_obj in objects_in_frame],
+        vis_array[:, 0],                    # Visibility of nondiagnostic parts.
+        vis_array[:, 1])                    # Visibility of diagnostic parts.
+
+    return ground_truth, list(max_dimensions[in_frame])
 
 
 def main():
@@ -958,6 +1184,11 @@ def main():
 
             it_cortex.append(neuron)
 
+        # Evaluate all neurons in one vectorized pass. Scale factors of all neurons are
+        # collected every step.
+        it_population = itp.NeuronPopulation.from_neurons(it_cortex)
+        it_population.set_diagnostics('full')
+
         # Get Ground Truth  ---------------------------------------------------------------------
         print("Starting Data collection...")
         set_robot_velocity(client_id, 6)
@@ -965,6 +1196,7 @@ def main():
         rates_vs_time_arr = np.zeros(shape=(t_stop_ms / t_step_ms, population_size))
 
         t_current_ms = 0
+        step = 0
         while t_current_ms < t_stop_ms:
 
             # Step the simulation
@@ -972,15 +1204,13 @@ def main():
             if res != vrep.simx_return_ok:
                 print ("Failed to step simulation! Err %s" % res)
                 break
+            step += 1
 
             # The Vrep child script takes time to run. vrep is running on a separate thread.
-            # Add a delay to allow the calculated occlusion data to be written into the vrep
-            # streaming buffer so it can be correctly picked up by the thread running the IT
-            # cortex model. Without this delay, empty buffer strings will be picked up the model
-            # (since we clear it after reading). At the moment value is arbitrarily chosen. It
-            # should be slightly higher then the max execution time of the child script. This can
-            # be seen in the vrep scene data printed out every step.
-            time.sleep(2.0)
+            # simxGetPingTime blocks until the server has processed all previous commands, so the
+            # next step is never triggered before the current one is done. The occlusion data of
+            # the step is then waited for in get_ground_truth, see wait_for_occlusion_data.
+            vrep.simxGetPingTime(client_id)
 
             if t_current_ms == 0:
                 # Because object handles need to be sent to the child script and the fact that
@@ -999,55 +1229,31 @@ def main():
                 vs_handle,
                 p_mat,
                 aspect_ratio,
-                alpha_rad)
+                alpha_rad,
+                step)
             max_dimensions.append(max_dimensions_t)
 
             if ground_truth:
                 # Print the Ground Truth
                 print("Time=%dms, Number of objects %d" % (t_current_ms, len(ground_truth)))
-                objects_t = []
                 for entry in ground_truth:
-                    print ("\t %s, %0.2f, %0.2f, %0.2f, %0.2f, %d, %s, %0.2f, %d, %s, "
-                           "%0.2f, %d, %s, %0.2f, %0.2f"
+                    print ("\t %s, %0.2f, %0.2f, %0.2f, %0.2f, %d, %d, %0.2f, %d, %d, "
+                           "%0.2f, %d, %d, %0.2f, %0.2f"
                            % (entry[0].ljust(30), entry[1], entry[2], entry[3],
                               entry[4], entry[5], entry[6], entry[7], entry[8],
                               entry[9], entry[10], entry[11], entry[12], entry[13],
                               entry[14]))
-                    objects_t.append(entry[0])
-                objects.append(objects_t)
+                objects.append(list(ground_truth.objects))
 
             # Get IT cortex firing rates
-            scales_t = np.zeros((population_size, len(objects_array), 7))
-
-            for n_idx, neuron in enumerate(it_cortex):
-                # print('NEURON ' + str(n_idx))
-
-                rates_vs_time_arr[t_current_ms / t_step_ms, n_idx], neuron_scales = \
-                    neuron.firing_rate(ground_truth)
-
-                # Scales for each neuron are stored in terms of their ranked objects list
-                ordered_scales = np.zeros((len(objects_array), 7))
-                neuron_ranked_obj_list = neuron.selectivity.get_ranked_object_list()
-
-                for per_seen_obj_scales in neuron_scales:
-
-                    # neuron_scale[:][1] = object preference. Use this to get the index of the object
-                    # in the ranked object list
-                    for obj_idx, obj in enumerate(neuron_ranked_obj_list):
-
-                        if obj[1] == per_seen_obj_scales[1]:
-                            break
-
-                        # Raise an exception if the object was not found in the neurons object
-                        # list
-                        if obj_idx == len(objects_array) - 1:
-                            raise Exception("Object index not found!")
-
-                    ordered_scales[obj_idx, :] = per_seen_obj_scales
-
-                scales_t[n_idx,:,:] = ordered_scales
-                # scales_t.append(neuron_scales)
-                # print('len scales_t' + str(len(scales_t)))
+            rates_vs_time_arr[t_current_ms / t_step_ms, :], population_scales = \
+                it_population.firing_rate(ground_truth)
+
+            # Scales for each neuron are stored in terms of their ranked objects list
+            scales_t = it_population.get_ranked_scales(
+                ground_truth,
+                population_scales,
+                n_ranks=len(objects_array))
 
             scales.append(scales_t)
             # print('len scales' + str(len(scales)))
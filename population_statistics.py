@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Selectivity and sparseness statistics of a population of IT neurons.
+
+Statistics are calculated from a (n_neurons x n_objects) matrix of firing rates, along an axis
+of the matrix, instead of one neuron (row) or object (column) at a time:
+
+    single neuron selectivity   : kurtosis of each neuron's rates over all objects (axis=1)
+    population sparseness       : kurtosis of the rates of all neurons to each object (axis=0)
+    activity fraction           : activity fraction of each neuron's rates (axis=1)
+    mean rate                   : mean rate of each neuron over all objects (axis=1)
+
+Kurtosis (excess kurtosis) and activity fraction are calculated with the calculate_kurtosis
+and calculate_activity_fraction functions of the selectivity profiles.
+
+get_population_statistics_chunked calculates the same statistics in a single pass over blocks
+of neurons, for rate matrices that do not fit in memory (e.g. numpy memmaps).
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import numpy as np
+
+from ObjectSelectivity.kurtosis_selectivity_profile import calculate_kurtosis
+from ObjectSelectivity.power_law_selectivity_profile import calculate_activity_fraction
+
+
+def get_population_statistics(rates):
+    """
+    :param rates: (n_neurons x n_objects) array of firing rates.
+
+    :return: (single neuron selectivities (n_neurons), population sparsenesses (n_objects),
+              activity fractions (n_neurons), mean rates (n_neurons))
+    """
+    rates = np.asarray(rates, dtype=float)
+
+    return calculate_kurtosis(rates, axis=1), \
+        calculate_kurtosis(rates, axis=0), \
+        calculate_activity_fraction(rates, axis=1), \
+        np.mean(rates, axis=1)
+
+
+def get_population_statistics_chunked(rates, chunk_size=10000):
+    """
+    Same as get_population_statistics, but rates are read chunk_size neurons (rows) at a time.
+    Statistics of neurons are calculated per chunk. Central moments of each object are
+    calculated per chunk and combined with those of the previous chunks, see
+    _combine_moments.
+
+    :param rates: (n_neurons x n_objects) array of firing rates. Any array that supports
+                  slicing of rows, e.g. a numpy memmap.
+    :param chunk_size: Number of neurons read at once. Default = 10000.
+
+    :return: see get_population_statistics.
+    """
+    n_neurons = rates.shape[0]
+
+    selectivities = np.zeros(n_neurons)
+    activity_fractions = np.zeros(n_neurons)
+    mean_rates = np.zeros(n_neurons)
+
+    object_moments = None
+
+    for start in np.arange(0, n_neurons, chunk_size):
+        stop = min(start + chunk_size, n_neurons)
+        chunk = np.asarray(rates[start:stop], dtype=float)
+
+        selectivities[start:stop] = calculate_kurtosis(chunk, axis=1)
+        activity_fractions[start:stop] = calculate_activity_fraction(chunk, axis=1)
+        mean_rates[start:stop] = np.mean(chunk, axis=1)
+
+        chunk_moments = _get_moments(chunk)
+        if object_moments is None:
+            object_moments = chunk_moments
+        else:
+            object_moments = _combine_moments(object_moments, chunk_moments)
+
+    n, _, m2, _, m4 = object_moments
+    sparsenesses = n * m4 / m2 ** 2 - 3
+
+    return selectivities, sparsenesses, activity_fractions, mean_rates
+
+
+def _get_moments(rates):
+    """
+    Count, mean and sums of the 2nd, 3rd and 4th powers of the deviations from the mean of
+    each column of rates.
+    """
+    n = np.float(rates.shape[0])
+    mean = np.mean(rates, axis=0)
+    deviations = rates - mean
+
+    return n, mean, np.sum(deviations ** 2, axis=0), np.sum(deviations ** 3, axis=0), \
+        np.sum(deviations ** 4, axis=0)
+
+
+def _combine_moments(moments_a, moments_b):
+    """
+    Moments (see _get_moments) of the union of two sets of rows.
+
+    Ref: Pébay, P. (2008). Formulas for robust, one-pass parallel computation of covariances
+    and arbitrary-order statistical moments. Sandia Report SAND2008-6212.
+    """
+    n_a, mean_a, m2_a, m3_a, m4_a = moments_a
+    n_b, mean_b, m2_b, m3_b, m4_b = moments_b
+
+    n = n_a + n_b
+    delta = mean_b - mean_a
+
+    mean = mean_a + delta * n_b / n
+
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+
+    m3 = m3_a + m3_b + \
+        delta ** 3 * n_a * n_b * (n_a - n_b) / n ** 2 + \
+        3 * delta * (n_a * m2_b - n_b * m2_a) / n
+
+    m4 = m4_a + m4_b + \
+        delta ** 4 * n_a * n_b * (n_a ** 2 - n_a * n_b + n_b ** 2) / n ** 3 + \
+        6 * delta ** 2 * (n_a ** 2 * m2_b + n_b ** 2 * m2_a) / n ** 2 + \
+        4 * delta * (n_a * m3_b - n_b * m3_a) / n
+
+    return n, mean, m2, m3, m4
@@ -8,10 +8,8 @@ Created on Mon Aug  22 17:30:01 2015
 @author: s362khan
 ----------------------------------------------------------------------------------------------"""
 import numpy as np
-import matplotlib.pyplot as plt
 import os
 import sys
-from mpl_toolkits.mplot3d import proj3d
 import it_neuron_vrep as it
 
 
@@ -22,6 +20,24 @@ if top_level_dir_path not in sys.path:
     sys.path.append(top_level_dir_path)
 
 from ObjectSelectivity.kurtosis_selectivity_profile import calculate_kurtosis
+import population_statistics as stats
+
+
+def get_rate_matrix(it_population, objects=None):
+    """
+    Return the (isolated, optimal stimulus) firing rates of all neurons to all objects.
+
+    :param it_population: list of neurons
+    :param objects: list of objects. Default = None, the objects of the first neuron.
+    :return: (n_neurons x n_objects) array of firing rates.
+    """
+    if objects is None:
+        objects = it_population[0].selectivity.objects.keys()
+
+    rates = np.array([[neuron.selectivity.objects[obj] for obj in objects]
+                      for neuron in it_population])
+
+    return rates * np.array([neuron.max_fire_rate for neuron in it_population])[:, np.newaxis]
 
 
 def population_max_firing_rate(it_population):
@@ -37,6 +53,8 @@ def population_max_firing_rate(it_population):
 
 
 def plot_max_fire_distribution(it_population, axis=None):
+    import matplotlib.pyplot as plt
+
     rates = [n.max_fire_rate for n in it_population]
 
     if axis is None:
@@ -50,6 +68,8 @@ def plot_population_selectivity_distribution(it_population, axis=None):
     :param axis:
     :param it_population:
     """
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
@@ -71,20 +91,12 @@ def plot_single_neuron_selectivities(it_population, axis=None,  font_size=40):
     :param it_population:
     """
 
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
-    objects = it_population[0].selectivity.objects.keys()
-
-    single_neuron_selectivity = []
-    for neuron in it_population:
-
-        firing_rates = []
-
-        for obj in objects:
-            firing_rates.append(neuron.selectivity.objects[obj] * neuron.max_fire_rate)
-
-        single_neuron_selectivity.append(calculate_kurtosis(np.array(firing_rates)))
+    single_neuron_selectivity = calculate_kurtosis(get_rate_matrix(it_population), axis=1)
 
     axis.hist(single_neuron_selectivity, bins=np.arange(0, 100, step=1))
 
@@ -124,20 +136,12 @@ def plot_population_sparseness(it_population, axis=None, font_size=40):
     :param it_population:
     """
 
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
-    objects = it_population[0].selectivity.objects.keys()
-
-    population_sparseness = []
-
-    for obj in objects:
-
-        firing_rates = []
-        for neuron in it_population:
-            firing_rates.append(neuron.selectivity.objects[obj] * neuron.max_fire_rate)
-
-        population_sparseness.append(calculate_kurtosis(np.array(firing_rates)))
+    population_sparseness = calculate_kurtosis(get_rate_matrix(it_population), axis=0)
 
     axis.hist(population_sparseness, bins=np.arange(0, 100, step=1))
 
@@ -175,6 +179,8 @@ def plot_population_obj_preferences(it_population, axis=None):
     :param axis:
     :param it_population:
     """
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
@@ -211,6 +217,8 @@ def plot_selectivity_vs_position_tolerance(it_population, axis=None, f_size=40):
     :param it_population:
     """
 
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
@@ -247,26 +255,13 @@ def plot_selectivity_vs_position_tolerance(it_population, axis=None, f_size=40):
 
 def plot_selectivity_vs_mean_response(it_population, axis=None, font_size=40):
 
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
-    # selectivities_abs = []
-    selectivities_meas = []
-    mean_rates = []
-
-    population_size = len(it_population)
-
-    for neuron_idx in np.arange(population_size):
-
-        obj_pref = it_population[neuron_idx].selectivity.objects.values()
-        max_fire = it_population[neuron_idx].max_fire_rate
-
-        mean_rates.append(np.mean(obj_pref) * max_fire)
-        selectivities_meas.append(it_population[neuron_idx].selectivity.kurtosis_measured)
-
-    mean_rates = np.array(mean_rates)
-    # selectivities_abs = np.array(selectivities_abs)
-    selectivities_meas = np.array(selectivities_meas)
+    selectivities_meas, _, _, mean_rates = \
+        stats.get_population_statistics(get_rate_matrix(it_population))
 
     axis.scatter(mean_rates, np.log(selectivities_meas + 1), color='g', s=60)
     # axis.loglog(mean_rates, selectivities_meas + 1, 'go')
@@ -299,6 +294,9 @@ def plot_neuron_tuning_profiles(it_neuron, font_size=30):
     :return:
     """
 
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d import proj3d  # registers the 3d projection
+
     f = plt.figure()
 
     ax1 = f.add_subplot(3, 2, 1)
@@ -443,6 +441,8 @@ def plot_net_fire_rates(rates_array, dt=0.005, axis=None, font_size=30, n_idx=No
     :param n_idx:
     :return:
     """
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
@@ -466,6 +466,8 @@ def plot_net_fire_rates(rates_array, dt=0.005, axis=None, font_size=30, n_idx=No
 
 def plot_receptive_field_centers(it_population, axis=None, font_size=40):
 
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
@@ -522,6 +524,8 @@ def plot_neuron_scales_factors(n_idx, neurons_arr, scales_arr, dt, obj_idx=0,
     :param font_size:
     :return:
     """
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
@@ -597,6 +601,8 @@ def get_spikes_raster(rates_array, n_idx=None, dt=0.005, axis=None, font_size=40
     :return:
     """
 
+    import matplotlib.pyplot as plt
+
     if axis is None:
         f, axis = plt.subplots()
 
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Registry of IT neuron tuning profiles.
+
+Maps profile names, as passed to it_neuron_vrep.Neuron (e.g. 'power_law', 'gaussian'), to
+factories that create the profile. Tuning profile modules are imported once, when this module
+is imported, instead of every time a neuron is created.
+
+Additional profiles can be registered with register_profile. A factory is called with the
+neuron being created, which already has the profiles of the preceding kinds (in the order of
+PROFILE_KINDS), and the following keyword arguments:
+    all kinds   : rng, the numpy RandomState to draw parameters from (see random_streams)
+    selectivity : object_list
+    dynamics    : sim_time_step_s, integration
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+from ObjectSelectivity import power_law_selectivity_profile as pls
+from ObjectSelectivity import kurtosis_selectivity_profile as ks
+import PositionTolerance.gaussian_position_profile as gpt
+import SizeTolerance.log_normal_size_profile as lst
+import RotationalTolerance.gaussian_rotation_profile as grt
+import OcclusionTolerance.two_input_sigmoid_occlusion_profile as sot
+import ClutterTolerance.averaging_clutter_profile as act
+from Dynamics import tamura_dynamic_profile_2 as td
+
+# Kinds of profiles, in the order they are created by it_neuron_vrep.Neuron
+PROFILE_KINDS = ('selectivity', 'position', 'size', 'rotation', 'occlusion', 'clutter', 'dynamics')
+
+_factories = {kind: {} for kind in PROFILE_KINDS}
+
+
+def register_profile(kind, name, factory):
+    """
+    Register a tuning profile factory. Registering an existing name replaces its factory.
+
+    :param kind     : Kind of profile. One of PROFILE_KINDS.
+    :param name     : Profile name, case insensitive.
+    :param factory  : Callable factory(neuron, **kwargs) that returns a profile instance.
+                      See module docstring for the keyword arguments of each kind.
+    """
+    if kind not in _factories:
+        raise Exception("Invalid profile kind %s" % kind)
+
+    _factories[kind][name.lower()] = factory
+
+
+def get_profile_names(kind):
+    """ Return the registered profile names of the specified kind """
+    return sorted(_factories[kind].keys())
+
+
+def create_profile(kind, name, neuron, **kwargs):
+    """
+    Create a tuning profile.
+
+    :param kind     : Kind of profile. One of PROFILE_KINDS.
+    :param name     : Registered profile name, case insensitive.
+    :param neuron   : neuron the profile is created for.
+    :param kwargs   : keyword arguments of the factory.
+
+    :rtype : profile instance.
+    """
+    try:
+        factory = _factories[kind][name.lower()]
+    except KeyError:
+        raise Exception("Invalid %s profile: %s" % (kind, name))
+
+    return factory(neuron, **kwargs)
+
+
+# -----------------------------------------------------------------------------------------------
+# Built-in profiles
+# -----------------------------------------------------------------------------------------------
+def _create_log_normal_size_profile(neuron, rng):
+    # Lognormal size tolerance expects a position tolerance parameter.
+    try:
+        pos_tol = neuron.position.position_tolerance
+    except AttributeError:
+        raise Exception("Position tolerance needed to create log normal size tuning")
+
+    return lst.LogNormalSizeProfile(pos_tol, rng=rng)
+
+
+register_profile(
+    'selectivity', 'power_law',
+    lambda neuron, object_list, rng: pls.PowerLawSparseness(object_list, rng=rng))
+
+register_profile(
+    'selectivity', 'kurtosis',
+    lambda neuron, object_list, rng: ks.KurtosisSparseness(object_list, rng=rng))
+
+register_profile(
+    'position', 'gaussian',
+    lambda neuron, rng: gpt.GaussianPositionProfile(
+        neuron.selectivity.activity_fraction_absolute, rng=rng))
+
+register_profile('size', 'lognormal', _create_log_normal_size_profile)
+
+register_profile('rotation', 'gaussian', lambda neuron, rng: grt.GaussianRotationProfile(rng=rng))
+
+register_profile(
+    'occlusion', 'twoinputsigmoid',
+    lambda neuron, rng: sot.TwoInputSigmoidOcclusionProfile(rng=rng))
+
+register_profile('clutter', 'average', lambda neuron, rng: act.AveragingClutterProfile(rng=rng))
+
+register_profile(
+    'dynamics', 'tamura',
+    lambda neuron, sim_time_step_s, integration, rng: td.TamuraDynamics(
+        sim_time_step_s,
+        neuron.selectivity.objects,
+        neuron.max_fire_rate,
+        integration=integration,
+        rng=rng))
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Random number streams of IT neurons and neuron populations.
+
+All tuning profiles draw their parameters from an optional numpy RandomState (rng). When none
+is given, they draw from the global numpy random state, as before.
+
+Independent streams are derived from a seed and an index (neuron or shard number). The stream
+of each index depends only on the seed and the index, so neurons or shards created in any
+order, or by any number of processes, get the same parameters. E.g.
+
+    rngs = random_streams.spawn_random_states(seed, n)
+    neurons = [it_neuron_vrep.Neuron(object_list, rng=rng) for rng in rngs]
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import numpy as np
+
+
+def get_random_state(rng=None):
+    """
+    :param rng: None, a seed (int or sequence of ints) or a numpy RandomState.
+
+    :rtype : numpy RandomState. For None, numpy.random, which draws from the global state.
+    """
+    if rng is None:
+        return np.random
+
+    if isinstance(rng, np.random.RandomState):
+        return rng
+
+    return np.random.RandomState(rng)
+
+
+def spawn_random_states(seed, n, start=0):
+    """
+    Independent random streams for indices start, ..., start + n - 1. The stream of index i is
+    seeded with the seed followed by i, so streams of different seeds and indices differ.
+
+    :param seed : int or sequence of ints (e.g. the seed followed by a shard index).
+    :param n    : Number of streams.
+    :param start: Index of the first stream. Default = 0.
+
+    :rtype : list of numpy RandomStates.
+    """
+    seed = list(np.atleast_1d(seed))
+
+    return [np.random.RandomState(seed + [idx]) for idx in np.arange(start, start + n)]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the columnar ground truth frame.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import copy
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_neuron_vrep as it
+import it_population as itp
+from ground_truth_frame import FIELDS, GroundTruthFrame
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+GROUND_TRUTH = [
+    ['o1', 0.1, -0.2, 0.3, 0, 1, 0, 1.2, 2, 1, 0, 1, 0, 0.8, 0.5],
+    ['unknown', -0.3, 0.05, 0.1, 0, 1, 0, -0.4, 360, 0, 0, 1, 0, 1.0, -1],
+    ['o7', 0.0, 0.0, 0.6, 0, 1, 0, 3.0, 4, 0, 0, 1, 0, 0.3, 0.9],
+]
+
+
+class TestGroundTruthFrame(unittest.TestCase):
+
+    def test_columns(self):
+        frame = GroundTruthFrame.from_list(GROUND_TRUTH)
+
+        self.assertEqual(len(frame), 3)
+        self.assertEqual(frame.objects, ('o1', 'unknown', 'o7'))
+        self.assertTrue(np.array_equal(frame.rot_y, [1.2, -0.4, 3.0]))
+        self.assertTrue(np.array_equal(frame.vis_d, [0.5, -1, 0.9]))
+
+        for field in FIELDS[1:]:
+            self.assertEqual(getattr(frame, field).dtype, float)
+
+    def test_list_round_trip(self):
+        frame = GroundTruthFrame.from_list(GROUND_TRUTH)
+
+        self.assertEqual(frame.to_list(), GROUND_TRUTH)
+        self.assertEqual(frame[2], GROUND_TRUTH[2])
+        self.assertIs(GroundTruthFrame.from_list(frame), frame)
+
+    def test_single_and_empty_entries(self):
+        # A single entry that is not a list, as accepted by Neuron.firing_rate
+        frame = GroundTruthFrame.from_list(tuple(GROUND_TRUTH[0]))
+        self.assertEqual(frame.to_list(), GROUND_TRUTH[:1])
+
+        frame = GroundTruthFrame.from_list([])
+        self.assertEqual(len(frame), 0)
+        self.assertEqual(frame.x.shape, (0,))
+
+    def test_invalid_columns(self):
+        self.assertRaises(Exception, GroundTruthFrame, ['o1'], [0.1])
+        self.assertRaises(Exception, GroundTruthFrame, ['o1', 'o2'], *([[0.1]] * 14))
+
+    def test_rates_match_lists(self):
+        np.random.seed(2)
+        neuron = it.Neuron(
+            list(OBJECTS),
+            selectivity_profile='Kurtosis',
+            position_profile='Gaussian',
+            size_profile='Lognormal',
+            rotation_profile='Gaussian',
+            occlusion_profile='TwoInputSigmoid')
+        population = itp.NeuronPopulation.from_neurons([copy.deepcopy(neuron)])
+
+        frame = GroundTruthFrame.from_list(GROUND_TRUTH)
+
+        self.assertEqual(neuron.firing_rate(frame)[0], neuron.firing_rate(GROUND_TRUTH)[0])
+        self.assertTrue(np.array_equal(
+            population.firing_rate(frame)[0], population.firing_rate(GROUND_TRUTH)[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the vectorized neuron population.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_neuron_vrep as it
+import it_population as itp
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+
+def get_ground_truth(obj, x=0.0, y=0.0, size=0.3, rot_y=0.0, vis_nd=1.0, vis_d=1.0):
+    """ Ground truth entry of a single object, see main_vrep.get_ground_truth """
+    return [obj, x, y, size, 0, 1, 0, rot_y, 360, 0, 0, 1, 0, vis_nd, vis_d]
+
+
+class TestObjectVocabulary(unittest.TestCase):
+
+    def test_get_ids(self):
+        vocabulary = itp.ObjectVocabulary(['a', 'b', 'c'])
+
+        self.assertEqual(vocabulary.unknown_id, 3)
+        self.assertEqual(list(vocabulary.get_ids(['c', 'x', 'a'])), [2, 3, 0])
+        self.assertEqual(list(vocabulary.get_ids([])), [])
+
+        # IDs of the last frame are reused only while its objects are unchanged
+        self.assertEqual(list(vocabulary.get_ids(('b', 'b'))), [1, 1])
+        self.assertEqual(list(vocabulary.get_ids(['b', 'a'])), [1, 0])
+
+    def test_unknown_objects_have_no_preference(self):
+        population = itp.create_population(
+            OBJECTS, 20, selectivity_profile='kurtosis', rng=np.random.RandomState(0))
+        population.set_diagnostics('full')
+
+        self.assertEqual(population.obj_pref.shape, (20, len(OBJECTS)))
+
+        rates, scales = population.firing_rate(
+            [get_ground_truth('unknown'), get_ground_truth(OBJECTS[4])])
+
+        self.assertTrue(np.all(scales[:, 0, 1] == 0))
+        self.assertTrue(np.all(scales[:, 0, 0] == 0))
+        self.assertTrue(np.array_equal(scales[:, 1, 1], population.obj_pref[:, 4]))
+        self.assertTrue(np.all(scales[:, 1, 0] > 0))
+
+        rates, _ = population.firing_rate([get_ground_truth('unknown')])
+        self.assertTrue(np.all(rates == 0))
+
+
+class TestRankedScales(unittest.TestCase):
+
+    @staticmethod
+    def get_reference_ranked_scales(neuron, neuron_scales, n_ranks):
+        """ Ranked scales of a single neuron, as previously ranked in main_vrep.main """
+        ordered_scales = np.zeros((n_ranks, 7))
+        neuron_ranked_obj_list = neuron.selectivity.get_ranked_object_list()
+
+        for per_seen_obj_scales in neuron_scales:
+            for obj_idx, obj in enumerate(neuron_ranked_obj_list):
+                if obj[1] == per_seen_obj_scales[1]:
+                    break
+
+            ordered_scales[obj_idx, :] = per_seen_obj_scales
+
+        return ordered_scales
+
+    def test_ranks_match_neurons(self):
+        np.random.seed(4)
+        neurons = [
+            it.Neuron(list(OBJECTS), selectivity_profile='Kurtosis', position_profile='Gaussian')
+            for _ in np.arange(10)]
+
+        population = itp.NeuronPopulation.from_neurons(neurons)
+        population.set_diagnostics('full')
+
+        ground_truth = [get_ground_truth(OBJECTS[idx], x=0.1 * idx) for idx in [5, 0, 9]]
+        _, scales = population.firing_rate(ground_truth)
+        ranked_scales = population.get_ranked_scales(ground_truth, scales)
+
+        for n_idx, neuron in enumerate(neurons):
+            ranked_objects = [obj for obj, _ in neuron.selectivity.get_ranked_object_list()]
+            self.assertEqual(
+                list(population.obj_rank[n_idx]),
+                [ranked_objects.index(obj) for obj in population.objects])
+
+            self.assertTrue(np.array_equal(
+                ranked_scales[n_idx],
+                self.get_reference_ranked_scales(neuron, scales[n_idx], len(OBJECTS))))
+
+    def test_tied_preferences(self):
+        population = itp.NeuronPopulation(
+            ['a', 'b', 'c', 'd'],
+            [100, 100],
+            [[0.5, 0.9, 0.5, 0.1],
+             [0.2, 0.2, 0.2, 1.0]])
+        population.set_diagnostics('full')
+
+        # Tied objects get distinct ranks in the order of the object list
+        self.assertEqual(population.obj_rank.tolist(), [[1, 0, 2, 3], [1, 2, 3, 0]])
+
+        ground_truth = [get_ground_truth('c', x=0.2), get_ground_truth('a')]
+        _, scales = population.firing_rate(ground_truth)
+        ranked_scales = population.get_ranked_scales(ground_truth, scales)
+
+        # Scales of both tied objects are kept, in separate rows
+        self.assertTrue(np.array_equal(ranked_scales[0, 1], scales[0, 1]))
+        self.assertTrue(np.array_equal(ranked_scales[0, 2], scales[0, 0]))
+        self.assertTrue(np.array_equal(ranked_scales[1, 1], scales[1, 1]))
+        self.assertTrue(np.array_equal(ranked_scales[1, 3], scales[1, 0]))
+        self.assertTrue(np.all(ranked_scales[:, [0]] == 0))
+
+    def test_unknown_object(self):
+        population = itp.NeuronPopulation(['a', 'b'], [100], [[0.5, 0.9]])
+        population.set_diagnostics('full')
+
+        ground_truth = [get_ground_truth('x')]
+        _, scales = population.firing_rate(ground_truth)
+
+        self.assertRaises(Exception, population.get_ranked_scales, ground_truth, scales)
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def setUp(self):
+        self.population = itp.create_population(
+            OBJECTS,
+            30,
+            selectivity_profile='kurtosis',
+            position_profile='gaussian',
+            size_profile='lognormal',
+            rng=np.random.RandomState(1))
+
+        self.ground_truth = [get_ground_truth(OBJECTS[idx], x=0.05 * idx) for idx in [2, 8]]
+
+        self.population.set_diagnostics('full')
+        self.rates, self.scales = self.population.firing_rate(self.ground_truth)
+
+    def test_no_diagnostics(self):
+        self.population.set_diagnostics('none')
+        rates, scales = self.population.firing_rate(self.ground_truth)
+
+        self.assertIsNone(scales)
+        self.assertIsNone(self.population.get_ranked_scales(self.ground_truth, scales))
+        self.assertTrue(np.array_equal(rates, self.rates))
+
+        # Scales of a single call
+        _, scales = self.population.firing_rate(self.ground_truth, diagnostics='full')
+        self.assertTrue(np.array_equal(scales, self.scales))
+
+    def test_sampled_diagnostics(self):
+        neurons = [3, 17, 29]
+        self.population.set_diagnostics('sampled', neurons=neurons, period=3)
+
+        for frame in np.arange(7):
+            rates, scales = self.population.firing_rate(self.ground_truth)
+            ranked_scales = self.population.get_ranked_scales(
+                self.ground_truth, scales, neurons=neurons)
+
+            self.assertTrue(np.array_equal(rates, self.rates))
+
+            if frame % 3 == 0:
+                self.assertTrue(np.array_equal(scales, self.scales[neurons]))
+                self.assertTrue(np.array_equal(
+                    ranked_scales,
+                    self.population.get_ranked_scales(self.ground_truth, self.scales)[neurons]))
+            else:
+                self.assertIsNone(scales)
+                self.assertIsNone(ranked_scales)
+
+    def test_sampled_empty_frames(self):
+        self.population.set_diagnostics('sampled', period=2)
+
+        _, scales = self.population.firing_rate([])
+        self.assertEqual(scales.shape, (30, 0, 7))
+        self.assertTrue(np.all(self.population.get_ranked_scales([], scales) == 0))
+
+        _, scales = self.population.firing_rate([])
+        self.assertIsNone(scales)
+
+
+if __name__ == '__main__':
+    unittest.main()
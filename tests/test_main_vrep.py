@@ -0,0 +1,472 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the vrep data handling helpers of main_vrep. The vrep remote API is replaced by a
+minimal stand in that serves queued string stream payloads.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import struct
+import sys
+import types
+import unittest
+import warnings
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+# Stand in for the vrep remote API. Payloads queued in stream_payloads are returned by
+# successive reads of any string stream.
+stream_payloads = []
+
+# Handles and absolute poses (6 floats per handle) returned by simxGetObjectGroupData
+group_data = {'handles': [], 'poses': []}
+
+fake_vrep = types.ModuleType('vrep.src.vrep')
+fake_vrep.simx_return_ok = 0
+fake_vrep.simx_return_novalue_flag = 1
+fake_vrep.simx_opmode_oneshot = 0
+fake_vrep.simx_opmode_streaming = 0x020000
+fake_vrep.simx_opmode_buffer = 0x060000
+fake_vrep.sim_appobj_object_type = 109
+fake_vrep.simxReadStringStream = \
+    lambda c_id, name, op_mode: (0, stream_payloads.pop(0)) if stream_payloads else (1, '')
+fake_vrep.simxWriteStringStream = lambda c_id, name, data, op_mode: 0
+fake_vrep.simxSetStringSignal = lambda c_id, name, data, op_mode: 0
+fake_vrep.simxGetObjectGroupData = lambda c_id, obj_type, data_type, op_mode: \
+    (0, list(group_data['handles']), [], list(group_data['poses']), [])
+fake_vrep.simxPackInts = lambda values: ''.join(struct.pack('<i', value) for value in values)
+fake_vrep.simxUnpackInts = lambda data: \
+    [struct.unpack('<i', data[idx:idx + 4])[0] for idx in range(0, len(data) // 4 * 4, 4)]
+fake_vrep.simxUnpackFloats = lambda data: \
+    [struct.unpack('<f', data[idx:idx + 4])[0] for idx in range(0, len(data) // 4 * 4, 4)]
+
+fake_vrep_src = types.ModuleType('vrep.src')
+fake_vrep_src.vrep = fake_vrep
+
+sys.modules['vrep'] = types.ModuleType('vrep')
+sys.modules['vrep.src'] = fake_vrep_src
+sys.modules['vrep.src.vrep'] = fake_vrep
+
+import main_vrep
+
+
+def pack_floats(values):
+    """ A float payload, as written by the vision sensor child script """
+    return struct.pack('<%df' % len(values), *values)
+
+
+def get_visibility_levels_loop(objects_list, retrieved_data):
+    """ Row matching of get_object_visibility_levels before the hash lookups (baseline) """
+    visibility_levels = np.zeros(shape=(len(objects_list), 2))
+    sizes = np.zeros(shape=len(objects_list))
+    visibility_levels[:, 1] = -1
+
+    for data_idx in np.arange(retrieved_data.shape[0]):
+        identity = np.int(retrieved_data[data_idx, 0])
+
+        for obj_list_idx, obj in enumerate(objects_list):
+
+            if identity == obj.handle:
+                if not visibility_levels[obj_list_idx][0]:
+                    visibility_levels[obj_list_idx][0] = retrieved_data[data_idx, 1]
+
+                sizes[obj_list_idx] = retrieved_data[data_idx, 3] * np.pi
+
+            elif identity in obj.diag_children:
+
+                for count in np.arange(retrieved_data.shape[0]):
+                    if obj.handle == np.int(retrieved_data[count, 0]):
+                        parent_data_idx = count
+
+                parent_visible_pixels = retrieved_data[parent_data_idx, 2]
+                parent_total_pixels = parent_visible_pixels / \
+                    retrieved_data[parent_data_idx, 1]
+
+                diagnostic_visible_pixels = retrieved_data[data_idx, 2]
+                diagnostic_total_pixels = diagnostic_visible_pixels / \
+                    retrieved_data[data_idx, 1]
+
+                nondiagnostic_visible_pixels = parent_visible_pixels - \
+                    diagnostic_visible_pixels
+
+                nondiagnostic_total_pixels = parent_total_pixels - \
+                    diagnostic_total_pixels
+
+                visibility_levels[obj_list_idx][0] = nondiagnostic_visible_pixels / \
+                    nondiagnostic_total_pixels
+
+                visibility_levels[obj_list_idx][1] = retrieved_data[data_idx, 1]
+
+    return visibility_levels, sizes
+
+
+class TestObjectVisibilityLevels(unittest.TestCase):
+
+    def setUp(self):
+        main_vrep.occlusion_data_prev = None
+        del stream_payloads[:]
+
+        # Objects with odd indices have a diagnostic and a nondiagnostic part
+        self.objects = []
+        for idx in np.arange(8):
+            obj = main_vrep.VrepObject('o%d' % idx, 10 * (idx + 1), 1.0)
+            if idx % 2:
+                obj.diag_children = [obj.handle + 1]
+                obj.non_diag_children = [obj.handle + 2]
+
+            self.objects.append(obj)
+
+    def get_visibility_levels(self, rows, step=3):
+        stream_payloads.append(pack_floats([main_vrep.OCCLUSION_FRAME_MARKER, step] +
+                                           [value for row in rows for value in row]))
+
+        return main_vrep.get_object_visibility_levels(self.objects, 0, step)
+
+    def test_matches_loop(self):
+        rng = np.random.RandomState(0)
+
+        for _ in np.arange(20):
+            rows = []
+
+            for obj in self.objects:
+                # Repeated parent rows, some of them with a visibility of 0
+                for _ in np.arange(rng.randint(1, 4)):
+                    rows.append([obj.handle, rng.choice([0, rng.uniform(0.2, 1)]),
+                                 rng.uniform(100, 200), rng.uniform(0, 0.5)])
+
+                for child in obj.diag_children:
+                    rows.append([child, rng.uniform(0.1, 1), rng.uniform(10, 50), 0.1])
+
+                # Nondiagnostic parts and unknown handles are ignored
+                for child in obj.non_diag_children:
+                    rows.append([child, rng.uniform(0.1, 1), rng.uniform(10, 50), 0.1])
+
+            rows.append([999, 0.5, 10, 0.1])
+            rows = [rows[idx] for idx in rng.permutation(len(rows))]
+
+            # Compare against the values the float payload holds. Parent rows with a
+            # visibility of 0 give infinite total pixel counts in both.
+            retrieved_data = np.array(rows, dtype=np.float32).astype(float)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                visibility_levels, sizes = self.get_visibility_levels(rows)
+                ref_visibility_levels, ref_sizes = \
+                    get_visibility_levels_loop(self.objects, retrieved_data)
+
+            self.assertTrue(np.array_equal(visibility_levels, ref_visibility_levels))
+            self.assertTrue(np.array_equal(sizes, ref_sizes))
+
+    def test_visibility_still_zero_is_replaced(self):
+        obj = self.objects[0]
+        visibility_levels, sizes = self.get_visibility_levels([
+            [obj.handle, 0, 0, 0.25],
+            [obj.handle, 0.5, 100, 0.125],
+            [obj.handle, 0.75, 150, 0.5]])
+
+        self.assertEqual(visibility_levels[0, 0], 0.5)
+        self.assertEqual(sizes[0], 0.5 * np.pi)
+
+    def test_diagnostic_part_without_parent(self):
+        obj = self.objects[1]
+        visibility_levels, sizes = self.get_visibility_levels(
+            [[obj.diag_children[0], 0.5, 20, 0.1]])
+
+        self.assertTrue(np.array_equal(visibility_levels[1], [0, -1]))
+        self.assertEqual(sizes[1], 0)
+
+
+class TestOcclusionHandshake(unittest.TestCase):
+
+    def setUp(self):
+        del stream_payloads[:]
+        self.rows = [[10, 0.5, 100, 0.25], [20, 0.75, 30, 0.125]]
+
+    def tearDown(self):
+        del stream_payloads[:]
+
+    def get_payload(self, step, rows):
+        return [main_vrep.OCCLUSION_FRAME_MARKER, step] + [value for row in rows for value in row]
+
+    def test_latest_frame(self):
+        # Unstamped payloads from older child scripts
+        step, frame = main_vrep.get_latest_occlusion_frame(
+            np.array([value for row in self.rows for value in row]))
+        self.assertIsNone(step)
+        self.assertTrue(np.array_equal(frame, self.rows))
+
+        # Several payloads in the stream buffer, including one of an object without rows
+        data = np.array(self.get_payload(4, self.rows[:1]) + self.get_payload(5, []) +
+                        self.get_payload(6, self.rows))
+        step, frame = main_vrep.get_latest_occlusion_frame(data)
+        self.assertEqual(step, 6)
+        self.assertTrue(np.array_equal(frame, self.rows))
+
+        step, frame = main_vrep.get_latest_occlusion_frame(data[:-4])
+        self.assertEqual(step, 6)
+        self.assertTrue(np.array_equal(frame, self.rows[:1]))
+
+    def test_truncated_frame(self):
+        data = np.array(self.get_payload(4, self.rows) + [main_vrep.OCCLUSION_FRAME_MARKER])
+
+        # The last payload has no stamp, the previous one is used
+        step, frame = main_vrep.get_latest_occlusion_frame(data)
+        self.assertEqual(step, 4)
+        self.assertTrue(np.array_equal(frame, self.rows))
+
+        step, frame = main_vrep.get_latest_occlusion_frame(data[-1:])
+        self.assertIsNone(step)
+        self.assertEqual(frame.shape, (0, 4))
+
+    def test_wait_for_step(self):
+        # Payloads of earlier steps are discarded
+        stream_payloads.extend([
+            '',
+            pack_floats(self.get_payload(2, self.rows[:1])),
+            pack_floats(self.get_payload(3, self.rows))])
+
+        frame = main_vrep.wait_for_occlusion_data(0, 3, timeout_s=1.0)
+        self.assertTrue(np.array_equal(frame, self.rows))
+        self.assertEqual(stream_payloads, [])
+
+        # A later step is also accepted
+        stream_payloads.append(pack_floats(self.get_payload(5, self.rows[1:])))
+        frame = main_vrep.wait_for_occlusion_data(0, 4, timeout_s=1.0)
+        self.assertTrue(np.array_equal(frame, self.rows[1:]))
+
+    def test_wait_timeout(self):
+        stream_payloads.append(pack_floats(self.get_payload(2, self.rows)))
+        self.assertIsNone(main_vrep.wait_for_occlusion_data(0, 3, timeout_s=0.01))
+
+    def test_rotation_symmetries_timeout(self):
+        objects = [main_vrep.VrepObject('a', 10, 1.0), main_vrep.VrepObject('b', 30, 1.0)]
+
+        # Without data in time, the current rotation symmetries are kept
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            main_vrep.update_rotation_symmetries(0, objects, timeout_s=0.01)
+
+        self.assertEqual(len(caught), 1)
+        self.assertEqual([obj.y_rot_period for obj in objects], [1, 1])
+
+        stream_payloads.append(main_vrep.pack_ints([10, 2, 1, 4, 0, 1, 1, 30, 1, 0, 360, 1, 2, 0]))
+        main_vrep.update_rotation_symmetries(0, objects, timeout_s=1.0)
+
+        self.assertEqual([(obj.x_rot_period, obj.y_rot_period, obj.y_rot_mirror_symmetric)
+                          for obj in objects], [(2, 4, 0), (1, 360, 1)])
+
+
+def get_rotation_matrix(alpha, beta, gamma):
+    """ Rx(alpha) * Ry(beta) * Rz(gamma) """
+    rot_x = np.array([[1, 0, 0],
+                      [0, np.cos(alpha), -np.sin(alpha)],
+                      [0, np.sin(alpha), np.cos(alpha)]])
+
+    rot_y = np.array([[np.cos(beta), 0, np.sin(beta)],
+                      [0, 1, 0],
+                      [-np.sin(beta), 0, np.cos(beta)]])
+
+    rot_z = np.array([[np.cos(gamma), -np.sin(gamma), 0],
+                      [np.sin(gamma), np.cos(gamma), 0],
+                      [0, 0, 1]])
+
+    return np.dot(rot_x, np.dot(rot_y, rot_z))
+
+
+class TestObjectPoses(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+
+        self.euler_angles = np.column_stack((
+            rng.uniform(-np.pi, np.pi, size=50),
+            rng.uniform(-np.pi / 2, np.pi / 2, size=50),
+            rng.uniform(-np.pi, np.pi, size=50)))
+
+        self.handles = [10 * (idx + 1) for idx in np.arange(50)]
+        self.positions = rng.uniform(-5, 5, size=(50, 3))
+
+        group_data['handles'] = self.handles
+        group_data['poses'] = np.column_stack((self.positions, self.euler_angles)).ravel()
+
+    def test_rotation_matrices(self):
+        rot = main_vrep.euler_to_rotation_matrices(self.euler_angles)
+
+        for idx, angles in enumerate(self.euler_angles):
+            self.assertTrue(np.allclose(rot[idx], get_rotation_matrix(*angles)))
+
+        self.assertTrue(np.allclose(main_vrep.rotation_matrices_to_euler(rot), self.euler_angles))
+
+    def test_relative_poses(self):
+        ref_idx = 7
+        ref_rot = get_rotation_matrix(*self.euler_angles[ref_idx])
+
+        # Unknown handles are NaN
+        object_handles = self.handles[::-1] + [5]
+        positions, rotations = main_vrep.get_object_poses(0, object_handles, self.handles[ref_idx])
+
+        self.assertTrue(np.all(np.isnan(positions[-1])))
+        self.assertTrue(np.all(np.isnan(rotations[-1])))
+
+        for idx, handle in enumerate(object_handles[:-1]):
+            data_idx = self.handles.index(handle)
+
+            self.assertTrue(np.allclose(
+                positions[idx],
+                np.dot(ref_rot.T, self.positions[data_idx] - self.positions[ref_idx])))
+
+            self.assertTrue(np.allclose(
+                get_rotation_matrix(*rotations[idx]),
+                np.dot(ref_rot.T, get_rotation_matrix(*self.euler_angles[data_idx]))))
+
+        # The reference frame itself
+        idx = object_handles.index(self.handles[ref_idx])
+        self.assertTrue(np.allclose(positions[idx], 0))
+        self.assertTrue(np.allclose(rotations[idx], 0))
+
+    def test_unavailable_poses(self):
+        # Streaming initialization does not return poses
+        positions, rotations = main_vrep.get_object_poses(
+            0, self.handles, self.handles[0], fake_vrep.simx_opmode_streaming)
+        self.assertTrue(np.all(np.isnan(positions)) and np.all(np.isnan(rotations)))
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            positions, rotations = main_vrep.get_object_poses(0, self.handles, 5)
+
+        self.assertEqual(len(caught), 1)
+        self.assertTrue(np.all(np.isnan(positions)) and np.all(np.isnan(rotations)))
+
+
+def project_loop(position, max_dimension, proj_mat, ar, projection_angle):
+    """ Projection of a single object in get_ground_truth before vectorization (baseline) """
+    pos_world = np.append(position, 1)
+
+    camera_homogeneous = np.dot(proj_mat, pos_world)
+
+    e = 1.0 / camera_homogeneous[-1]
+    p_mat2 = np.array([[e, 0, 0, 0],
+                       [0, e, 0, 0],
+                       [0, 0, e, 0],
+                       [0, 0, 0, 1]])
+
+    camera_cartesian = np.dot(p_mat2, camera_homogeneous)
+
+    epsilon = 1 * 10**-2.75
+
+    if ((-1 - epsilon <= camera_cartesian[0] <= 1 + epsilon) and
+            (-1 - epsilon <= camera_cartesian[1] <= 1 + epsilon) and
+            (-1 - epsilon <= camera_cartesian[2] <= 1 + epsilon)):
+        x = np.pi / 2 * ar * camera_cartesian[0]
+        y = np.pi / 2 * camera_cartesian[1]
+
+        distance = np.sqrt(x**2 + y**2 + camera_cartesian[-1]**2)
+        size = (np.pi * max_dimension) / (2 * ar * distance * np.tan(projection_angle / 2))
+
+        return True, x, y, size
+
+    return False, None, None, None
+
+
+class TestProjectToVisionFrame(unittest.TestCase):
+
+    def setUp(self):
+        # Vision sensor projection matrix, as constructed in main
+        self.alpha_rad = np.pi / 3
+        self.ar = 4.0 / 3
+        z_near, z_far = 0.01, 10.0
+
+        a = 1.0 / (self.ar * np.tan(self.alpha_rad / 2.0))
+        b = 1.0 / np.tan(self.alpha_rad / 2.0)
+        c = - (z_near + z_far) / (z_near - z_far)
+        d = (2 * z_near * z_far) / (z_near - z_far)
+
+        self.proj_mat = np.array([[a, 0, 0, 0],
+                                  [0, b, 0, 0],
+                                  [0, 0, c, d],
+                                  [0, 0, 1, 0]])
+
+    def test_matches_loop(self):
+        rng = np.random.RandomState(0)
+
+        # Objects in front of, behind, beyond the clipping planes of and in the plane of the
+        # vision sensor
+        positions = np.column_stack((
+            rng.uniform(-4, 4, size=500),
+            rng.uniform(-4, 4, size=500),
+            rng.uniform(-2, 12, size=500)))
+        positions[:5, 2] = 0
+        max_dimensions = rng.uniform(0.05, 1, size=500)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            in_frame, x, y, sizes = main_vrep.project_to_vision_frame(
+                positions, max_dimensions, self.proj_mat, self.ar, self.alpha_rad)
+
+            expected = [project_loop(position, max_dimension, self.proj_mat, self.ar,
+                                     self.alpha_rad)
+                        for position, max_dimension in zip(positions, max_dimensions)]
+
+        self.assertTrue(np.array_equal(in_frame, [entry[0] for entry in expected]))
+        self.assertTrue(50 < np.count_nonzero(in_frame) < 450)
+
+        for idx in np.flatnonzero(in_frame):
+            self.assertTrue(np.allclose((x[idx], y[idx], sizes[idx]), expected[idx][1:]))
+
+    def test_frame_edges(self):
+        # Centers just inside the tolerance of the frame edges are in frame
+        z = 2.0
+        x_edge = z * np.tan(self.alpha_rad / 2) * self.ar
+        y_edge = z * np.tan(self.alpha_rad / 2)
+
+        positions = np.array([[0, 0, z],
+                              [x_edge * 1.001, 0, z],
+                              [x_edge * 1.01, 0, z],
+                              [0, -y_edge * 1.001, z],
+                              [0, -y_edge * 1.01, z]])
+
+        in_frame, x, y, sizes = main_vrep.project_to_vision_frame(
+            positions, np.ones(5), self.proj_mat, self.ar, self.alpha_rad)
+
+        self.assertTrue(np.array_equal(in_frame, [True, True, False, True, False]))
+        self.assertEqual((x[0], y[0]), (0, 0))
+        self.assertAlmostEqual(sizes[0], np.pi / (2 * self.ar * z * np.tan(self.alpha_rad / 2)))
+
+
+class TestPackedStreams(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.ints = list(rng.randint(-2**31, 2**31 - 1, size=200)) + [-1, 0, 1]
+        self.floats = list(rng.uniform(-1000, 1000, size=200)) + [-2, 0, 0.5]
+
+    def test_pack_ints(self):
+        self.assertEqual(main_vrep.pack_ints(self.ints), fake_vrep.simxPackInts(self.ints))
+        self.assertEqual(main_vrep.pack_ints([]), '')
+
+    def test_unpack(self):
+        packed_ints = fake_vrep.simxPackInts(self.ints)
+        packed_floats = pack_floats(self.floats)
+
+        # Trailing bytes that do not make up a full value are ignored
+        for trailing in ['', 'a', 'abc']:
+            self.assertEqual(list(main_vrep.unpack_ints(packed_ints + trailing)),
+                             fake_vrep.simxUnpackInts(packed_ints + trailing))
+            self.assertEqual(list(main_vrep.unpack_floats(packed_floats + trailing)),
+                             fake_vrep.simxUnpackFloats(packed_floats + trailing))
+
+        self.assertEqual(main_vrep.unpack_ints('').size, 0)
+        self.assertEqual(main_vrep.unpack_floats('ab').size, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the two input sigmoid occlusion profile.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import sys
+import unittest
+import warnings
+
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_population as itp
+from OcclusionTolerance import two_input_sigmoid_occlusion_profile as occ
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+
+class TestSampleParameters(unittest.TestCase):
+
+    def setUp(self):
+        # Sigmoids of weights tried for unreachable ratios overflow
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+    def tearDown(self):
+        warnings.resetwarnings()
+
+    def test_large_population(self):
+        # Ratios above ~0.75 cannot be generated and used to fail the whole population
+        population = itp.create_population(
+            OBJECTS,
+            10000,
+            selectivity_profile='kurtosis',
+            occlusion_profile='twoinputsigmoid',
+            rng=np.random.RandomState(0))
+
+        self.assertEqual(population.n, 10000)
+        self.assertTrue(np.all(population.w_d >= population.w_nd))
+        self.assertTrue(np.all(population.w_nd >= 0))
+
+    def test_weights_match_ratios(self):
+        profile = occ.TwoInputSigmoidOcclusionProfile
+
+        for seed in np.arange(3):
+            ratio, _, b, w_d, w_nd = profile.sample_parameters(
+                5000, rng=np.random.RandomState(seed))
+
+            self.assertTrue(np.all(w_nd >= 0))
+            self.assertLess(np.max(np.abs(profile.calculate_ratio(w_d, w_nd, b) - ratio)), 0.01)
+
+    def test_single_neurons(self):
+        for seed in np.arange(100):
+            profile = occ.TwoInputSigmoidOcclusionProfile(rng=np.random.RandomState(seed))
+            self.assertTrue(profile.w_vector[1, 0] >= profile.w_vector[0, 0] >= 0)
+
+
+class TestOcclusionWeightsTable(unittest.TestCase):
+
+    def test_lookup_matches_fsolve(self):
+        profile = occ.TwoInputSigmoidOcclusionProfile
+        rng = np.random.RandomState(0)
+
+        w_c, b = profile._get_combined_weight_and_bias(200, rng=rng)
+        ratio = profile._get_diagnostic_group_to_total_variance_ratio(200, rng=rng)
+
+        w_d, w_nd, found = occ.lookup_weights(w_c, b, ratio)
+        self.assertGreater(np.count_nonzero(found), 150)
+
+        ratio_error = np.abs(profile.calculate_ratio(w_d, w_nd, b) - ratio)[found]
+        self.assertLess(np.max(ratio_error), 5e-3)
+
+        for idx in np.flatnonzero(found)[:30]:
+            solved_w_d, solved_w_nd = profile._solve_weights(w_c[idx], b[idx], ratio[idx])
+
+            self.assertLess(abs(solved_w_d - w_d[idx]), 0.05)
+            self.assertLess(abs(solved_w_nd - w_nd[idx]), 0.05)
+
+    def test_out_of_table_points_not_found(self):
+        # Combined weight above and bias below the table range
+        w_d, w_nd, found = occ.lookup_weights(
+            np.array([20.0, 4.0]), np.array([-3.0, -8.0]), np.array([0.3, 0.3]))
+
+        self.assertFalse(np.any(found))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Parity checks of the vectorized engines against the per-neuron code paths they replace.
+
+    NeuronPopulation.firing_rate    vs  it_neuron_vrep.Neuron.firing_rate
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import copy
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_neuron_vrep as it
+import it_population as itp
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+PROFILES = dict(
+    selectivity_profile='Kurtosis',
+    position_profile='Gaussian',
+    size_profile='Lognormal',
+    rotation_profile='Gaussian',
+    dynamic_profile='Tamura',
+    occlusion_profile='TwoInputSigmoid')
+
+
+def get_ground_truth_list(rng, n_objects, diagnostic=True):
+    """ Random ground truth entries (see main_vrep.get_ground_truth), including unknown objects """
+    entries = []
+
+    for idx in np.arange(n_objects):
+        entries.append([
+            OBJECTS[rng.randint(len(OBJECTS))] if idx else 'unknown',
+            rng.uniform(-0.5, 0.5),
+            rng.uniform(-0.5, 0.5),
+            rng.uniform(0, 0.5),
+            0, 1, 0,
+            rng.uniform(-4, 4),
+            rng.choice([1, 2, 4, 360]),
+            rng.randint(2),
+            0, 1, 0,
+            rng.uniform(),
+            rng.uniform() if diagnostic else -1])
+
+    return entries
+
+
+class TestPopulationParity(unittest.TestCase):
+
+    def test_population_matches_neurons(self):
+        np.random.seed(1)
+        neurons = [it.Neuron(list(OBJECTS), **PROFILES) for _ in np.arange(30)]
+        reference = copy.deepcopy(neurons)
+
+        population = itp.NeuronPopulation.from_neurons(neurons)
+        population.set_diagnostics('full')
+
+        rng = np.random.RandomState(3)
+
+        # Objects for 120 steps, then none, to also compare the decay of the dynamics
+        for step in np.arange(200):
+            if step < 120:
+                ground_truth = get_ground_truth_list(rng, rng.randint(0, 5), rng.randint(2))
+            else:
+                ground_truth = []
+
+            rates, scales = population.firing_rate(ground_truth)
+            ref_rates = np.array([neuron.firing_rate(ground_truth)[0] for neuron in reference])
+
+            self.assertEqual(np.max(np.abs(rates - ref_rates)), 0)
+
+            for n_idx, neuron in enumerate(reference):
+                if ground_truth:
+                    ref_scales = neuron._get_static_firing_rate(
+                        neuron.selectivity.objects, ground_truth)[1]
+                    self.assertTrue(np.allclose(scales[n_idx], ref_scales))
+
+if __name__ == '__main__':
+    unittest.main()
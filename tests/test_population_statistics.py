@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the population selectivity and sparseness statistics.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import scipy.stats
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_neuron_vrep as it
+import population_statistics as stats
+import population_utils as utils
+from ObjectSelectivity.kurtosis_selectivity_profile import calculate_kurtosis
+from ObjectSelectivity.power_law_selectivity_profile import calculate_activity_fraction
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+
+def get_rates(n_neurons, n_objects, seed):
+    """ Gamma distributed rates with a different shape parameter for each neuron """
+    rng = np.random.RandomState(seed)
+    a = rng.uniform(1, 5, size=n_neurons)
+
+    return rng.gamma(a[:, np.newaxis], size=(n_neurons, n_objects))
+
+
+class TestPopulationStatistics(unittest.TestCase):
+
+    def test_kurtosis(self):
+        rates = get_rates(1, 200, 0)[0]
+
+        self.assertAlmostEqual(
+            calculate_kurtosis(rates), scipy.stats.kurtosis(rates, fisher=True, bias=True))
+
+    def test_matches_per_neuron_and_object_loops(self):
+        rates = get_rates(300, 40, 1)
+
+        selectivities, sparsenesses, activity_fractions, mean_rates = \
+            stats.get_population_statistics(rates)
+
+        self.assertTrue(np.allclose(selectivities, [calculate_kurtosis(row) for row in rates]))
+        self.assertTrue(np.allclose(sparsenesses, [calculate_kurtosis(col) for col in rates.T]))
+        self.assertTrue(np.allclose(
+            activity_fractions, [calculate_activity_fraction(row) for row in rates]))
+        self.assertTrue(np.allclose(mean_rates, [np.mean(row) for row in rates]))
+
+    def test_chunked(self):
+        rates = get_rates(1000, 25, 2)
+        expected = stats.get_population_statistics(rates)
+
+        temp_dir = tempfile.mkdtemp()
+        try:
+            rates_map = np.memmap(
+                os.path.join(temp_dir, 'rates.dat'), dtype=float, mode='w+', shape=rates.shape)
+            rates_map[:] = rates
+
+            # Chunks that do not divide the number of neurons, a single chunk and single rows
+            for chunk_size in [1, 7, 333, 1000, 5000]:
+                chunked = stats.get_population_statistics_chunked(rates_map, chunk_size)
+
+                for result, expected_result in zip(chunked, expected):
+                    self.assertTrue(np.allclose(result, expected_result, rtol=1e-10))
+
+            del rates_map
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+class TestPopulationUtils(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(0)
+        self.population = [it.Neuron(list(OBJECTS), selectivity_profile='kurtosis')
+                           for _ in np.arange(30)]
+
+        self.rates = np.array([
+            [neuron.selectivity.objects[obj] * neuron.max_fire_rate for obj in OBJECTS]
+            for neuron in self.population])
+
+    def tearDown(self):
+        plt.close('all')
+
+    def test_rate_matrix(self):
+        self.assertTrue(np.allclose(utils.get_rate_matrix(self.population, OBJECTS), self.rates))
+
+    def test_plotted_kurtosis(self):
+        f, axis = plt.subplots()
+        utils.plot_single_neuron_selectivities(self.population, axis=axis)
+        self.assertEqual(
+            axis.texts[0].get_text(),
+            'Mean=%0.2f' % np.mean([calculate_kurtosis(row) for row in self.rates]))
+
+        f, axis = plt.subplots()
+        utils.plot_population_sparseness(self.population, axis=axis)
+        self.assertEqual(
+            axis.texts[0].get_text(),
+            'Mean=%0.2f' % np.mean([calculate_kurtosis(col) for col in self.rates.T]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of saving, loading and building neuron populations.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+import warnings
+
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_population as itp
+import random_streams
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+PROFILES = dict(
+    selectivity_profile='kurtosis',
+    position_profile='gaussian',
+    size_profile='lognormal',
+    rotation_profile='gaussian',
+    dynamic_profile='tamura',
+    occlusion_profile='twoinputsigmoid')
+
+
+def get_ground_truth_list(rng, n_objects):
+    """ Random ground truth entries (see main_vrep.get_ground_truth), including unknown objects """
+    entries = []
+
+    for idx in np.arange(n_objects):
+        entries.append([
+            OBJECTS[rng.randint(len(OBJECTS))] if idx else 'unknown',
+            rng.uniform(-0.5, 0.5),
+            rng.uniform(-0.5, 0.5),
+            rng.uniform(0, 0.5),
+            0, 1, 0,
+            rng.uniform(-4, 4),
+            rng.choice([1, 2, 4, 360]),
+            rng.randint(2),
+            0, 1, 0,
+            rng.uniform(),
+            rng.uniform()])
+
+    return entries
+
+
+class TestPopulationStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+        # Sigmoids of occlusion weights tried for unreachable ratios overflow
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        warnings.resetwarnings()
+
+    def assert_same_rates(self, population, loaded, n_steps):
+        rng = np.random.RandomState(5)
+
+        for step in np.arange(n_steps):
+            ground_truth = get_ground_truth_list(rng, 3) if step < n_steps / 2 else []
+
+            rates, _ = population.firing_rate(ground_truth)
+            loaded_rates, _ = loaded.firing_rate(ground_truth)
+
+            self.assertTrue(np.array_equal(rates, loaded_rates))
+
+    def test_save_load_round_trip(self):
+        np.random.seed(7)
+        population = itp.create_population(OBJECTS, 50, **PROFILES)
+
+        file_name = os.path.join(self.temp_dir, 'population.npz')
+        itp.save_population(population, file_name)
+        loaded = itp.load_population(file_name)
+
+        self.assertEqual(loaded.objects, population.objects)
+        self.assert_same_rates(population, loaded, 80)
+
+    def test_large_population(self):
+        population = itp.create_population(
+            OBJECTS, 20000, rng=np.random.RandomState(11), **PROFILES)
+
+        file_name = os.path.join(self.temp_dir, 'population.npz')
+        itp.save_population(population, file_name)
+        loaded = itp.load_population(file_name)
+
+        arrays = itp._get_population_arrays(population)
+        loaded_arrays = itp._get_population_arrays(loaded)
+
+        self.assertEqual(sorted(arrays.keys()), sorted(loaded_arrays.keys()))
+        for key in arrays:
+            self.assertTrue(np.array_equal(arrays[key], loaded_arrays[key]), key)
+
+        self.assertEqual(loaded.n, 20000)
+        self.assert_same_rates(population, loaded, 20)
+
+    def test_partial_tuning(self):
+        # Profiles that were not sampled are not stored and stay tolerant after loading
+        population = itp.create_population(
+            OBJECTS, 100, selectivity_profile='kurtosis', rng=np.random.RandomState(2))
+
+        file_name = os.path.join(self.temp_dir, 'population.npz')
+        itp.save_population(population, file_name)
+        loaded = itp.load_population(file_name)
+
+        self.assertIsNone(loaded.rf_center)
+        self.assertIsNone(loaded.w_d)
+        self.assertIsNone(loaded.dynamics)
+        self.assert_same_rates(population, loaded, 10)
+
+
+class TestBuildPopulation(unittest.TestCase):
+
+    def setUp(self):
+        # Sigmoids of occlusion weights tried for unreachable ratios overflow
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+    def tearDown(self):
+        warnings.resetwarnings()
+
+    def assert_same_arrays(self, arrays, other_arrays):
+        self.assertEqual(sorted(arrays.keys()), sorted(other_arrays.keys()))
+        for key in arrays:
+            self.assertTrue(np.array_equal(arrays[key], other_arrays[key]), key)
+
+    def test_worker_invariance(self):
+        single = itp.build_population(OBJECTS, 60, workers=1, seed=3, shard_size=16, **PROFILES)
+        pooled = itp.build_population(OBJECTS, 60, workers=3, seed=3, shard_size=16, **PROFILES)
+
+        single_arrays = itp._get_population_arrays(single)
+        self.assertIn('w_d', single_arrays)
+        self.assertIn('dynamics_late_gain', single_arrays)
+
+        self.assertEqual(single.n, 60)
+        self.assert_same_arrays(single_arrays, itp._get_population_arrays(pooled))
+
+    def test_shard_streams(self):
+        population = itp.build_population(OBJECTS, 40, seed=3, shard_size=16, **PROFILES)
+        arrays = itp._get_population_arrays(population)
+
+        # The last shard has the remaining 8 neurons
+        shard = itp.create_population(
+            OBJECTS, 8, rng=random_streams.spawn_random_states(3, 1, start=2)[0], **PROFILES)
+
+        shard_arrays = itp._get_population_arrays(shard)
+        for key in shard_arrays:
+            if shard_arrays[key].ndim:
+                self.assertTrue(np.array_equal(arrays[key][32:], shard_arrays[key]), key)
+
+    def test_invalid_arguments(self):
+        self.assertRaises(Exception, itp.build_population, OBJECTS, 0, seed=1)
+        self.assertRaises(Exception, itp.build_population, OBJECTS, 10, rng=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the tuning profile registry.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_neuron_vrep as it
+import profile_registry as registry
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+
+class ConstantRotationProfile:
+    def __init__(self, rate_modifier):
+        self.type = 'constant'
+        self.rate_modifier = rate_modifier
+
+    def firing_rate_modifier(self, x, rotation_symmetry_period, mirror_symmetric):
+        return self.rate_modifier * np.ones_like(x)
+
+
+class TestProfileRegistry(unittest.TestCase):
+
+    def tearDown(self):
+        registry._factories['rotation'].pop('constant', None)
+
+    def test_built_in_profiles(self):
+        self.assertEqual(registry.get_profile_names('selectivity'), ['kurtosis', 'power_law'])
+        self.assertEqual(registry.get_profile_names('occlusion'), ['twoinputsigmoid'])
+        self.assertEqual(registry.get_profile_names('dynamics'), ['tamura'])
+
+        neuron = it.Neuron(
+            list(OBJECTS),
+            selectivity_profile='Kurtosis',
+            position_profile='GAUSSIAN',
+            size_profile='lognormal',
+            rotation_profile='Gaussian',
+            occlusion_profile='TwoInputSigmoid',
+            dynamic_profile='Tamura',
+            rng=np.random.RandomState(0))
+
+        self.assertEqual(neuron.selectivity.type, 'kurtosis')
+        self.assertEqual(neuron.occlusion.type, 'two_input_sigmoid')
+        self.assertEqual(neuron.dynamics.type, 'tamura')
+
+        # Max firing rate of the kurtosis selectivity profile
+        self.assertNotEqual(neuron.max_fire_rate, 100)
+
+    def test_invalid_profiles(self):
+        self.assertRaises(Exception, registry.create_profile, 'position', 'square', None)
+        self.assertRaises(Exception, registry.register_profile, 'color', 'red', None)
+        self.assertRaises(Exception, it.Neuron, list(OBJECTS), rotation_profile='constant')
+
+        # Log normal size tuning needs a position tolerance
+        self.assertRaises(Exception, it.Neuron, list(OBJECTS), size_profile='lognormal')
+
+    def test_registered_profile(self):
+        registry.register_profile(
+            'rotation', 'Constant', lambda neuron, rng: ConstantRotationProfile(0.5))
+
+        self.assertIn('constant', registry.get_profile_names('rotation'))
+
+        neuron = it.Neuron(list(OBJECTS), rotation_profile='constant')
+        self.assertEqual(neuron.rotation.type, 'constant')
+
+        obj = neuron.selectivity.get_ranked_object_list()[0][0]
+        ground_truth = [obj, 0, 0, 0.3, 0, 1, 0, 1.0, 360, 0, 0, 1, 0, 1, 1]
+
+        rate = neuron.firing_rate([ground_truth])[0]
+        self.assertAlmostEqual(rate, 0.5 * neuron.max_fire_rate)
+
+
+if __name__ == '__main__':
+    unittest.main()
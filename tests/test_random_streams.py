@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the random streams of neurons and neuron populations.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_neuron_vrep as it
+import it_population as itp
+import random_streams
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+PROFILES = dict(
+    selectivity_profile='kurtosis',
+    position_profile='gaussian',
+    size_profile='lognormal',
+    rotation_profile='gaussian',
+    occlusion_profile='twoinputsigmoid',
+    dynamic_profile='tamura')
+
+
+def get_neuron_parameters(neuron):
+    """ Parameters drawn by the tuning profiles of a neuron """
+    return [
+        sorted(neuron.selectivity.objects.items()),
+        neuron.max_fire_rate,
+        list(neuron.position.rf_center),
+        neuron.position.position_tolerance,
+        neuron.size.pref_size,
+        neuron.size.size_bw,
+        neuron.rotation.preferred_angle,
+        neuron.rotation.spread,
+        neuron.occlusion.w_combine,
+        neuron.occlusion.bias,
+        neuron.clutter.d,
+        neuron.dynamics.early_tau,
+        neuron.dynamics.late_tau,
+        neuron.dynamics.late_additional_latency,
+    ]
+
+
+class TestRandomStreams(unittest.TestCase):
+
+    def test_get_random_state(self):
+        self.assertIs(random_streams.get_random_state(), np.random)
+
+        rng = np.random.RandomState(1)
+        self.assertIs(random_streams.get_random_state(rng), rng)
+
+        self.assertEqual(
+            random_streams.get_random_state(3).uniform(),
+            np.random.RandomState(3).uniform())
+
+    def test_spawned_streams_depend_on_seed_and_index(self):
+        streams = random_streams.spawn_random_states(4, 6)
+        draws = [rng.uniform() for rng in streams]
+
+        self.assertEqual(len(set(draws)), 6)
+
+        # Streams of an index range starting later are the same streams
+        later = random_streams.spawn_random_states(4, 2, start=3)
+        self.assertEqual([rng.uniform() for rng in later], draws[3:5])
+
+        # A sequence seed, e.g. the seed followed by a shard index
+        other = random_streams.spawn_random_states([4, 0], 2)
+        self.assertNotEqual(other[0].uniform(), draws[0])
+
+    def test_neurons_from_streams(self):
+        neurons = [it.Neuron(list(OBJECTS), rng=rng, **PROFILES)
+                   for rng in random_streams.spawn_random_states(8, 3)]
+
+        # Other neurons created in between do not change the parameters of a stream
+        np.random.seed(0)
+        it.Neuron(list(OBJECTS), **PROFILES)
+        repeated = it.Neuron(
+            list(OBJECTS), rng=random_streams.spawn_random_states(8, 1, start=2)[0], **PROFILES)
+
+        self.assertEqual(get_neuron_parameters(repeated), get_neuron_parameters(neurons[2]))
+        self.assertNotEqual(get_neuron_parameters(neurons[1]), get_neuron_parameters(neurons[2]))
+
+    def test_power_law_objects_follow_numpy_seed(self):
+        # Objects used to be shuffled with the stdlib random module
+        orders = []
+        for _ in np.arange(2):
+            np.random.seed(6)
+            neuron = it.Neuron(list(OBJECTS), selectivity_profile='power_law')
+            orders.append([obj for obj, _ in neuron.selectivity.get_ranked_object_list()])
+
+        self.assertEqual(orders[0], orders[1])
+
+    def test_population_seed(self):
+        populations = [
+            itp.create_population(OBJECTS, 200, rng=9, **PROFILES) for _ in np.arange(2)]
+
+        arrays = [itp._get_population_arrays(population) for population in populations]
+        for key in arrays[0]:
+            self.assertTrue(np.array_equal(arrays[0][key], arrays[1][key]), key)
+
+        other = itp._get_population_arrays(
+            itp.create_population(OBJECTS, 200, rng=10, **PROFILES))
+        self.assertFalse(np.array_equal(arrays[0]['obj_pref'], other['obj_pref']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the object selectivity profiles.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+from scipy.stats import gamma
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+from ObjectSelectivity import kurtosis_selectivity_profile as ks
+from ObjectSelectivity import sparseness
+from ObjectSelectivity.power_law_selectivity_profile import calculate_activity_fraction
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+
+class TestGammaActivityFraction(unittest.TestCase):
+
+    @staticmethod
+    def get_grid_activity_fraction(a, num):
+        """ Activity fraction of rates at num points of the gamma cdf, as previously estimated """
+        cdf = np.linspace(start=0, stop=1, num=num, endpoint=False)
+        return calculate_activity_fraction(gamma.ppf(cdf, a, scale=1.0, loc=0))
+
+    def test_matches_rate_distribution(self):
+        # Shape parameters are drawn from gamma(4, 0.5) and clipped at 1.01
+        shapes = np.array([1.01, 2.0, 4.0, 6.0])
+        activity_fractions = ks.get_gamma_activity_fraction(shapes)
+
+        for a, activity_fraction in zip(shapes, activity_fractions):
+            # The previous 1000 point estimate truncates the tail and is up to ~1% lower
+            estimate = self.get_grid_activity_fraction(a, 1000)
+            self.assertLess(estimate, activity_fraction)
+            self.assertLess(activity_fraction - estimate, 0.015 * activity_fraction)
+
+            rates = gamma.rvs(a, size=2000000, random_state=np.random.RandomState(0))
+            self.assertAlmostEqual(
+                calculate_activity_fraction(rates), activity_fraction, delta=0.01)
+
+    def test_profile_parameters(self):
+        profile = ks.KurtosisSparseness(OBJECTS, rng=np.random.RandomState(3))
+
+        self.assertEqual(profile.activity_fraction_absolute, 1.0 / (1 + profile.a))
+        self.assertEqual(
+            profile.get_max_firing_rate(), gamma.ppf(0.99, profile.a, scale=profile.b, loc=0))
+
+    def test_sampled_parameters(self):
+        obj_pref, activity_fraction, max_fire_rate = ks.KurtosisSparseness.sample_parameters(
+            500, len(OBJECTS), rng=np.random.RandomState(3))
+
+        self.assertEqual(obj_pref.shape, (500, len(OBJECTS)))
+        self.assertTrue(np.all((activity_fraction > 0) & (activity_fraction < 1)))
+        self.assertTrue(np.all(max_fire_rate > 0))
+
+
+class TestLehkySampleRates(unittest.TestCase):
+
+    @staticmethod
+    def get_reference_rates(n_neurons, n_objs):
+        """ get_lehky_sample_rates, as previously drawn one neuron at a time """
+        a_arr = np.random.gamma(4, scale=0.5, size=n_neurons)
+        b_arr = np.random.gamma(2, scale=0.5, size=n_neurons)
+
+        r_mat = np.zeros(shape=(n_neurons, n_objs))
+        for n_idx in np.arange(n_neurons):
+            r_mat[n_idx, :] = gamma.rvs(a=a_arr[n_idx], loc=0, scale=b_arr[n_idx], size=n_objs)
+
+        return r_mat
+
+    def test_same_rates_as_per_neuron_draws(self):
+        np.random.seed(3)
+        reference = self.get_reference_rates(250, 40)
+
+        for chunk_size in [1, 7, 250, 10000]:
+            np.random.seed(3)
+            rates = sparseness.get_lehky_sample_rates(250, 40, chunk_size=chunk_size)
+
+            self.assertTrue(np.array_equal(rates, reference))
+
+    def test_profile_rates(self):
+        profile = sparseness.LehkySparseness(np.random.RandomState(0).uniform(0.2, 1, size=500))
+
+        np.random.seed(5)
+        a_arr = np.random.gamma(profile._afa, scale=profile._bfa, size=60)
+        b_arr = np.random.gamma(profile._afb, scale=profile._bfb, size=60)
+        reference = np.array([gamma.rvs(a=a, loc=0, scale=b, size=20)
+                              for a, b in zip(a_arr, b_arr)])
+
+        np.random.seed(5)
+        rates = profile.get_sample_profile_and_rates_mat(60, 20, chunk_size=16)
+
+        self.assertTrue(np.array_equal(rates, reference))
+
+    def test_blocks(self):
+        a_arr = np.linspace(1, 5, num=25)
+        b_arr = np.linspace(0.5, 2, num=25)
+
+        blocks = list(sparseness.generate_gamma_rates(a_arr, b_arr, 10, chunk_size=10))
+        self.assertEqual([block.shape for block in blocks], [(10, 10), (10, 10), (5, 10)])
+
+    def test_memory_mapped_output(self):
+        temp_dir = tempfile.mkdtemp()
+        try:
+            out = np.lib.format.open_memmap(
+                os.path.join(temp_dir, 'rates.npy'), mode='w+', dtype=float, shape=(120, 30))
+
+            np.random.seed(4)
+            rates = sparseness.get_lehky_sample_rates(120, 30, out=out, chunk_size=50)
+            self.assertIs(rates, out)
+            out.flush()
+
+            np.random.seed(4)
+            self.assertTrue(np.array_equal(
+                np.load(os.path.join(temp_dir, 'rates.npy')),
+                sparseness.get_lehky_sample_rates(120, 30)))
+
+            del rates, out
+        finally:
+            shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the Tamura dynamics profiles.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import sys
+import unittest
+
+import numpy as np
+import scipy.linalg
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_population as itp
+from Dynamics import tamura_dynamic_profile_2 as tamura
+
+OBJECTS = ['o%d' % idx for idx in range(12)]
+
+
+class TestDiscretize(unittest.TestCase):
+
+    def test_matches_matrix_exponential(self):
+        a = np.array([[-1.0, 0], [1, -1]])
+        b = np.array([1.0, 0])
+
+        for dt in [0.001, 0.005, 0.05]:
+            taus = np.array([0.002, 0.0113, 0.0881])
+            a_d, b_d = tamura.discretize(dt, taus)
+
+            for idx, tau in enumerate(taus):
+                ref_a_d = scipy.linalg.expm(a * dt / tau)
+                # B_d = A^-1 (A_d - I) B, the system matrices are scaled by 1 / tau
+                ref_b_d = np.dot(np.linalg.solve(a, ref_a_d - np.eye(2)), b)
+
+                self.assertTrue(np.allclose(a_d[:, :, idx], ref_a_d, rtol=1e-12, atol=1e-14))
+                self.assertTrue(np.allclose(b_d[:, idx], ref_b_d, rtol=1e-12, atol=1e-14))
+
+    def test_converges_to_euler(self):
+        # With small steps, the exact and Euler steps of a unit step input agree
+        dt = 1e-5
+        tau = 0.01
+        a = 1 / tau * np.array([[-1, 0], [1, -1]])
+        b = 1 / tau * np.array([1, 0])
+        c = np.array([1.0, -1.0])
+
+        a_d, b_d = tamura.discretize(dt, tau)
+
+        x_exact = np.zeros(2)
+        x_euler = np.zeros(2)
+        for _ in np.arange(2000):
+            x_exact, y_exact = tamura.step_discrete(a_d, b_d, c, x_exact, 1)
+            x_euler, y_euler = tamura.integrate(dt, a, b, c, x_euler, 1)
+
+        self.assertAlmostEqual(y_exact, y_euler, places=3)
+
+
+class TestPopulationDynamics(unittest.TestCase):
+
+    def test_population_matches_profiles(self):
+        rng = np.random.RandomState(0)
+
+        for integration in ['euler', 'exact']:
+            profiles = []
+            for _ in np.arange(20):
+                obj_dict = dict((obj, rng.uniform()) for obj in OBJECTS)
+                profiles.append(tamura.TamuraDynamics(
+                    0.005, obj_dict, rng.uniform(20, 100), integration=integration, rng=rng))
+
+            population = tamura.TamuraPopulationDynamics.from_profiles(profiles)
+
+            # Inputs for 150 steps, then none, to also compare the decay of the responses
+            for step in np.arange(250):
+                if step < 150:
+                    early_rates = rng.uniform(0, 50, size=len(profiles)) * rng.randint(2)
+                    late_rates = early_rates * rng.uniform(0.5, 1, size=len(profiles))
+                else:
+                    early_rates = np.zeros(len(profiles))
+                    late_rates = np.zeros(len(profiles))
+
+                rates = population.get_dynamic_rates(early_rates, late_rates)
+                ref_rates = [profile.get_dynamic_rates(early_rates[idx], late_rates[idx])[0]
+                             for idx, profile in enumerate(profiles)]
+
+                self.assertTrue(np.allclose(rates, ref_rates, rtol=1e-12, atol=1e-12))
+
+
+class TestTamuraStepResponseArea(unittest.TestCase):
+
+    @staticmethod
+    def simulate_area(dt, tau, integration):
+        """ Area under the rectified unit step response, simulated one step at a time """
+        a = np.array([[-1, 0], [1, -1]])
+        b = np.array([1, 0])
+        c = np.array([1.0, -1.0])
+
+        a_d, b_d = tamura.discretize(dt, tau)
+
+        x = np.zeros(2)
+        outputs = []
+        for _ in np.arange(0, 0.140, step=dt):
+            if integration == 'exact':
+                x, y = tamura.step_discrete(a_d, b_d, c, x, 1)
+            else:
+                x, y = tamura.integrate(dt, 1 / tau * a, 1 / tau * b, c, x, 1)
+
+            outputs.append(np.maximum(0, y))
+
+        return np.trapz(outputs, dx=dt)
+
+    def test_closed_form_matches_simulation(self):
+        taus = np.array([0.002, 0.005, 0.0113, 0.03, 0.0881, 0.2])
+
+        for dt in [0.001, 0.005, 0.02]:
+            for integration in ['euler', 'exact']:
+                areas = tamura.get_step_response_area(dt, taus, integration)
+
+                for tau, area in zip(taus, areas):
+                    self.assertAlmostEqual(
+                        area, self.simulate_area(dt, tau, integration), places=10)
+
+
+class TestLateGains(unittest.TestCase):
+
+    def test_large_population(self):
+        # Late gains of neurons with small late responses used to fail to generate
+        for seed in np.arange(3):
+            population = itp.create_population(
+                OBJECTS,
+                10000,
+                selectivity_profile='kurtosis',
+                dynamic_profile='tamura',
+                rng=np.random.RandomState(seed))
+
+            self.assertEqual(population.n, 10000)
+            self.assertTrue(np.all(np.isfinite(population.dynamics.late_gain)))
+            self.assertTrue(np.all(population.dynamics.late_gain >= 0))
+
+    def test_small_late_response(self):
+        # Desired late area just above the 0.001 threshold
+        profile = tamura.TamuraDynamics(0.005, {'a': 1.0}, 100, rng=np.random.RandomState(0))
+
+        window = np.ones_like(np.arange(0, 0.140, step=0.005))
+        r_obj = 0.00101 / (100 * np.trapz(window, dx=0.005))
+
+        late_gain, late_tau = profile._get_late_gain_n_tau(
+            r_obj, 100, rng=np.random.RandomState(1))
+
+        area = r_obj * 100 * late_gain * \
+            tamura.get_step_response_area(0.005, late_tau, profile.integration)
+        self.assertAlmostEqual(area, 0.00101)
+
+
+if __name__ == '__main__':
+    unittest.main()
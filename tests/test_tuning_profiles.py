@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+""" --------------------------------------------------------------------------------------------
+Tests of the position, size and rotation tuning profiles.
+
+Run from the top level directory:
+    python -m unittest discover -s tests
+
+@author: s362khan
+----------------------------------------------------------------------------------------------"""
+import os
+import sys
+import unittest
+
+import numpy as np
+import scipy.stats
+
+# Do relative import of the main folder to get files in sibling directories
+top_level_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if top_level_dir_path not in sys.path:
+    sys.path.append(top_level_dir_path)
+
+import it_population as itp
+from ObjectSelectivity import sparseness
+from PositionTolerance import gaussian_position_profile as gpp
+from RotationalTolerance import gaussian_rotation_profile as grp
+from SizeTolerance import log_normal_size_profile as lnsp
+
+
+class TestBatchRateModifiers(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+
+        self.positions = [gpp.GaussianPositionProfile(selectivity, rng=rng)
+                          for selectivity in rng.uniform(0.1, 0.7, size=50)]
+        self.sizes = [lnsp.LogNormalSizeProfile(position.position_tolerance, rng=rng)
+                      for position in self.positions]
+
+    def test_position(self):
+        rf_centers = np.array([position.rf_center for position in self.positions])
+        position_tolerances = np.array([position.position_tolerance for position in self.positions])
+
+        for x, y in [(0, 0), (0.3, -0.1), (-0.5, 0.4)]:
+            modifiers = gpp.GaussianPositionProfile.get_firing_rate_modifiers(
+                rf_centers, position_tolerances, x, y)
+
+            self.assertTrue(np.allclose(
+                modifiers,
+                [position.firing_rate_modifier(x, y) for position in self.positions],
+                rtol=1e-14, atol=0))
+
+    def test_size(self):
+        pref_sizes = np.array([size.pref_size for size in self.sizes])
+        size_bws = np.array([size.size_bw for size in self.sizes])
+
+        # A zero size stimulus uses the same safeguard as the individual profiles
+        for stimulus_size in [0, 0.01, 7 * np.pi / 180.0, 0.8]:
+            modifiers = lnsp.LogNormalSizeProfile.get_firing_rate_modifiers(
+                pref_sizes, size_bws, stimulus_size)
+
+            self.assertTrue(np.allclose(
+                modifiers,
+                [size.firing_rate_modifier(stimulus_size) for size in self.sizes],
+                rtol=1e-14, atol=0))
+
+    def test_scale_factors_distribution(self):
+        # Scale factors previously sampled with one profile per sample
+        np.random.seed(1)
+        reference = np.zeros(2000)
+        for idx in np.arange(reference.shape[0]):
+            position = gpp.GaussianPositionProfile(np.random.uniform(0.1, 0.7))
+            size = lnsp.LogNormalSizeProfile(position.position_tolerance)
+
+            reference[idx] = position.firing_rate_modifier(0, 0) * \
+                size.firing_rate_modifier(7 * np.pi / 180.0)
+
+        np.random.seed(2)
+        factors = sparseness.get_scale_factors_from_model(20000)
+
+        self.assertEqual(factors.shape, (20000,))
+        self.assertGreater(scipy.stats.ks_2samp(factors, reference)[1], 0.01)
+
+
+def adjust_angles_loop(angles, mu, period):
+    """ GaussianRotationProfile.adjust_angles before vectorization (baseline) """
+    if not isinstance(angles, np.ndarray):
+        angles = np.array([angles])
+        mu = np.array([mu])
+        period = np.array([period])
+
+    min_allowed = mu - period / 2
+    max_allowed = mu + period / 2
+
+    for idx in np.arange(angles.shape[0]):
+
+        if angles[idx] < min_allowed[idx]:
+            angles[idx] = angles[idx] + period[idx]
+
+        elif angles[idx] > max_allowed[idx]:
+            angles[idx] = angles[idx] - period[idx]
+
+    return angles
+
+
+def rotation_firing_rate_modifier_loop(profile, x, rotation_symmetry_period, mirror_symmetric):
+    """ GaussianRotationProfile.firing_rate_modifier before vectorization (baseline) """
+    valid_range = 2 * np.pi / rotation_symmetry_period
+
+    mu_p = np.mod(profile.preferred_angle, valid_range)
+    x_p = np.mod(x, valid_range)
+    mu_s = np.mod(-mu_p, valid_range)
+
+    x_adj = adjust_angles_loop(x_p, mu_p, valid_range)
+    fire_rate_p = np.exp(-(x_adj - mu_p)**2 / (2 * profile.spread ** 2))
+
+    x_adj = adjust_angles_loop(x_p, mu_s, valid_range)
+    fire_rate_s = mirror_symmetric * np.exp(-(x_adj - mu_s) ** 2 / (2 * profile.spread ** 2))
+
+    return np.maximum(fire_rate_p, fire_rate_s)
+
+
+class TestRotationRateModifiers(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.profiles = [grp.GaussianRotationProfile(rng=rng) for _ in np.arange(40)]
+
+        n_angles = 200
+        self.x = rng.uniform(-3 * np.pi, 3 * np.pi, size=n_angles)
+        self.periods = rng.choice([1, 2, 3, 4, 360], size=n_angles).astype(float)
+        self.mirror = rng.randint(2, size=n_angles).astype(float)
+
+    def test_matches_loop(self):
+        for profile in self.profiles:
+            rates = profile.firing_rate_modifier(self.x.copy(), self.periods, self.mirror)
+            ref_rates = rotation_firing_rate_modifier_loop(
+                profile, self.x.copy(), self.periods, self.mirror)
+
+            self.assertTrue(np.allclose(rates, ref_rates, rtol=1e-12, atol=1e-300))
+
+    def test_scalar_inputs(self):
+        for profile in self.profiles:
+            for x, period, mirror in zip(self.x[:20], self.periods[:20], self.mirror[:20]):
+                rate = profile.firing_rate_modifier(x, period, mirror)
+                ref_rate = rotation_firing_rate_modifier_loop(profile, x, period, mirror)
+
+                self.assertAlmostEqual(float(rate), float(ref_rate[0]), places=12)
+
+    def test_adjust_angles(self):
+        mu = np.random.RandomState(1).uniform(0, np.pi, size=self.x.shape)
+        period = 2 * np.pi / self.periods
+
+        angles = np.mod(self.x, period)
+        ref_angles = adjust_angles_loop(angles.copy(), mu, period)
+
+        self.assertTrue(np.array_equal(grp.wrap_angles(angles, mu, period), ref_angles))
+        self.assertTrue(np.array_equal(
+            grp.GaussianRotationProfile.adjust_angles(angles, mu, period), ref_angles))
+
+    def test_population_matches_loop(self):
+        population = itp.NeuronPopulation(
+            ['a'],
+            np.ones(len(self.profiles)),
+            np.ones((len(self.profiles), 1)),
+            preferred_angle=[profile.preferred_angle for profile in self.profiles],
+            rotation_spread=[profile.spread for profile in self.profiles])
+
+        rates = population.rotation_firing_rate_modifier(self.x, self.periods, self.mirror)
+
+        for n_idx, profile in enumerate(self.profiles):
+            self.assertTrue(np.allclose(
+                rates[n_idx],
+                rotation_firing_rate_modifier_loop(
+                    profile, self.x.copy(), self.periods, self.mirror),
+                rtol=1e-12, atol=1e-300))
+
+
+if __name__ == '__main__':
+    unittest.main()